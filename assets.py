@@ -0,0 +1,76 @@
+# ╔═══════════════════════════════════════════════════════════════════════════╗
+# ║                                                                           ║
+# ║                  ASET GAMBAR (THUMBNAIL TER-CACHE)                        ║
+# ║                                                                           ║
+# ║  Foto halaman Team diperkecil sekali ke ukuran tampilan, di-encode ke     ║
+# ║  data URI dan disimpan per proses dengan kunci (path, mtime, ukuran):     ║
+# ║  rerun berikutnya hanya os.stat, tanpa membaca & meng-encode file lagi.   ║
+# ║                                                                           ║
+# ║  - image_data_uri(): Data URI thumbnail dengan MIME type yang benar       ║
+# ║                                                                           ║
+# ║  Pillow opsional: tanpa Pillow file asli dipakai apa adanya (tetap        ║
+# ║  ter-cache, MIME dari ekstensi file).                                     ║
+# ║                                                                           ║
+# ╚═══════════════════════════════════════════════════════════════════════════╝
+import base64
+import io
+import mimetypes
+import os
+import threading
+
+# optional Pillow untuk resize
+try:
+    from PIL import Image, ImageOps
+    PIL_AVAILABLE = True
+except Exception:
+    PIL_AVAILABLE = False
+
+# .member-img tingginya 320px: 2x untuk layar HiDPI
+THUMBNAIL_SIZE = (480, 640)
+JPEG_QUALITY = 85
+
+_cache = {}
+_lock = threading.Lock()
+
+
+def _encode_thumbnail(path, size):
+    with Image.open(path) as img:
+        img = ImageOps.exif_transpose(img)
+        img.thumbnail(size)
+        # gambar dengan transparansi tetap PNG, selain itu JPEG (jauh lebih kecil untuk foto)
+        if img.mode in ("RGBA", "LA", "P"):
+            fmt, mime = "PNG", "image/png"
+        else:
+            fmt, mime = "JPEG", "image/jpeg"
+            img = img.convert("RGB")
+        buf = io.BytesIO()
+        img.save(buf, fmt, quality=JPEG_QUALITY, optimize=True)
+    return buf.getvalue(), mime
+
+
+def image_data_uri(path, size=THUMBNAIL_SIZE):
+    path = os.path.abspath(path)
+    key = (path, os.stat(path).st_mtime_ns, tuple(size))
+    with _lock:
+        uri = _cache.get(key)
+    if uri is not None:
+        return uri
+
+    data = None
+    if PIL_AVAILABLE:
+        try:
+            data, mime = _encode_thumbnail(path, size)
+        except Exception:
+            data = None
+    if data is None:
+        with open(path, "rb") as fh:
+            data = fh.read()
+        mime = mimetypes.guess_type(path)[0] or "application/octet-stream"
+    uri = f"data:{mime};base64,{base64.b64encode(data).decode('ascii')}"
+
+    with _lock:
+        # versi lama file yang sama (mtime berbeda) dibuang
+        for old in [k for k in _cache if k[0] == path]:
+            del _cache[old]
+        _cache[key] = uri
+    return uri
@@ -0,0 +1,244 @@
+# ╔═══════════════════════════════════════════════════════════════════════════╗
+# ║                                                                           ║
+# ║                   BATCH RUNNER (TANPA BROWSER / STREAMLIT)                ║
+# ║                                                                           ║
+# ║  Menjalankan pipeline yang sama dengan dashboard secara non-interaktif:   ║
+# ║  robust_read_csv -> preprocess_with_options -> compute_k_metrics /        ║
+# ║  suggest_k -> KMeans -> reduksi dimensi -> silhouette -> profil klaster   ║
+# ║                                                                           ║
+# ║  Contoh:                                                                  ║
+# ║    python batch_run.py --input data/homicide-data.csv --output results    ║
+# ║    python batch_run.py --input data.csv --output out --k 5 --dr t-SNE     ║
+# ║    python batch_run.py --input data.csv --output out --windows year       ║
+# ║    python batch_run.py --input data.csv --output out --partition-by state ║
+# ║    python batch_run.py --input minggu_ini.csv --append-to results \       ║
+# ║        --output results                                                   ║
+# ║    python batch_run.py --input besar.csv --output out --out-of-core       ║
+# ║                                                                           ║
+# ║  --append-to: baris baru ditempatkan ke klaster & embedding hasil run     ║
+# ║  sebelumnya (incremental.py), opsi preprocessing diambil dari run itu.    ║
+# ║  --out-of-core: CSV dibaca per chunk (streaming.py, MiniBatchKMeans),     ║
+# ║  untuk file yang tidak muat di memori; label seluruh baris ada di         ║
+# ║  labels_full.parquet / .csv.gz, file lain berisi sampel.                  ║
+# ║                                                                           ║
+# ║  Folder output bisa dimuat di halaman 'Input Dataset' dashboard; dengan   ║
+# ║  --store run juga masuk ke Riwayat Run dashboard (run_store.py).          ║
+# ║                                                                           ║
+# ╚═══════════════════════════════════════════════════════════════════════════╝
+import argparse
+import os
+import sys
+import time
+
+import encoders
+import incremental
+import partitions
+import run_store
+import streaming
+import temporal
+from pipeline import CLUSTER_ENGINES, DEFAULT_FEATURES, DR_METHODS, load_results, robust_read_csv, run_pipeline, save_results
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Jalankan pipeline clustering kasus pembunuhan tanpa dashboard.")
+    parser.add_argument("--input", required=True, help="Path file CSV (skema homicide-data.csv)")
+    parser.add_argument("--output", required=True, help="Folder output untuk label, embedding, metrik dan profil klaster")
+    parser.add_argument("--features", default=",".join(DEFAULT_FEATURES),
+                        help="Fitur untuk clustering, dipisah koma (default: %(default)s)")
+    parser.add_argument("--fill-numeric", choices=["median", "mean", "0"], default="median",
+                        help="Isi nilai numerik kosong dengan (default: %(default)s)")
+    parser.add_argument("--fill-categorical", choices=["Unknown", "mode"], default="Unknown",
+                        help="Isi nilai kategorikal kosong dengan (default: %(default)s)")
+    parser.add_argument("--remove-duplicates", action="store_true", help="Hapus baris duplikat")
+    parser.add_argument("--duplicate-keys", default="",
+                        help="Kolom kunci duplikat dipisah koma, mis. uid (default: semua kolom)")
+    parser.add_argument("--encoders", default="",
+                        help="Encoder per fitur kategorikal, mis. city=top_n,victim_last=hashing "
+                             f"(pilihan: {', '.join(encoders.ENCODERS)}; default one-hot, otomatis top_n bila nilai unik > "
+                             f"{encoders.CARDINALITY_LIMIT})")
+    parser.add_argument("--remove-missing", action="store_true", help="Hapus baris dengan nilai kosong pada fitur terpilih")
+    parser.add_argument("--k", default="auto", help="Jumlah klaster, atau 'auto' untuk saran Elbow/Silhouette (default: %(default)s)")
+    parser.add_argument("--k-max", type=int, default=8, help="Max K yang diuji saat --k auto (default: %(default)s)")
+    parser.add_argument("--engine", choices=CLUSTER_ENGINES, default="kmeans",
+                        help="kmeans (one-hot + scaling) atau kprototypes (kode kategori, tanpa one-hot) (default: %(default)s)")
+    parser.add_argument("--dr", choices=DR_METHODS, default="PCA", help="Metode reduksi dimensi (default: %(default)s)")
+    parser.add_argument("--perplexity", type=float, default=30, help="t-SNE perplexity (default: %(default)s)")
+    parser.add_argument("--random-state", type=int, default=42)
+    parser.add_argument("--windows", choices=list(temporal.FREQS), default=None,
+                        help="Juga cluster per jendela report_date (year/quarter) secara paralel, simpan temporal_drift.csv")
+    parser.add_argument("--partition-by", choices=list(partitions.PARTITION_COLUMNS), default=None,
+                        help="Juga cluster tiap state/kota sendiri (K otomatis per partisi), simpan partitions_summary.csv")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Jumlah proses worker untuk --windows / --partition-by (default: semua core)")
+    parser.add_argument("--append-to", default=None,
+                        help="Folder hasil run K-Means sebelumnya: data input ditambahkan ke klaster yang ada tanpa refit")
+    parser.add_argument("--update-centroids", action="store_true",
+                        help="Dengan --append-to: perbarui centroid dengan langkah mini-batch")
+    parser.add_argument("--store", action="store_true",
+                        help="Simpan juga ke riwayat run dashboard (folder dari env DASHBOARD_RUN_STORE)")
+    parser.add_argument("--out-of-core", action="store_true",
+                        help="Baca CSV per chunk dan cluster dengan MiniBatchKMeans (untuk file lebih besar dari memori)")
+    parser.add_argument("--chunksize", type=int, default=streaming.CHUNK_ROWS,
+                        help="Dengan --out-of-core: baris per chunk (default: %(default)s)")
+    parser.add_argument("--sample-rows", type=int, default=streaming.SAMPLE_ROWS,
+                        help="Dengan --out-of-core: ukuran sampel untuk K otomatis & tampilan dashboard "
+                             "(default: %(default)s)")
+    parser.add_argument("--epochs", type=int, default=1,
+                        help="Dengan --out-of-core: jumlah pass MiniBatchKMeans atas seluruh file (default: %(default)s)")
+    args = parser.parse_args(argv)
+    if args.out_of_core:
+        unsupported = [flag for flag, used in (("--append-to", args.append_to), ("--windows", args.windows),
+                                               ("--partition-by", args.partition_by),
+                                               ("--engine kprototypes", args.engine != "kmeans")) if used]
+        if unsupported:
+            parser.error(f"--out-of-core tidak bisa digabung dengan {', '.join(unsupported)}")
+        if args.chunksize < 1 or args.sample_rows < 2 or args.epochs < 1:
+            parser.error("--chunksize dan --epochs minimal 1, --sample-rows minimal 2")
+    if args.k != "auto":
+        try:
+            args.k = int(args.k)
+        except ValueError:
+            parser.error("--k harus bilangan bulat atau 'auto'")
+        if args.k < 2:
+            parser.error("--k minimal 2")
+    if args.k_max < 3:
+        parser.error("--k-max minimal 3")
+    methods = {}
+    for item in filter(None, (p.strip() for p in args.encoders.split(","))):
+        feature, _, method = item.partition("=")
+        if method not in encoders.ENCODERS:
+            parser.error(f"--encoders: metode '{method}' untuk {feature} tidak dikenal")
+        methods[feature.strip()] = method
+    args.encoders = methods
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    t_start = time.perf_counter()
+    if args.out_of_core:
+        return out_of_core(args, t_start)
+
+    df = robust_read_csv(args.input)
+    print(f"read: {len(df)} baris, {len(df.columns)} kolom dari {args.input}")
+    if args.append_to:
+        return append(args, df, t_start)
+
+    requested = [f.strip() for f in args.features.split(",") if f.strip()]
+    features = [f for f in requested if f in df.columns]
+    missing = [f for f in requested if f not in df.columns]
+    if missing:
+        print(f"peringatan: fitur tidak ada di dataset, dilewati: {', '.join(missing)}")
+    if not features:
+        print("error: tidak ada fitur yang dapat diproses", file=sys.stderr)
+        return 2
+    duplicate_keys = [c.strip() for c in args.duplicate_keys.split(",") if c.strip()]
+    unknown_keys = [c for c in duplicate_keys if c not in df.columns]
+    if unknown_keys:
+        print(f"error: kolom kunci duplikat tidak ada di dataset: {', '.join(unknown_keys)}", file=sys.stderr)
+        return 2
+
+    result = run_pipeline(
+        df,
+        features=features,
+        fill_numeric_method=args.fill_numeric,
+        fill_categorical_method=args.fill_categorical,
+        remove_duplicates=args.remove_duplicates,
+        remove_missing=args.remove_missing,
+        duplicate_subset=duplicate_keys or None,
+        k=args.k,
+        k_max=args.k_max,
+        engine=args.engine,
+        encoder_methods=args.encoders or None,
+        dr_method=args.dr,
+        tsne_perplexity=args.perplexity,
+        random_state=args.random_state,
+    )
+    out = save_results(result, args.output)
+    if args.store:
+        run_id = run_store.make_store().save(result, data=df, source=os.path.basename(args.input))
+        print(f"riwayat run: {run_id}")
+    if args.windows:
+        if "report_date" not in result["df_proc"].columns:
+            print("peringatan: kolom report_date tidak ada, --windows dilewati")
+        else:
+            _, reference = temporal.cluster_centroids(result["X_scaled"], result["labels"])
+            windows = temporal.window_labels(result["df_proc"]["report_date"], args.windows)
+            t_result = temporal.temporal_clustering(result["X_scaled"], windows, result["final_k"], reference=reference,
+                                                    max_workers=args.workers, random_state=args.random_state)
+            t_result["drift"].to_csv(out / "temporal_drift.csv", index=False)
+            skipped = f", dilewati: {', '.join(t_result['skipped'])}" if t_result["skipped"] else ""
+            print(f"{args.windows}: {len(t_result['windows'])} jendela{skipped} ({t_result['seconds']:.1f}s)")
+    if args.partition_by:
+        if args.partition_by not in result["df_proc"].columns:
+            print(f"peringatan: kolom {args.partition_by} tidak ada, --partition-by dilewati")
+        else:
+            p_result = partitions.partition_clustering(result["df_proc"], args.partition_by, features,
+                                                       k_max=args.k_max, max_workers=args.workers,
+                                                       random_state=args.random_state)
+            p_result["summary"].to_csv(out / "partitions_summary.csv", index=False)
+            print(f"{args.partition_by}: {len(p_result['summary'])} partisi, dilewati {len(p_result['skipped'])} "
+                  f"({p_result['seconds']:.1f}s)")
+    print(f"selesai dalam {time.perf_counter() - t_start:.1f}s, hasil disimpan di {out}")
+    return 0
+
+
+def out_of_core(args, t_start):
+    features = [f.strip() for f in args.features.split(",") if f.strip()]
+    duplicate_keys = [c.strip() for c in args.duplicate_keys.split(",") if c.strip()]
+    try:
+        result = streaming.run_out_of_core(
+            args.input,
+            args.output,
+            features=features,
+            fill_numeric_method=args.fill_numeric,
+            fill_categorical_method=args.fill_categorical,
+            remove_duplicates=args.remove_duplicates,
+            remove_missing=args.remove_missing,
+            duplicate_subset=duplicate_keys or None,
+            encoder_methods=args.encoders or None,
+            k=args.k,
+            k_max=args.k_max,
+            dr_method=args.dr,
+            tsne_perplexity=args.perplexity,
+            random_state=args.random_state,
+            chunksize=args.chunksize,
+            sample_rows=args.sample_rows,
+            epochs=args.epochs,
+        )
+    except ValueError as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 2
+    out = save_results(result, args.output)
+    if args.store:
+        run_id = run_store.make_store().save(result, source=os.path.basename(args.input))
+        print(f"riwayat run: {run_id}")
+    print(f"selesai dalam {time.perf_counter() - t_start:.1f}s, hasil disimpan di {out}")
+    return 0
+
+
+def append(args, df, t_start):
+    result = load_results(args.append_to)
+    try:
+        model = incremental.IncrementalModel.from_result(result, state=incremental.load_state(args.append_to))
+        batch = model.append(df, update_centroids=args.update_centroids)
+    except ValueError as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 2
+    dropped = batch["dropped"]
+    print(f"append: {len(batch['df_proc'])} baris ke K={result['final_k']} "
+          f"({dropped['duplicates']} duplikat, {dropped['missing']} nilai kosong dibuang, "
+          f"{batch['unseen']} dengan kategori baru) ({batch['seconds']:.1f}s)")
+    drift = batch["drift"]
+    print(f"drift: jarak x{drift['distance_ratio'] or 0:.2f}, pergeseran proporsi {drift['cluster_shift'] or 0:.2f}, "
+          f"tambahan {drift['growth']:.0%} dari data fit")
+    if drift["refit"]:
+        print(f"peringatan: refit penuh disarankan: {'; '.join(drift['reasons'])}")
+    out = save_results(incremental.combine(result, batch, model), args.output)
+    incremental.save_state(model, out)
+    print(f"selesai dalam {time.perf_counter() - t_start:.1f}s, hasil disimpan di {out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
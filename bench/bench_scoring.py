@@ -0,0 +1,163 @@
+# ╔═══════════════════════════════════════════════════════════════════════════╗
+# ║                                                                           ║
+# ║                  BENCHMARK LAYANAN SCORING (LATENSI & THROUGHPUT)         ║
+# ║                                                                           ║
+# ║  Load generator lokal untuk scoring_service.py: beberapa klien paralel    ║
+# ║  (koneksi keep-alive) mengirim POST /score dengan ukuran batch berbeda.   ║
+# ║  Per ukuran batch: request/s, record/s, latensi p50/p95/p99/max, dan      ║
+# ║  waktu Scorer.score() langsung (tanpa HTTP) sebagai pembanding overhead.  ║
+# ║                                                                           ║
+# ║  Tanpa --url layanan dijalankan di proses ini dengan model dari data      ║
+# ║  sintetis (run_pipeline, PCA, K tetap) pada port bebas.                   ║
+# ║                                                                           ║
+# ║  Contoh:                                                                  ║
+# ║    python bench/bench_scoring.py --batch-sizes 1,100,1000 --clients 4     ║
+# ║    python bench/bench_scoring.py --url http://127.0.0.1:8765 --format csv ║
+# ║                                                                           ║
+# ╚═══════════════════════════════════════════════════════════════════════════╝
+import argparse
+import http.client
+import json
+import sys
+import threading
+import time
+from pathlib import Path
+from urllib.parse import urlparse
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import incremental  # noqa: E402
+import pipeline  # noqa: E402
+import scoring_service  # noqa: E402
+from run_bench import environment  # noqa: E402
+from synthetic import generate_homicide_data  # noqa: E402
+
+
+def start_local_service(args):
+    df = generate_homicide_data(args.fit_rows, seed=args.seed)
+    t0 = time.perf_counter()
+    result = pipeline.run_pipeline(df, k=args.k, dr_method="PCA", random_state=args.seed, log=lambda *_: None)
+    scorer = scoring_service.Scorer(incremental.IncrementalModel.from_result(result), source="synthetic")
+    print(f"model: {args.fit_rows:,} baris fit, K={args.k}, {len(scorer.model.feature_cols)} kolom terkode "
+          f"({time.perf_counter() - t0:.1f}s)", flush=True)
+    server = scoring_service.make_server(scorer, "127.0.0.1", 0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, scorer, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def make_payload(records, fmt):
+    if fmt == "csv":
+        return records.to_csv(index=False).encode("utf-8"), "text/csv"
+    return records.to_json(orient="records").encode("utf-8"), "application/json"
+
+
+def run_load(url, body, content_type, n_requests, clients):
+    # n_requests dibagi ke `clients` thread; tiap thread satu koneksi HTTP/1.1 keep-alive
+    target = urlparse(url)
+    latencies = []
+    errors = []
+    lock = threading.Lock()
+    remaining = [n_requests]
+
+    def client():
+        conn = http.client.HTTPConnection(target.hostname, target.port, timeout=60)
+        own = []
+        try:
+            while True:
+                with lock:
+                    if remaining[0] <= 0:
+                        break
+                    remaining[0] -= 1
+                t0 = time.perf_counter()
+                conn.request("POST", "/score", body=body, headers={"Content-Type": content_type})
+                response = conn.getresponse()
+                data = response.read()
+                own.append(time.perf_counter() - t0)
+                if response.status != 200:
+                    errors.append(f"HTTP {response.status}: {data[:200]!r}")
+        finally:
+            conn.close()
+            with lock:
+                latencies.extend(own)
+
+    threads = [threading.Thread(target=client) for _ in range(clients)]
+    t0 = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return np.asarray(latencies), time.perf_counter() - t0, errors
+
+
+def bench_batch(batch_size, args, url, scorer, pool):
+    records = pool.iloc[:batch_size]
+    body, content_type = make_payload(records, args.format)
+    # pemanasan: koneksi, cache encoder, jalur kode pertama
+    run_load(url, body, content_type, min(args.clients, 4), 1)
+    latencies, seconds, errors = run_load(url, body, content_type, args.requests, args.clients)
+    row = {
+        "batch_size": batch_size, "format": args.format, "clients": args.clients,
+        "requests": len(latencies), "errors": len(errors), "seconds": round(seconds, 4),
+        "requests_per_s": round(len(latencies) / seconds, 2),
+        "records_per_s": round(len(latencies) * batch_size / seconds, 1),
+        "p50_ms": round(float(np.percentile(latencies, 50)) * 1000, 3),
+        "p95_ms": round(float(np.percentile(latencies, 95)) * 1000, 3),
+        "p99_ms": round(float(np.percentile(latencies, 99)) * 1000, 3),
+        "max_ms": round(float(latencies.max()) * 1000, 3),
+        "body_bytes": len(body),
+    }
+    if scorer is not None:
+        # Scorer.score langsung (tanpa parsing & HTTP): sisa latensi = overhead layanan
+        t0 = time.perf_counter()
+        for _ in range(5):
+            scorer.score(records)
+        row["score_ms"] = round((time.perf_counter() - t0) / 5 * 1000, 3)
+    if errors:
+        row["first_error"] = errors[0]
+    print(f"  batch {batch_size:>6}  {row['requests_per_s']:>9.1f} req/s  {row['records_per_s']:>11.1f} record/s"
+          f"  p50 {row['p50_ms']:>8.2f} ms  p95 {row['p95_ms']:>8.2f} ms  p99 {row['p99_ms']:>8.2f} ms"
+          + (f"  score {row['score_ms']:.2f} ms" if "score_ms" in row else "")
+          + (f"  ({len(errors)} error)" if errors else ""), flush=True)
+    return row
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark latensi & throughput scoring_service.py")
+    parser.add_argument("--url", default=None, help="Layanan yang sudah berjalan (default: jalankan lokal di proses ini)")
+    parser.add_argument("--batch-sizes", default="1,10,100,1000", help="Record per request (default: %(default)s)")
+    parser.add_argument("--clients", type=int, default=4, help="Klien paralel (default: %(default)s)")
+    parser.add_argument("--requests", type=int, default=200, help="Request per ukuran batch (default: %(default)s)")
+    parser.add_argument("--format", choices=["json", "csv"], default="json")
+    parser.add_argument("--fit-rows", type=int, default=20000, help="Baris fit model lokal (default: %(default)s)")
+    parser.add_argument("--k", type=int, default=5, help="K model lokal (default: %(default)s)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default="bench_scoring.json", help="File JSON hasil (default: %(default)s)")
+    args = parser.parse_args(argv)
+    sizes = [int(s) for s in args.batch_sizes.split(",") if s.strip()]
+
+    server, scorer, url = None, None, args.url
+    if url is None:
+        server, scorer, url = start_local_service(args)
+    # record baru dari seed lain: sebagian kategori tidak ada di data fit, seperti kasus nyata
+    pool = generate_homicide_data(max(sizes), seed=args.seed + 1)
+    print(f"== {url}, {args.clients} klien, {args.requests} request per batch, {args.format} ==", flush=True)
+    report = {"meta": {**environment(), "args": vars(args), "url": url}, "results": []}
+    try:
+        for size in sizes:
+            report["results"].append(bench_batch(size, args, url, scorer, pool))
+    finally:
+        if server is not None:
+            server.shutdown()
+            server.server_close()
+    with open(args.output, "w", encoding="utf-8") as fh:
+        json.dump(report, fh, indent=2)
+    print(f"\nHasil disimpan di {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,273 @@
+# ╔═══════════════════════════════════════════════════════════════════════════╗
+# ║                                                                           ║
+# ║                    BENCHMARK PIPELINE CLUSTERING                          ║
+# ║                                                                           ║
+# ║  Mengukur waktu & puncak memori tiap tahap pada data sintetis:            ║
+# ║  csv_read, data_quality, preprocess, compute_k_metrics, kmeans,           ║
+# ║  dr_<metode>, silhouette_samples, figure_scatter, figure_map              ║
+# ║                                                                           ║
+# ║  Tahap O(n²) (k-sweep dengan silhouette, t-SNE, UMAP, silhouette_samples) ║
+# ║  dilewati di atas --heavy-limit baris dan dicatat sebagai "skipped".      ║
+# ║                                                                           ║
+# ║  Contoh:                                                                  ║
+# ║    python bench/run_bench.py --sizes 10000,100000 --output bench.json     ║
+# ║    python bench/run_bench.py --output new.json --compare bench.json       ║
+# ║                                                                           ║
+# ╚═══════════════════════════════════════════════════════════════════════════╝
+import argparse
+import gc
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+import sklearn
+import pandas as pd
+from sklearn.metrics import silhouette_samples
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import data_quality  # noqa: E402
+import pipeline  # noqa: E402
+from synthetic import generate_homicide_data  # noqa: E402
+
+try:
+    import plotly
+    import plotly.express as px
+    PLOTLY_AVAILABLE = True
+except Exception:
+    PLOTLY_AVAILABLE = False
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+DEFAULT_SIZES = "10000,100000,1000000,5000000"
+HEAVY_STAGES = {"compute_k_metrics", "dr_t-SNE", "dr_UMAP", "silhouette_samples"}
+HOVER_COLS = ["uid", "report_date", "victim_race", "victim_age", "victim_sex", "state", "disposition", "lat", "lon"]
+
+
+def _rss_max_mb():
+    if resource is None:
+        return None
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    scale = 1 if sys.platform == "darwin" else 1024
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale / 1e6
+
+
+def measure(fn, track_memory=True):
+    gc.collect()
+    if track_memory:
+        tracemalloc.start()
+    t0 = time.perf_counter()
+    value, status, note = None, "ok", None
+    try:
+        value = fn()
+    except Exception as e:
+        status, note = "error", f"{type(e).__name__}: {e}"
+    seconds = time.perf_counter() - t0
+    peak_mb = None
+    if track_memory:
+        peak_mb = tracemalloc.get_traced_memory()[1] / 1e6
+        tracemalloc.stop()
+    return value, {"seconds": round(seconds, 4), "peak_mb": None if peak_mb is None else round(peak_mb, 2),
+                   "rss_max_mb": _rss_max_mb(), "status": status, "note": note}
+
+
+def build_figures(dfp):
+    hover_cols = [c for c in HOVER_COLS if c in dfp.columns]
+    color = dfp["cluster"].astype(str)
+
+    def scatter():
+        fig = px.scatter(dfp, x="_x", y="_y", color=color, hover_data=hover_cols, title="Visualisasi Klaster (2D)")
+        return len(fig.to_json())
+
+    def mapbox():
+        df_map = dfp.dropna(subset=["lat", "lon"])
+        scatter_map = getattr(px, "scatter_mapbox", None) or px.scatter_map
+        fig = scatter_map(df_map, lat="lat", lon="lon", color=df_map["cluster"].astype(str),
+                          hover_data=hover_cols, zoom=10, height=600)
+        return len(fig.to_json())
+
+    return scatter, mapbox
+
+
+def bench_size(n_rows, args, data_dir):
+    results = []
+
+    def record(stage, info, **extra):
+        row = {"rows": n_rows, "stage": stage, **info, **extra}
+        results.append(row)
+        peak = "-" if row.get("peak_mb") is None else f"{row['peak_mb']:.1f} MB"
+        secs = "-" if row.get("seconds") is None else f"{row['seconds']:.3f}s"
+        print(f"  {stage:<20} {row['status']:<8} {secs:>10}  peak {peak}"
+              + (f"  ({row['note']})" if row.get("note") else ""), flush=True)
+
+    def skipped(stage, reason):
+        record(stage, {"seconds": None, "peak_mb": None, "rss_max_mb": None, "status": "skipped", "note": reason})
+
+    print(f"== {n_rows:,} baris ==", flush=True)
+    csv_path = Path(data_dir) / f"synthetic-{n_rows}-{args.seed}.csv"
+    if not csv_path.exists():
+        df_gen, info = measure(lambda: generate_homicide_data(n_rows, seed=args.seed), track_memory=False)
+        df_gen.to_csv(csv_path, index=False)
+        del df_gen
+        record("generate", info)
+
+    track = not args.no_memory
+    heavy_ok = n_rows <= args.heavy_limit
+    heavy_reason = f"rows > --heavy-limit {args.heavy_limit}"
+
+    df, info = measure(lambda: pipeline.robust_read_csv(csv_path), track)
+    record("csv_read", info)
+    if df is None:
+        return results
+
+    _, info = measure(lambda: data_quality.profile_frame(df), track)
+    record("data_quality", info)
+
+    features = [c for c in pipeline.DEFAULT_FEATURES if c in df.columns]
+    out, info = measure(lambda: pipeline.preprocess_with_options(df, features), track)
+    record("preprocess", info)
+    if out is None or out[1] is None:
+        return results
+    dfp, X, feature_cols = out
+    print(f"  X: {X.shape[0]:,} x {X.shape[1]} ({X.nbytes / 1e6:.1f} MB)", flush=True)
+
+    k = args.k
+    if heavy_ok:
+        metrics, info = measure(lambda: pipeline.compute_k_metrics(X, k_min=2, k_max=args.k_max), track)
+        record("compute_k_metrics", info, k_max=args.k_max)
+        if metrics is not None:
+            k, _ = pipeline.suggest_k(*metrics)
+    else:
+        skipped("compute_k_metrics", heavy_reason)
+
+    labels, info = measure(lambda: pipeline.fit_kmeans(X, k), track)
+    record("kmeans", info, k=int(k))
+    if labels is None:
+        return results
+
+    coords = None
+    for method in args.dr:
+        if method not in pipeline.DR_METHODS:
+            skipped(f"dr_{method}", "metode tidak tersedia")
+            continue
+        if f"dr_{method}" in HEAVY_STAGES and not heavy_ok:
+            skipped(f"dr_{method}", heavy_reason)
+            continue
+        c, info = measure(lambda: pipeline.reduce_dimensions(X, method), track)
+        record(f"dr_{method}", info)
+        if coords is None and c is not None:
+            coords = c
+
+    if heavy_ok and len(set(labels)) > 1:
+        _, info = measure(lambda: silhouette_samples(X, labels), track)
+        record("silhouette_samples", info)
+    else:
+        skipped("silhouette_samples", heavy_reason if not heavy_ok else "hanya 1 klaster")
+
+    if not PLOTLY_AVAILABLE:
+        skipped("figure_scatter", "plotly tidak terpasang")
+        skipped("figure_map", "plotly tidak terpasang")
+    elif coords is None:
+        skipped("figure_scatter", "tidak ada koordinat 2D")
+        skipped("figure_map", "tidak ada koordinat 2D")
+    else:
+        dfp = dfp.assign(cluster=labels, _x=coords[:, 0], _y=coords[:, 1])
+        scatter, mapbox = build_figures(dfp)
+        nbytes, info = measure(scatter, track)
+        record("figure_scatter", info, json_bytes=nbytes)
+        nbytes, info = measure(mapbox, track)
+        record("figure_map", info, json_bytes=nbytes)
+    return results
+
+
+def environment():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                                text=True, timeout=10).stdout.strip() or None
+    except Exception:
+        commit = None
+    return {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "git_commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "sklearn": sklearn.__version__,
+        "plotly": plotly.__version__ if PLOTLY_AVAILABLE else None,
+    }
+
+
+def compare(current, baseline_path):
+    with open(baseline_path, encoding="utf-8") as fh:
+        baseline = json.load(fh)
+    base = {(r["rows"], r["stage"]): r for r in baseline["results"]}
+    print(f"\nPerbandingan dengan {baseline_path} (commit {baseline['meta'].get('git_commit')}):")
+    print(f"  {'rows':>9} {'stage':<20} {'base s':>9} {'new s':>9} {'speedup':>8} {'base MB':>9} {'new MB':>9}")
+    for r in current:
+        b = base.get((r["rows"], r["stage"]))
+        if b is None or r["status"] != "ok" or b["status"] != "ok":
+            continue
+        speedup = b["seconds"] / r["seconds"] if r["seconds"] else float("inf")
+        fmt = lambda v: "-" if v is None else f"{v:.1f}"
+        print(f"  {r['rows']:>9} {r['stage']:<20} {b['seconds']:>9.3f} {r['seconds']:>9.3f} {speedup:>7.2f}x"
+              f" {fmt(b.get('peak_mb')):>9} {fmt(r.get('peak_mb')):>9}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark tahap pipeline clustering pada data sintetis")
+    parser.add_argument("--sizes", default=DEFAULT_SIZES, help="Jumlah baris, dipisah koma (default: %(default)s)")
+    parser.add_argument("--dr", default=",".join(pipeline.DR_METHODS), help="Metode DR yang diukur (default: %(default)s)")
+    parser.add_argument("--k", type=int, default=4, help="K untuk kmeans bila k-sweep dilewati (default: %(default)s)")
+    parser.add_argument("--k-max", type=int, default=8)
+    parser.add_argument("--heavy-limit", type=int, default=100000,
+                        help="Lewati tahap O(n²) di atas jumlah baris ini (default: %(default)s)")
+    parser.add_argument("--no-memory", action="store_true", help="Tanpa tracemalloc (waktu lebih akurat)")
+    parser.add_argument("--data-dir", default=None, help="Folder cache CSV sintetis (default: folder sementara)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default="bench_results.json", help="File JSON hasil (default: %(default)s)")
+    parser.add_argument("--compare", default=None, help="File JSON hasil sebelumnya untuk dibandingkan")
+    args = parser.parse_args(argv)
+    args.dr = [m.strip() for m in args.dr.split(",") if m.strip()]
+    sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+
+    tmp = None
+    data_dir = args.data_dir
+    if data_dir is None:
+        tmp = tempfile.TemporaryDirectory(prefix="bench-homicide-")
+        data_dir = tmp.name
+    Path(data_dir).mkdir(parents=True, exist_ok=True)
+
+    report = {"meta": {**environment(), "args": {k: v for k, v in vars(args).items() if k != "compare"}},
+              "results": []}
+    try:
+        for n in sizes:
+            report["results"].extend(bench_size(n, args, data_dir))
+            # tulis setelah tiap ukuran supaya run panjang yang terhenti tetap punya hasil
+            with open(args.output, "w", encoding="utf-8") as fh:
+                json.dump(report, fh, indent=2)
+    finally:
+        if tmp is not None:
+            tmp.cleanup()
+    results = report["results"]
+    print(f"\nHasil disimpan di {args.output}")
+    if args.compare:
+        compare(results, args.compare)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
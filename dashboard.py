@@ -17,7 +17,7 @@
 # ║  Library yang digunakan:                                                  ║
 # ║  - Streamlit: Framework dashboard                                         ║
 # ║  - Pandas, NumPy: Manipulasi data                                        ║
-# ║  - Scikit-learn: K-Means, PCA, t-SNE, StandardScaler                     ║
+# ║  - Scikit-learn: K-Means, PCA, t-SNE, StandardScaler (via pipeline.py)   ║
 # ║  - UMAP: Dimensionality reduction (opsional)                              ║
 # ║  - Plotly: Visualisasi interaktif                                         ║
 # ║                                                                           ║
@@ -28,21 +28,27 @@ import streamlit as st
 import pandas as pd
 import numpy as np
 from pathlib import Path
-import io
-
-# ML / DR
-from sklearn.cluster import KMeans
-from sklearn.preprocessing import StandardScaler
-from sklearn.decomposition import PCA
-from sklearn.metrics import silhouette_score, silhouette_samples
-from sklearn.manifold import TSNE
-
-# optional UMAP
-try:
-    import umap.umap_ as umap
-    UMAP_AVAILABLE = True
-except Exception:
-    UMAP_AVAILABLE = False
+
+# ML / DR (pipeline inti ada di pipeline.py, dipakai juga oleh batch_run.py)
+from sklearn.metrics import silhouette_samples
+import pipeline
+from pipeline import (
+    DR_METHODS, DEFAULT_FEATURES, PROFILE_CATEGORICALS,
+    robust_read_csv, read_csv_cached, suggest_k, profile_numeric_features, compute_cluster_profile,
+    reduce_dimensions, fit_kmeans, score_clustering, load_results,
+)
+import assets
+import data_quality
+import diagnostics
+import encoders
+import export
+import geo
+import incremental
+import jobs
+import partitions
+import result_cache
+import run_store
+import temporal
 
 # Viz
 import plotly.express as px
@@ -492,22 +498,6 @@ st.markdown(
         transform: translateY(-1px);
         box-shadow: 0 6px 14px rgba(0, 0, 0, 0.45);
     }
-    /* Large HTML download button (used when embedding inside card) */
-    .download-btn-large {
-        display: inline-flex;
-        align-items: center;
-        gap: 10px;
-        padding: 14px 22px;
-        font-size: 1.05rem;
-        border-radius: 10px;
-        border: 1px solid rgba(239, 68, 68, 0.25);
-        background: linear-gradient(135deg, rgba(20,20,20,0.95), rgba(30,30,30,0.9));
-        color: #fff;
-        text-decoration: none;
-    }
-    .download-btn-large svg { stroke: #ef4444; }
-    .download-btn-large:hover { transform: translateY(-2px); box-shadow: 0 8px 20px rgba(0,0,0,0.5); }
-
     /* Metric Cards */
     .metric-card {
         background: linear-gradient(135deg, rgba(25, 25, 25, 0.95) 0%, rgba(35, 35, 35, 0.9) 100%);
@@ -641,21 +631,31 @@ st.markdown("""<div style="display: flex; align-items: center; gap: 16px; margin
 # ║                    SECTION 5: SESSION STATE INIT                          ║
 # ║                                                                           ║
 # ║  Inisialisasi state aplikasi untuk menyimpan:                            ║
-# ║  - df_raw: Dataset asli dari CSV                                         ║
-# ║  - df_cleaned: Dataset setelah cleaning                                  ║
-# ║  - df_proc: Dataset setelah processing dengan cluster labels             ║
+# ║  - df_raw: Dataset asli dari CSV (satu-satunya DataFrame di session)     ║
+# ║  - clean_layer: Layer cleaning (baris + nilai pengisi) di atas df_raw    ║
+# ║  - embedding: Koordinat 2D hasil reduksi dimensi                         ║
+# ║    (data cleaning / data + klaster dibangun lazy: cleaned_frame(),       ║
+# ║    clustered_frame())                                                    ║
 # ║  - X_scaled: Data yang sudah di-scale untuk clustering                   ║
 # ║  - feature_cols: Kolom fitur yang digunakan                              ║
 # ║  - cluster_labels: Hasil label clustering                                ║
 # ║  - final_k, suggested_k: Nilai K untuk clustering                        ║
+# ║  - cluster_profile: Profil per klaster (dihitung sekali per run)         ║
+# ║  - diagnostics_log: Waktu & memori proses tiap tahap (panel Diagnostik)  ║
+# ║  - jobs: Job latar belakang per jenis ("k_metrics", "clustering")        ║
+# ║  - k_metrics, silhouette_values: Hasil job yang ditampilkan ulang        ║
+# ║  - run_params: Opsi preprocessing run terakhir (dipakai mode append)     ║
+# ║  - incremental: Model append (incremental.py) untuk label saat ini       ║
+# ║  - temporal: Hasil clustering per jendela waktu (+ X_scaled acuannya)    ║
+# ║  - partitions: Hasil clustering per state / kota (+ X_scaled acuannya)   ║
 # ║                                                                           ║
 # ╚═══════════════════════════════════════════════════════════════════════════╝
 if "df_raw" not in st.session_state:
     st.session_state.df_raw = pd.DataFrame()
-if "df_cleaned" not in st.session_state:
-    st.session_state.df_cleaned = pd.DataFrame()
-if "df_proc" not in st.session_state:
-    st.session_state.df_proc = pd.DataFrame()
+if "clean_layer" not in st.session_state:
+    st.session_state.clean_layer = None
+if "embedding" not in st.session_state:
+    st.session_state.embedding = None
 if "X_scaled" not in st.session_state:
     st.session_state.X_scaled = None
 if "feature_cols" not in st.session_state:
@@ -672,162 +672,368 @@ if "suggested_k" not in st.session_state:
     st.session_state.suggested_k = None
 if "suggested_method" not in st.session_state:
     st.session_state.suggested_method = None
+if "cluster_profile" not in st.session_state:
+    st.session_state.cluster_profile = None
+if "diagnostics_log" not in st.session_state:
+    st.session_state.diagnostics_log = []
+if "jobs" not in st.session_state:
+    st.session_state.jobs = {}
+if "k_metrics" not in st.session_state:
+    st.session_state.k_metrics = None
+if "silhouette_values" not in st.session_state:
+    st.session_state.silhouette_values = None
+if "run_params" not in st.session_state:
+    st.session_state.run_params = None
+if "incremental" not in st.session_state:
+    st.session_state.incremental = None
+if "temporal" not in st.session_state:
+    st.session_state.temporal = None
+if "partitions" not in st.session_state:
+    st.session_state.partitions = None
+if "run_save" not in st.session_state:
+    st.session_state.run_save = None
 
 # ╔═══════════════════════════════════════════════════════════════════════════╗
 # ║                                                                           ║
 # ║                     SECTION 6: UTILITY FUNCTIONS                          ║
 # ║                                                                           ║
-# ║  Fungsi-fungsi helper:                                                   ║
-# ║  - robust_read_csv(): Membaca CSV dengan berbagai encoding               ║
-# ║  - load_csv(): Wrapper cached untuk baca CSV                             ║
-# ║  - detect_data_quality_issues(): Deteksi nilai kosong                    ║
-# ║  - recommend_cleaning(): Rekomendasi pembersihan data                    ║
-# ║  - preprocess_with_options(): Preprocessing dengan opsi cleaning         ║
-# ║  - compute_k_metrics(): Hitung Elbow & Silhouette                        ║
-# ║  - suggest_k(): Saran K optimal                                          ║
+# ║  Fungsi-fungsi helper (fungsi inti pipeline ada di pipeline.py):         ║
+# ║  - fit_cleaning(), encode_features(): Wrapper cached untuk preprocessing ║
+# ║  - compute_k_metrics(): Wrapper cached untuk Elbow & Silhouette          ║
+# ║    (semuanya lewat cache bersama result_cache.py)                        ║
+# ║  - cleaned_frame(), clustered_frame(): View data dari df_raw + layer     ║
+# ║  - profile_data(): Profil kualitas data (data_quality.py), cached       ║
+# ║  - add_cluster_centroids(): Marker centroid klaster di peta              ║
+# ║  - geo_index(), geo_query_panel(): Query radius / terdekat / bbox (geo.py)║
+# ║  - set_raw_data(): Ganti df_raw (upload / contoh dataset), reset hasil   ║
+# ║  - store_results(): Simpan hasil run ke session state                    ║
+# ║  - save_run(): Simpan hasil clustering ke riwayat run (run_store.py)      ║
+# ║  - append_cases(): Tambah kasus baru ke klaster yang ada (mode append)   ║
+# ║  - show_drift(): Indikator drift / saran refit mode append               ║
+# ║  - apply_finished_jobs(): Pindahkan hasil job latar belakang ke session  ║
+# ║  - job_progress(): Fragment polling progress job + tombol batal          ║
+# ║  - show_job_status(): Pesan gagal / dibatalkan / fallback budget          ║
 # ║                                                                           ║
 # ╚═══════════════════════════════════════════════════════════════════════════╝
-def robust_read_csv(path_or_buffer, try_encodings=None):
-    if try_encodings is None:
-        try_encodings = ["utf-8", "utf-8-sig", "cp1252", "latin-1", "iso-8859-1"]
-    if isinstance(path_or_buffer, (str, Path)):
-        for enc in try_encodings:
-            try:
-                return pd.read_csv(path_or_buffer, encoding=enc)
-            except Exception:
-                pass
-        with open(path_or_buffer, "rb") as fh:
-            text = io.TextIOWrapper(fh, encoding="utf-8", errors="replace")
-            return pd.read_csv(text)
+# Cache hasil bersama lintas sesi dengan batas byte (result_cache.py, env DASHBOARD_CACHE_MB);
+# menggantikan st.cache_data yang menyimpan setiap kombinasi opsi tanpa batas
+get_result_cache = st.cache_resource(result_cache.make_cache)
+fit_cleaning = get_result_cache().memoize(pipeline.fit_cleaning)
+encode_features = get_result_cache().memoize(pipeline.encode_features)
+# view yang dibangun dari layer juga lewat cache bersama: session hanya menyimpan df_raw + layer
+clean_view = get_result_cache().memoize(pipeline.apply_cleaning)
+cluster_view = get_result_cache().memoize(pipeline.attach_clusters)
+# profil kualitas data ikut cache bersama, dengan kunci dataset yang sama
+profile_data = get_result_cache().memoize(data_quality.profile_frame)
+compute_k_metrics = get_result_cache().memoize(pipeline.compute_k_metrics, ignore=("progress",))
+# BallTree haversine dibangun sekali per isi kolom lat/lon, dipakai ulang oleh semua query di peta
+geo_index = get_result_cache().memoize(geo.build_index)
+# satu thread pool untuk semua sesi; job berjalan terus walau script di-rerun atau pindah halaman
+get_executor = st.cache_resource(jobs.make_executor)
+# riwayat run di disk (run_store.py, env DASHBOARD_RUN_STORE / DASHBOARD_RUN_STORE_MB): tetap ada setelah refresh / deploy ulang
+get_run_store = st.cache_resource(run_store.make_store)
+data_fingerprint = get_result_cache().memoize(run_store.fingerprint)
+
+def add_cluster_centroids(fig_map, profile):
+    # Centroid markers on the map; hovering a centroid shows the cluster stats from the profile
+    import plotly.graph_objects as go
+    summary = profile["summary"]
+    if "mean_lat" not in summary.columns or "mean_lon" not in summary.columns:
+        return
+    clusters = summary.reset_index()
+    clusters["mean_age"] = clusters["mean_age"].round(2) if "mean_age" in clusters.columns else ""
+    for cat in PROFILE_CATEGORICALS:
+        if f"top_{cat}" not in clusters.columns:
+            clusters[f"top_{cat}"] = ""
+    customdata = clusters[["cluster","count","mean_age","top_victim_race","top_victim_sex","top_state","top_disposition"]].values
+    hovertemplate = ("Cluster: %{customdata[0]}<br>Count: %{customdata[1]}<br>Mean age: %{customdata[2]}<br>"
+                     "Top race: %{customdata[3]}<br>Top sex: %{customdata[4]}<br>Top state: %{customdata[5]}<br>"
+                     "Top disposition: %{customdata[6]}<extra></extra>")
+    fig_map.add_trace(go.Scattermapbox(
+        lat=clusters["mean_lat"],
+        lon=clusters["mean_lon"],
+        mode="markers+text",
+        marker=dict(size=18, color="#ffffff", opacity=0.9, symbol="circle"),
+        text=clusters["cluster"].astype(str),
+        textposition="middle center",
+        hovertemplate=hovertemplate,
+        customdata=customdata,
+        showlegend=False
+    ))
+
+def cleaned_frame():
+    # Data setelah cleaning = df_raw + clean_layer; df_raw sendiri bila belum pra-proses
+    layer = st.session_state.clean_layer
+    if layer is None:
+        return st.session_state.df_raw
+    return clean_view(st.session_state.df_raw, layer)
+
+def clustered_frame():
+    # Data cleaning + cluster, _x, _y; None bila belum ada hasil clustering
+    if st.session_state.cluster_labels is None or st.session_state.embedding is None:
+        return None
+    return cluster_view(cleaned_frame(), st.session_state.cluster_labels, st.session_state.embedding)
+
+def set_raw_data(df, source):
+    # Dataset baru: layer & hasil yang dibangun di atas df_raw lama tidak berlaku lagi
+    st.session_state.df_raw = df
+    st.session_state.raw_source = source
+    st.session_state.clean_layer = None
+    st.session_state.X_scaled = None
+    st.session_state.cluster_labels = None
+    st.session_state.embedding = None
+    st.session_state.cluster_profile = None
+    st.session_state.silhouette_values = None
+    st.session_state.k_metrics = None
+    st.session_state.run_params = None
+    st.session_state.incremental = None
+
+def store_results(result):
+    # Isi session state dari hasil run (mis. folder output batch_run.py) supaya halaman
+    # Analisis, Visualisasi dan Hasil langsung tampil tanpa menghitung ulang
+    # Data hasil run sudah bersih: jadi df_raw baru tanpa layer cleaning, klaster dari labels + coords
+    st.session_state.df_raw = result["df_proc"].drop(columns=["cluster", "_x", "_y"], errors="ignore")
+    st.session_state.clean_layer = None
+    st.session_state.embedding = np.asarray(result["coords"])
+    st.session_state.X_scaled = result["X_scaled"]
+    st.session_state.feature_cols = result["feature_cols"]
+    st.session_state.selected_features = result["params"]["features"]
+    st.session_state.cluster_labels = np.asarray(result["labels"])
+    st.session_state.final_k = result["final_k"]
+    st.session_state.silhouette_score_val = result["silhouette"]
+    st.session_state.cluster_profile = result["profile"]
+    st.session_state.silhouette_values = None
+    st.session_state.run_params = result["params"]
+    st.session_state.incremental = None
+    if result["k_method"] != "manual":
+        st.session_state.suggested_k = result["final_k"]
+        st.session_state.suggested_method = result["k_method"]
+    if result["ks"] is not None:
+        st.session_state.k_metrics = {"ks": result["ks"], "inertias": result["inertias"], "silhouettes": result["silhouettes"]}
+
+def source_label():
+    # Nama dataset untuk riwayat run: file contoh / upload, atau run asal bila data dimuat dari riwayat
+    source = st.session_state.get("raw_source")
+    if not source:
+        return ""
+    if source[0] == "sample":
+        return os.path.basename(source[1])
+    return str(source[-1])
+
+def out_of_core_note(result):
+    # Hasil batch_run.py --out-of-core: df_proc / embedding hanya sampel, label seluruh baris di file terpisah
+    info = result["params"].get("out_of_core")
+    if not info:
+        return
+    st.markdown(f"""<div class="bullet-item" style="background: rgba(59, 130, 246, 0.1); border-left-color: #3b82f6;"><svg xmlns="http://www.w3.org/2000/svg" width="18" height="18" viewBox="0 0 24 24" fill="none" stroke="#60a5fa" stroke-width="2" stroke-linecap="round" stroke-linejoin="round"><circle cx="12" cy="12" r="10"></circle><line x1="12" y1="16" x2="12" y2="12"></line><line x1="12" y1="8" x2="12.01" y2="8"></line></svg><span style="color: #bfdbfe;">Run out-of-core: tampilan memakai sampel {info['sample_rows']:,} dari {info['rows']:,} baris ({info['input']}); profil klaster dari seluruh data, label seluruh baris di <code>{info['labels_file']}</code>.</span></div>""", unsafe_allow_html=True)
+
+
+def save_run(result):
+    # Hasil job clustering -> riwayat run di disk (run_store.py); ditulis di thread pool supaya rerun
+    # tidak menunggu parquet/npy selesai ditulis
+    params = {"features": list(st.session_state.selected_features or []), **(st.session_state.run_params or {}),
+              **result["params"]}
+    labels = np.asarray(result["labels"])
+    final_k = params["k"]
+    k_method = "manual"
+    if params["engine"] == "dbscan":
+        # K dari halaman Analisis tidak dipakai DBSCAN: simpan jumlah klaster yang ditemukan
+        final_k = int(len(np.unique(labels[labels >= 0])))
+    elif st.session_state.suggested_method and final_k == st.session_state.suggested_k:
+        k_method = st.session_state.suggested_method
+    k_metrics = st.session_state.k_metrics or {}
+    run = {"df_proc": clustered_frame(), "X_scaled": st.session_state.X_scaled, "feature_cols": st.session_state.feature_cols,
+           "labels": labels, "coords": result["coords"], "final_k": final_k, "k_method": k_method,
+           "ks": k_metrics.get("ks"), "inertias": k_metrics.get("inertias"), "silhouettes": k_metrics.get("silhouettes"),
+           "silhouette": result["silhouette"], "profile": result["profile"], "params": params}
+    st.session_state.run_save = get_executor().submit(get_run_store().save, run, data=st.session_state.df_raw,
+                                                      source=source_label(), silhouette_values=result["silhouette_values"])
+
+def incremental_model():
+    # Model append untuk hasil clustering saat ini; None bila model dibuat untuk label lain
+    inc = st.session_state.incremental
+    if inc is None or inc["labels"] is not st.session_state.cluster_labels:
+        return None
+    return inc["model"]
+
+def append_cases(df_new, update_centroids=False):
+    # Kasus baru ditempatkan ke centroid & embedding yang ada (incremental.py), lalu digabung ke session:
+    # data gabungan jadi df_raw baru tanpa layer (seperti store_results), label & embedding disambung
+    model = incremental_model()
+    if model is None:
+        params = {"features": st.session_state.selected_features, **(st.session_state.run_params or {})}
+        result = {"df_proc": cleaned_frame(), "X_scaled": st.session_state.X_scaled,
+                  "feature_cols": st.session_state.feature_cols, "labels": st.session_state.cluster_labels,
+                  "coords": st.session_state.embedding, "params": params}
+        model = incremental.IncrementalModel.from_result(result, layer=st.session_state.clean_layer)
+    batch = model.append(df_new, update_centroids=update_centroids)
+    labels = np.concatenate([st.session_state.cluster_labels, batch["labels"]])
+    st.session_state.df_raw = pd.concat([cleaned_frame(), batch["df_proc"].drop(columns=["cluster", "_x", "_y"])],
+                                        ignore_index=True)
+    st.session_state.clean_layer = None
+    st.session_state.X_scaled = np.vstack([st.session_state.X_scaled, batch["X_scaled"]])
+    st.session_state.embedding = np.vstack([st.session_state.embedding, batch["coords"]])
+    st.session_state.cluster_labels = labels
+    st.session_state.cluster_profile = model.profile()
+    # silhouette per baris dihitung ulang sekali oleh job latar belakang saat halaman Visualisasi dibuka
+    st.session_state.silhouette_values = None
+    st.session_state.incremental = {"labels": labels, "model": model}
+    return batch
+
+def request_silhouette(X, labels):
+    # Label tanpa silhouette per baris (hasil append / run tanpa silhouette.npy): satu job per X_scaled,
+    # exact dengan budget lalu fallback sampel, bukan silhouette_samples di thread script setiap rerun
+    job = st.session_state.jobs.get("silhouette")
+    if job is not None and job.inputs is X:
+        return
+    job = jobs.Job("silhouette", "Silhouette per baris", ["silhouette_samples"], page=page, inputs=X)
+    st.session_state.jobs["silhouette"] = jobs.submit(get_executor(), job, jobs.silhouette_job, X, labels,
+                                                      cache=get_result_cache())
+
+def show_drift(drift):
+    # Indikator drift mode append: kuning bila refit penuh disarankan
+    ratio = f"x{drift['distance_ratio']:.2f}" if drift["distance_ratio"] is not None else "—"
+    shift = f"{drift['cluster_shift']:.2f}" if drift["cluster_shift"] is not None else "—"
+    text = (f"<strong>Drift</strong> ({drift['appended']} baris sejak clustering, {drift['growth']:.0%} dari data fit): "
+            f"jarak ke centroid {ratio}, pergeseran proporsi klaster {shift}, pergeseran centroid {drift['centroid_shift']:.2f}")
+    if drift["refit"]:
+        st.markdown(f"""<div class="bullet-item" style="background: rgba(245, 158, 11, 0.12); border-left-color: #f59e0b;"><svg xmlns="http://www.w3.org/2000/svg" width="18" height="18" viewBox="0 0 24 24" fill="none" stroke="#f59e0b" stroke-width="2" stroke-linecap="round" stroke-linejoin="round"><path d="M10.29 3.86L1.82 18a2 2 0 0 0 1.71 3h16.94a2 2 0 0 0 1.71-3L13.71 3.86a2 2 0 0 0-3.42 0z"></path><line x1="12" y1="9" x2="12" y2="13"></line><line x1="12" y1="17" x2="12.01" y2="17"></line></svg><span style="color: #fde68a;">{text}. Refit penuh disarankan: {'; '.join(drift['reasons'])}.</span></div>""", unsafe_allow_html=True)
     else:
-        data = path_or_buffer.read()
-        for enc in try_encodings:
-            try:
-                return pd.read_csv(io.BytesIO(data), encoding=enc)
-            except Exception:
-                pass
-        txt = data.decode("utf-8", errors="replace")
-        return pd.read_csv(io.StringIO(txt))
-
-
-
-def detect_data_quality_issues(df):
-    issues = {}
-    for col in df.columns:
-        missing = df[col].isna().sum()
-        if missing > 0:
-            issues[col] = {"type": "missing", "count": missing, "pct": 100*missing/len(df)}
-    return issues
-
-def recommend_cleaning(df):
-    recs = []
-    issues = detect_data_quality_issues(df)
-    
-    for col, issue in issues.items():
-        if issue['type'] == 'missing':
-            # Check if column is numeric
-            if col in ["victim_age"]:
-                recs.append(f"📌 **{col}**: {issue['count']} nilai kosong. Rekomendasi: isi dengan median atau hapus baris.")
-            elif df[col].dtype.kind in "biufc":  # numeric columns
-                recs.append(f"📌 **{col}**: {issue['count']} nilai kosong. Rekomendasi: isi dengan median/mean atau hapus baris.")
-            else:  # categorical columns
-                recs.append(f"📌 **{col}**: {issue['count']} nilai kosong. Rekomendasi: isi dengan nilai 'Unknown' atau hapus baris.")
-    
-    return recs
-
-@st.cache_data
-def preprocess_with_options(df_in, features, fill_numeric_method="median", fill_categorical_method="Unknown", remove_duplicates=False, remove_missing=False):
-    dfp = df_in.copy()
-    
-    # remove duplicates
-    if remove_duplicates:
-        dfp = dfp.drop_duplicates()
-    
-    # Handle all numeric columns dynamically
-    for col in dfp.columns:
-        if dfp[col].dtype.kind in "biufc":  # numeric columns
-            # Clean numeric data
-            dfp[col] = pd.to_numeric(dfp[col].replace({"kosong": np.nan, "": np.nan}), errors="coerce")
-            
-            # Fill missing values based on method
-            if dfp[col].isna().sum() > 0:
-                if fill_numeric_method == "median":
-                    dfp[col] = dfp[col].fillna(dfp[col].median())
-                elif fill_numeric_method == "mean":
-                    dfp[col] = dfp[col].fillna(dfp[col].mean())
-                elif fill_numeric_method == "0":
-                    dfp[col] = dfp[col].fillna(0)
-    
-    # Handle all categorical/string columns dynamically
-    for col in dfp.columns:
-        if dfp[col].dtype == 'object' or dfp[col].dtype.name == 'category':
-            if dfp[col].isna().sum() > 0:
-                if fill_categorical_method == "Unknown":
-                    dfp[col] = dfp[col].fillna("Unknown").astype(str)
-                elif fill_categorical_method == "mode":
-                    mode_val = dfp[col].mode()
-                    if len(mode_val) > 0:
-                        dfp[col] = dfp[col].fillna(mode_val[0]).astype(str)
-                    else:
-                        dfp[col] = dfp[col].fillna("Unknown").astype(str)
-                else:
-                    dfp[col] = dfp[col].astype(str)
-    
-    # remove rows with missing in selected features
-    if remove_missing:
-        dfp = dfp.dropna(subset=features)
-    
-    X_parts = []
-    cols = []
-    for f in features:
-        if f not in dfp.columns:
+        st.markdown(f"""<div class="bullet-item"><svg xmlns="http://www.w3.org/2000/svg" width="18" height="18" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2" stroke-linecap="round" stroke-linejoin="round"><circle cx="12" cy="12" r="10"></circle><line x1="12" y1="16" x2="12" y2="12"></line><line x1="12" y1="8" x2="12.01" y2="8"></line></svg><span>{text}. Klaster masih sesuai, belum perlu refit.</span></div>""", unsafe_allow_html=True)
+
+@st.fragment
+def geo_query_panel(dfp, lat_col, lon_col, hover_cols):
+    # Query spasial di atas indeks geo.py; hanya fragment ini yang dijalankan ulang saat input query berubah
+    index = geo_index(dfp[lat_col], dfp[lon_col])
+    valid = dfp.iloc[index.rows]
+    col_q = st.columns([1, 1, 1])
+    with col_q[0]:
+        mode = st.radio("Query", options=["radius", "nearest", "bbox"], horizontal=True,
+                        format_func={"radius": "Radius", "nearest": "Terdekat", "bbox": "Kotak"}.get)
+    with col_q[1]:
+        clusters = st.multiselect("Filter klaster", options=sorted(dfp["cluster"].unique().tolist()))
+    with col_q[2]:
+        dispositions = st.multiselect("Filter disposition", options=sorted(dfp["disposition"].dropna().unique().tolist())) if "disposition" in dfp.columns else []
+
+    col_p = st.columns(4)
+    if mode == "bbox":
+        with col_p[0]:
+            lat_min = st.number_input("Lat min", value=float(valid[lat_col].quantile(0.4)), format="%.4f")
+        with col_p[1]:
+            lat_max = st.number_input("Lat max", value=float(valid[lat_col].quantile(0.6)), format="%.4f")
+        with col_p[2]:
+            lon_min = st.number_input("Lon min", value=float(valid[lon_col].quantile(0.4)), format="%.4f")
+        with col_p[3]:
+            lon_max = st.number_input("Lon max", value=float(valid[lon_col].quantile(0.6)), format="%.4f")
+    else:
+        # titik pusat: koordinat manual, atau lokasi kasus bila uid diisi
+        with col_p[0]:
+            center_uid = st.text_input("Pusat dari uid kasus (opsional)") if "uid" in dfp.columns else ""
+        center = valid[valid["uid"].astype(str) == center_uid.strip()] if center_uid.strip() else valid.iloc[:0]
+        if center_uid.strip() and center.empty:
+            st.warning(f"uid '{center_uid.strip()}' tidak ditemukan atau tanpa koordinat.")
+        default = center.iloc[0] if not center.empty else valid.iloc[0]
+        with col_p[1]:
+            lat = st.number_input("Lat", value=float(default[lat_col]), format="%.5f", disabled=not center.empty)
+        with col_p[2]:
+            lon = st.number_input("Lon", value=float(default[lon_col]), format="%.5f", disabled=not center.empty)
+        if not center.empty:
+            lat, lon = float(default[lat_col]), float(default[lon_col])
+        with col_p[3]:
+            if mode == "radius":
+                radius_km = st.number_input("Radius (km)", min_value=0.1, max_value=500.0, value=2.0, step=0.5)
+            else:
+                k = st.number_input("Jumlah kasus", min_value=1, max_value=1000, value=10, step=5)
+
+    mask = geo.row_mask(dfp, clusters, dispositions)
+    t0 = time.perf_counter()
+    if mode == "radius":
+        rows, dist = index.radius(lat, lon, radius_km, mask)
+    elif mode == "nearest":
+        rows, dist = index.nearest(lat, lon, k, mask)
+    else:
+        rows, dist = index.bbox(lat_min, lat_max, lon_min, lon_max, mask)
+    elapsed_ms = (time.perf_counter() - t0) * 1000
+    found = dfp.iloc[rows].assign(distance_km=np.round(dist, 3))
+    st.caption(f"{len(found)} kasus ditemukan dalam {elapsed_ms:.1f} ms (indeks {len(index)} titik)")
+    if found.empty:
+        return
+    fig_q = px.scatter_mapbox(found, lat=lat_col, lon=lon_col, color=found["cluster"].astype(str),
+                              hover_data=hover_cols + ["distance_km"], zoom=11, height=420)
+    fig_q.update_layout(mapbox_style="open-street-map", margin={"r": 0, "t": 0, "l": 0, "b": 0})
+    st.plotly_chart(fig_q, use_container_width=True)
+    st.dataframe(found[["cluster"] + hover_cols + ([] if mode == "bbox" else ["distance_km"])], hide_index=True, use_container_width=True)
+
+def apply_finished_jobs():
+    # Dijalankan di thread script pada setiap rerun (halaman apa pun): job yang sudah selesai
+    # dipindahkan ke session state satu kali
+    for kind, job in st.session_state.jobs.items():
+        if job.applied or not job.done():
             continue
-        if dfp[f].dtype.kind in "biufc":
-            X_parts.append(dfp[[f]].astype(float))
-            cols.append(f)
-        else:
-            dummies = pd.get_dummies(dfp[f].astype(str), prefix=f)
-            X_parts.append(dummies)
-            cols += list(dummies.columns)
-    
-    if not X_parts:
-        return None, None, None
-    X = pd.concat(X_parts, axis=1).fillna(0)
-    scaler = StandardScaler()
-    X_scaled = scaler.fit_transform(X)
-    return dfp, X_scaled, cols
-
-@st.cache_data
-def compute_k_metrics(X, k_min=2, k_max=8, random_state=42):
-    ks = list(range(k_min, k_max+1))
-    inertias = []
-    silhouettes = []
-    for k in ks:
-        km = KMeans(n_clusters=k, random_state=random_state, n_init=10)
-        labels = km.fit_predict(X)
-        inertias.append(km.inertia_)
-        if len(set(labels)) > 1 and X.shape[0] > k:
-            try:
-                s = silhouette_score(X, labels)
-            except Exception:
-                s = None
-        else:
-            s = None
-        silhouettes.append(s)
-    return ks, inertias, silhouettes
-
-def suggest_k(ks, inertias, silhouettes):
-    valid_sil = [(k, s) for k, s in zip(ks, silhouettes) if s is not None]
-    if valid_sil:
-        best = max(valid_sil, key=lambda x: x[1])[0]
-        return best, "silhouette"
-    diffs = np.diff(inertias)
-    diffs2 = np.diff(diffs)
-    if len(diffs2) > 0:
-        elbow_idx = np.argmin(diffs2) + 2
-        if 2 <= elbow_idx <= len(ks):
-            return ks[elbow_idx-1], "elbow"
-    return ks[0], "default"
+        job.applied = True
+        st.session_state.diagnostics_log.extend(job.log)
+        del st.session_state.diagnostics_log[:-diagnostics.MAX_RECORDS]
+        # hasil dibuang bila gagal atau data sudah dipra-proses ulang selama job berjalan
+        if job.error() is not None or job.inputs is not st.session_state.X_scaled:
+            continue
+        result = job.result()
+        if kind == "k_metrics":
+            st.session_state.k_metrics = {"ks": result["ks"], "inertias": result["inertias"], "silhouettes": result["silhouettes"]}
+            st.session_state.suggested_k = result["suggested_k"]
+            st.session_state.suggested_method = result["suggested_method"]
+        elif kind == "clustering":
+            st.session_state.cluster_labels = result["labels"]
+            st.session_state.embedding = result["coords"]
+            st.session_state.silhouette_score_val = result["silhouette"]
+            st.session_state.silhouette_values = result["silhouette_values"]
+            st.session_state.cluster_profile = result["profile"]
+            # engine label saat ini (mode append / per waktu hanya untuk engine berbasis centroid)
+            st.session_state.run_params = {**(st.session_state.run_params or {}), "engine": result["params"]["engine"]}
+            save_run(result)
+        elif kind == "silhouette":
+            # dibuang bila label sudah berganti (clustering baru) selama job berjalan
+            if result["labels"] is st.session_state.cluster_labels:
+                st.session_state.silhouette_values = result["silhouette_values"]
+                if result["silhouette_values"] is not None:
+                    st.session_state.silhouette_score_val = float(np.nanmean(result["silhouette_values"]))
+        elif kind in ("temporal", "partitions"):
+            # hanya ditampilkan selama X_scaled yang sama masih dipakai
+            st.session_state[kind] = {"inputs": job.inputs, "result": result}
+
+def job_pending(kind):
+    job = st.session_state.jobs.get(kind)
+    return job is not None and not job.applied
+
+@st.fragment(run_every=1.0)
+def job_progress(kind):
+    # Polling progress job; begitu selesai rerun seluruh app supaya apply_finished_jobs() memindahkan hasilnya
+    job = st.session_state.jobs.get(kind)
+    if job is None or job.applied:
+        return
+    if job.done():
+        st.rerun()
+    snap = job.snapshot()
+    step = f" {snap['done']}/{snap['total']}" if snap["total"] else ""
+    message = f" ({snap['message']})" if snap["message"] else ""
+    st.progress(snap["fraction"], text=f"{job.name}: {snap['stage'] or 'menunggu worker'}{step}{message} — {snap['elapsed']:.0f}s")
+    if job.cancelled():
+        st.caption("Membatalkan... (berhenti di titik cek berikutnya)")
+    elif st.button("Batalkan", key=f"cancel_{kind}"):
+        job.cancel()
+
+def show_job_status(kind):
+    job = st.session_state.jobs.get(kind)
+    if job is None or not job.applied:
+        return
+    error = job.error()
+    if isinstance(error, jobs.JobCancelled):
+        st.markdown(f"""<div class="bullet-item" style="background: rgba(245, 158, 11, 0.15); border-left-color: #f59e0b;"><svg xmlns="http://www.w3.org/2000/svg" width="18" height="18" viewBox="0 0 24 24" fill="none" stroke="#f59e0b" stroke-width="2" stroke-linecap="round" stroke-linejoin="round"><path d="M10.29 3.86L1.82 18a2 2 0 0 0 1.71 3h16.94a2 2 0 0 0 1.71-3L13.71 3.86a2 2 0 0 0-3.42 0z"></path><line x1="12" y1="9" x2="12" y2="13"></line><line x1="12" y1="17" x2="12.01" y2="17"></line></svg><span style="color: #fde68a;">{job.name} dibatalkan. Hasil sebelumnya (jika ada) tetap dipakai.</span></div>""", unsafe_allow_html=True)
+    elif error is not None:
+        st.markdown(f"""<div class="bullet-item" style="background: rgba(239, 68, 68, 0.15); border-left-color: #ef4444;"><svg xmlns="http://www.w3.org/2000/svg" width="18" height="18" viewBox="0 0 24 24" fill="none" stroke="#ef4444" stroke-width="2" stroke-linecap="round" stroke-linejoin="round"><circle cx="12" cy="12" r="10"></circle><line x1="15" y1="9" x2="9" y2="15"></line><line x1="9" y1="9" x2="15" y2="15"></line></svg><span style="color: #fca5a5;">{job.name} gagal: {error}</span></div>""", unsafe_allow_html=True)
+    elif job.inputs is st.session_state.X_scaled:
+        # batas waktu tahap habis: sebutkan fallback yang dipakai
+        for note in job.fallbacks:
+            st.markdown(f"""<div class="bullet-item" style="background: rgba(245, 158, 11, 0.15); border-left-color: #f59e0b;"><svg xmlns="http://www.w3.org/2000/svg" width="18" height="18" viewBox="0 0 24 24" fill="none" stroke="#f59e0b" stroke-width="2" stroke-linecap="round" stroke-linejoin="round"><path d="M10.29 3.86L1.82 18a2 2 0 0 0 1.71 3h16.94a2 2 0 0 0 1.71-3L13.71 3.86a2 2 0 0 0-3.42 0z"></path><line x1="12" y1="9" x2="12" y2="13"></line><line x1="12" y1="17" x2="12.01" y2="17"></line></svg><span style="color: #fde68a;">Batas waktu: {note}</span></div>""", unsafe_allow_html=True)
 
 # ╔═══════════════════════════════════════════════════════════════════════════╗
 # ║                                                                           ║
@@ -841,6 +1047,7 @@ def suggest_k(ks, inertias, silhouettes):
 # ║  - Visualisasi: Clustering & visualisasi 2D                             ║
 # ║  - Hasil: Kesimpulan & rekomendasi                                       ║
 # ║  - Team: Profil tim pengembang                                           ║
+# ║  Panel 'Diagnostik': waktu & memori proses tiap tahap (track_stage)     ║
 # ║                                                                           ║
 # ╚═══════════════════════════════════════════════════════════════════════════╝
 
@@ -1106,6 +1313,50 @@ st.sidebar.markdown("""
 # Create radio with icons
 page = st.sidebar.radio("", menu_items, label_visibility="collapsed")
 
+# Panel diagnostik: waktu, selisih RSS proses & (opsional) puncak tracemalloc tiap tahap (lihat diagnostics.py)
+diag_panel = st.sidebar.expander("Diagnostik", expanded=False)
+if diag_panel.button("Reset log diagnostik"):
+    st.session_state.diagnostics_log = []
+# tracemalloc memperlambat tahap ~1.5x dan global per proses: hanya bila diminta, job latar tidak pernah
+track_memory = diag_panel.toggle("Ukur puncak memori (tracemalloc)", value=False,
+                                 help="Lebih lambat; angka memori berlaku untuk seluruh proses server, termasuk sesi lain")
+diag_slot = diag_panel.empty()
+
+def render_diagnostics(log):
+    # Dipanggil ulang setiap tahap selesai, jadi panel tetap terisi walau halaman berhenti di st.stop()
+    with diag_slot.container():
+        if log:
+            st.dataframe(diagnostics.to_frame(log), hide_index=True, use_container_width=True)
+        else:
+            st.caption("Belum ada tahap yang diukur.")
+
+def track_stage(name, rows=None):
+    return diagnostics.stage(st.session_state.diagnostics_log, name, page=page, rows=rows, track_memory=track_memory,
+                             on_record=render_diagnostics)
+
+apply_finished_jobs()
+render_diagnostics(st.session_state.diagnostics_log)
+
+# Statistik cache hasil bersama (semua sesi di server ini)
+cache_panel = st.sidebar.expander("Cache hasil", expanded=False)
+with cache_panel:
+    cache_stats = get_result_cache().stats()
+    hit_rate = "-" if cache_stats["hit_rate"] is None else f"{100 * cache_stats['hit_rate']:.0f}%"
+    st.caption(f"{cache_stats['entries']} entri · {cache_stats['bytes'] / 1e6:.1f} / {cache_stats['max_bytes'] / 1e6:.0f} MB · "
+               f"hit rate {hit_rate} ({cache_stats['hits']} hit, {cache_stats['misses']} miss) · "
+               f"{cache_stats['evictions']} dibuang")
+    if cache_stats["entries"]:
+        st.dataframe(cache_stats["biggest"], hide_index=True, use_container_width=True)
+    if st.button("Kosongkan cache"):
+        get_result_cache().clear()
+        st.rerun()
+
+# Job yang masih berjalan dari halaman lain tetap terlihat progress-nya di sidebar
+for _kind, _job in st.session_state.jobs.items():
+    if not _job.applied and _job.page != page:
+        with st.sidebar:
+            job_progress(_kind)
+
 # ╔═══════════════════════════════════════════════════════════════════════════╗
 # ║                                                                           ║
 # ║                         PAGE 1: DASHBOARD                                 ║
@@ -1163,7 +1414,7 @@ if page == "Dashboard":
 elif page == "Visualisasi & Hasil":
     st.markdown("<div class='card'>", unsafe_allow_html=True)
     st.subheader("Visualisasi hasil clustering")
-    dfp = st.session_state.df_proc if not st.session_state.df_proc.empty else st.session_state.df_raw
+    dfp = cleaned_frame()
     Xscaled = st.session_state.X_scaled
     selected = st.session_state.selected_features
 
@@ -1178,50 +1429,46 @@ elif page == "Visualisasi & Hasil":
     with col_b:
         k_manual = st.number_input("K manual", min_value=2, max_value=20, value=3, step=1)
     with col_c:
-        dr_method = st.selectbox("Metode reduksi dimensi", options=["PCA", "t-SNE", "UMAP"] if UMAP_AVAILABLE else ["PCA", "t-SNE"])
+        dr_method = st.selectbox("Metode reduksi dimensi", options=DR_METHODS)
     if dr_method == "t-SNE":
         tsne_perp = st.slider("t-SNE perplexity", 5, 50, 30)
 
     # compute suggested k if requested (fast compute small k range)
     suggested_k = None
     if use_auto:
-        ks, inertias, silhouettes = compute_k_metrics(Xscaled, k_min=2, k_max=min(10, max(3, int(k_manual)+5)), random_state=42)
+        with track_stage("compute_k_metrics", rows=len(Xscaled)):
+            ks, inertias, silhouettes = compute_k_metrics(Xscaled, k_min=2, k_max=min(10, max(3, int(k_manual)+5)), random_state=42)
         suggested_k, _ = suggest_k(ks, inertias, silhouettes)
     final_k = suggested_k if use_auto and suggested_k is not None else int(k_manual)
 
     if st.button("Run Clustering & Visualize"):
         with st.spinner("Menjalankan KMeans..."):
-            kmeans = KMeans(n_clusters=final_k, random_state=42, n_init=10)
-            labels = kmeans.fit_predict(Xscaled)
-            dfp["cluster"] = labels
-            st.session_state.df_proc = dfp
+            n_rows = len(Xscaled)
+            feat_cols = st.session_state.get('feature_cols', []) or []
+            with track_stage("kmeans", rows=n_rows) as rec:
+                labels = fit_kmeans(Xscaled, final_k)
+                rec["detail"] = f"k={final_k}, X={Xscaled.shape[0]}x{Xscaled.shape[1]}, clusters={sorted(set(labels.tolist()))}, features={feat_cols}"
+            with track_stage("silhouette_score", rows=n_rows):
+                sil = score_clustering(Xscaled, labels)
 
             # DR
-            if dr_method == "PCA":
-                reducer = PCA(n_components=2, random_state=42)
-                coords = reducer.fit_transform(Xscaled)
-            elif dr_method == "t-SNE":
-                reducer = TSNE(n_components=2, perplexity=tsne_perp, random_state=42, init="pca")
-                coords = reducer.fit_transform(Xscaled)
-            elif dr_method == "UMAP" and UMAP_AVAILABLE:
-                reducer = umap.UMAP(n_components=2, random_state=42)
-                coords = reducer.fit_transform(Xscaled)
-            else:
-                reducer = PCA(n_components=2, random_state=42)
-                coords = reducer.fit_transform(Xscaled)
-            dfp["_x"] = coords[:, 0]
-            dfp["_y"] = coords[:, 1]
+            with track_stage(f"dr_{dr_method}", rows=n_rows):
+                coords = reduce_dimensions(Xscaled, dr_method, tsne_perp if dr_method == "t-SNE" else 30)
+            st.session_state.cluster_labels = labels
+            st.session_state.embedding = coords
+            dfp = clustered_frame()
 
-            try:
-                sil = silhouette_score(Xscaled, labels) if len(set(labels)) > 1 else None
-            except Exception:
-                sil = None
+            with track_stage("cluster_profile", rows=n_rows) as rec:
+                numeric_feats = profile_numeric_features(dfp, feat_cols)
+                profile = compute_cluster_profile(dfp, labels, numeric_feats)
+                rec["detail"] = f"numeric={numeric_feats}"
+            st.session_state.cluster_profile = profile
 
         st.success("Clustering selesai.")
         # display
         left, right = st.columns([2,1])
         hover_cols = [c for c in ["uid","report_date","victim_race","victim_age","victim_sex","state","disposition","lat","lon"] if c in dfp.columns]
-        with left:
+        with left, track_stage("figure_scatter", rows=len(dfp)):
             fig = px.scatter(dfp, x="_x", y="_y", color=dfp["cluster"].astype(str), hover_data=hover_cols, title="Visualisasi klaster (2D)")
             st.plotly_chart(fig, use_container_width=True)
         with right:
@@ -1233,18 +1480,11 @@ elif page == "Visualisasi & Hasil":
 
         # cluster stats
         st.subheader("Statistik per klaster")
-        stats = []
-        for cl in sorted(dfp["cluster"].unique()):
-            sub = dfp[dfp["cluster"] == cl]
-            row = {"cluster": int(cl), "count": len(sub)}
-            if "victim_age" in sub.columns:
-                row["mean_age"] = round(sub["victim_age"].dropna().mean(), 2)
-            for cat in ["victim_race", "victim_sex", "state", "disposition"]:
-                if cat in sub.columns:
-                    top = sub[cat].mode()
-                    row[f"top_{cat}"] = top.iloc[0] if not top.empty else ""
-            stats.append(row)
-        st.dataframe(pd.DataFrame(stats).set_index("cluster"))
+        stats_cols = ["count"] + (["mean_age"] if "mean_age" in profile["summary"].columns else []) + [f"top_{cat}" for cat in PROFILE_CATEGORICALS if f"top_{cat}" in profile["summary"].columns]
+        stats = profile["summary"][stats_cols].copy()
+        if "mean_age" in stats.columns:
+            stats["mean_age"] = stats["mean_age"].round(2)
+        st.dataframe(stats.fillna(""))
 
         # Additional visualizations: silhouette bars, donut charts, heatmap
         import traceback
@@ -1252,55 +1492,38 @@ elif page == "Visualisasi & Hasil":
             from sklearn.metrics import silhouette_samples
             import plotly.graph_objects as go
 
-            # Debug/status panel to help explain if visualizations don't render
-            st.markdown("""<div class='dashboard-section' style='margin-top: 12px;'><div class='section-icon'><svg xmlns='http://www.w3.org/2000/svg' width='20' height='20' viewBox='0 0 24 24' fill='none' stroke='currentColor' stroke-width='2' stroke-linecap='round' stroke-linejoin='round'><path d='M12 2v4'></path><path d='M12 12v10'></path></svg></div><h3 class='section-title' style='font-size: 1.0rem;'>Debug: status pasca-clustering</h3></div>""", unsafe_allow_html=True)
-            st.write(f"Detected clusters: {sorted(dfp['cluster'].unique())}")
-            st.write(f"n_clusters (unique labels): {len(set(labels))}")
-            st.write(f"Global silhouette (session): {st.session_state.get('silhouette_score_val')}")
-            st.write(f"Xscaled shape: {getattr(Xscaled, 'shape', None)}")
-            feat_cols = st.session_state.get('feature_cols', []) or []
-            st.write(f"Feature cols: {feat_cols}")
-
+            # Status pasca-clustering (klaster, shape X, fitur) tercatat di panel Diagnostik
             if len(set(labels)) > 1:
-                sil_samples = silhouette_samples(Xscaled, labels)
+                with track_stage("silhouette_samples", rows=n_rows):
+                    sil_samples = silhouette_samples(Xscaled, labels)
                 if len(sil_samples) != len(dfp):
                     st.warning(f"Warning: silhouette_samples length {len(sil_samples)} != number of rows {len(dfp)}")
                 dfp = dfp.assign(silhouette=sil_samples)
 
                 # Silhouette: add section header with icon and horizontal bar plot (stacked by cluster)
                 st.markdown("""<div class='dashboard-section' style='margin-top: 12px;'><div class='section-icon'><svg xmlns='http://www.w3.org/2000/svg' width='20' height='20' viewBox='0 0 24 24' fill='none' stroke='currentColor' stroke-width='2' stroke-linecap='round' stroke-linejoin='round'><path d='M3 12h18'></path><path d='M12 3v18'></path></svg></div><h3 class='section-title' style='font-size: 1.1rem;'>4. Silhouette per klaster</h3></div>""", unsafe_allow_html=True)
-                sil_df = dfp[["silhouette", "cluster"]].copy()
-                sil_df["cluster"] = sil_df["cluster"].astype(int)
-                sil_df = sil_df.sort_values(["cluster", "silhouette"], ascending=[True, False])
-                traces = []
-                y_base = 0
-                cluster_order = sorted(sil_df["cluster"].unique())
-                for cl in cluster_order:
-                    sub = sil_df[sil_df["cluster"] == cl]
-                    n = len(sub)
-                    ys = list(range(y_base, y_base + n))
-                    traces.append(go.Bar(x=sub["silhouette"].values, y=ys, orientation="h", name=f"Cluster {cl}", marker=dict(opacity=0.9)))
-                    y_base += n
-                fig_sil = go.Figure(data=traces)
-                avg_sil = float(np.mean(sil_samples))
-                fig_sil.update_layout(barmode='stack', height=420, title='4. Silhouette per klaster', xaxis_title='Silhouette value', yaxis=dict(showticklabels=False))
-                fig_sil.add_vline(x=avg_sil, line=dict(color='black', dash='dash'), annotation_text=f'Global mean: {avg_sil:.3f}', annotation_position='top left')
-                st.plotly_chart(fig_sil, use_container_width=True)
-
-                # Heatmap: mean of numeric features per cluster (include coordinates and other numeric features)
-                feat_cols = st.session_state.get('feature_cols', []) or []
-                # If user provided feature_cols prefer those, otherwise infer numeric columns from the dataframe
-                if feat_cols:
-                    numeric_feats = [c for c in feat_cols if c in dfp.columns and pd.api.types.is_numeric_dtype(dfp[c])]
-                else:
-                    numeric_feats = [c for c in dfp.select_dtypes(include='number').columns if c in dfp.columns]
-                # Fallback to victim_age when nothing numeric available
-                if len(numeric_feats) == 0 and 'victim_age' in dfp.columns:
-                    numeric_feats = ['victim_age']
-                st.write(f"Numeric features used for heatmap: {numeric_feats}")
+                with track_stage("figure_silhouette", rows=n_rows):
+                    sil_df = dfp[["silhouette", "cluster"]].copy()
+                    sil_df["cluster"] = sil_df["cluster"].astype(int)
+                    sil_df = sil_df.sort_values(["cluster", "silhouette"], ascending=[True, False])
+                    traces = []
+                    y_base = 0
+                    cluster_order = sorted(sil_df["cluster"].unique())
+                    for cl in cluster_order:
+                        sub = sil_df[sil_df["cluster"] == cl]
+                        n = len(sub)
+                        ys = list(range(y_base, y_base + n))
+                        traces.append(go.Bar(x=sub["silhouette"].values, y=ys, orientation="h", name=f"Cluster {cl}", marker=dict(opacity=0.9)))
+                        y_base += n
+                    fig_sil = go.Figure(data=traces)
+                    avg_sil = float(np.mean(sil_samples))
+                    fig_sil.update_layout(barmode='stack', height=420, title='4. Silhouette per klaster', xaxis_title='Silhouette value', yaxis=dict(showticklabels=False))
+                    fig_sil.add_vline(x=avg_sil, line=dict(color='black', dash='dash'), annotation_text=f'Global mean: {avg_sil:.3f}', annotation_position='top left')
+                    st.plotly_chart(fig_sil, use_container_width=True)
 
+                # Heatmap: mean of numeric features per cluster (precomputed in the cluster profile)
                 if len(numeric_feats) > 0:
-                    cluster_means = dfp.groupby('cluster')[numeric_feats].mean()
+                    cluster_means = profile["feature_means"]
                     st.markdown("""<div class='dashboard-section' style='margin-top: 12px;'><div class='section-icon'><svg xmlns='http://www.w3.org/2000/svg' width='20' height='20' viewBox='0 0 24 24' fill='none' stroke='currentColor' stroke-width='2' stroke-linecap='round' stroke-linejoin='round'><rect x='3' y='3' width='18' height='18' rx='2'></rect></svg></div><h3 class='section-title' style='font-size: 1.1rem;'>5. Heatmap: Rata-rata fitur per klaster</h3></div>""", unsafe_allow_html=True)
                     heat_df = cluster_means.copy()
                     heat_df.index = heat_df.index.astype(str)
@@ -1319,47 +1542,18 @@ elif page == "Visualisasi & Hasil":
         lon_col = "lon" if "lon" in dfp.columns else ("longitude" if "longitude" in dfp.columns else None)
         if lat_col and lon_col and dfp[lat_col].notna().sum() > 0:
             st.subheader("Peta: Distribusi klaster")
-            df_map = dfp.dropna(subset=[lat_col, lon_col])
-            fig_map = px.scatter_mapbox(df_map, lat=lat_col, lon=lon_col, color=df_map["cluster"].astype(str),
-                                        hover_data=hover_cols, zoom=10, height=600)
-            # Add cluster-level centroids so hovering a cluster shows aggregated stats
-            try:
-                import plotly.graph_objects as go
-                grp = df_map.groupby("cluster")
-                clusters = grp.size().rename("count").reset_index()
-                clusters["mean_lat"] = grp[lat_col].mean().values
-                clusters["mean_lon"] = grp[lon_col].mean().values
-                # mean age if available
-                if "victim_age" in df_map.columns:
-                    clusters["mean_age"] = grp["victim_age"].apply(lambda s: round(pd.to_numeric(s, errors="coerce").dropna().mean(), 2))
-                else:
-                    clusters["mean_age"] = ""
-                # top categorical values
-                for cat in ["victim_race", "victim_sex", "state", "disposition"]:
-                    if cat in df_map.columns:
-                        clusters[f"top_{cat}"] = grp[cat].agg(lambda s: s.mode().iloc[0] if not s.mode().empty else "")
-                    else:
-                        clusters[f"top_{cat}"] = ""
-                customdata = clusters[["cluster","count","mean_age","top_victim_race","top_victim_sex","top_state","top_disposition"]].values
-                hovertemplate = ("Cluster: %{customdata[0]}<br>Count: %{customdata[1]}<br>Mean age: %{customdata[2]}<br>"
-                                 "Top race: %{customdata[3]}<br>Top sex: %{customdata[4]}<br>Top state: %{customdata[5]}<br>"
-                                 "Top disposition: %{customdata[6]}<extra></extra>")
-                fig_map.add_trace(go.Scattermapbox(
-                    lat=clusters["mean_lat"],
-                    lon=clusters["mean_lon"],
-                    mode="markers+text",
-                    marker=dict(size=18, color="#ffffff", opacity=0.9, symbol="circle"),
-                    text=clusters["cluster"].astype(str),
-                    textposition="middle center",
-                    hovertemplate=hovertemplate,
-                    customdata=customdata,
-                    showlegend=False
-                ))
-            except Exception:
-                pass
-
-            fig_map.update_layout(mapbox_style="open-street-map", margin={"r":0,"t":0,"l":0,"b":0})
-            st.plotly_chart(fig_map, use_container_width=True)
+            with track_stage("figure_map", rows=len(dfp)):
+                df_map = dfp.dropna(subset=[lat_col, lon_col])
+                fig_map = px.scatter_mapbox(df_map, lat=lat_col, lon=lon_col, color=df_map["cluster"].astype(str),
+                                            hover_data=hover_cols, zoom=10, height=600)
+                # Add cluster-level centroids so hovering a cluster shows aggregated stats
+                try:
+                    add_cluster_centroids(fig_map, profile)
+                except Exception:
+                    pass
+
+                fig_map.update_layout(mapbox_style="open-street-map", margin={"r":0,"t":0,"l":0,"b":0})
+                st.plotly_chart(fig_map, use_container_width=True)
         else:
             st.info("Kolom lat/lon tidak ada atau kosong — peta tidak ditampilkan.")
 
@@ -1374,6 +1568,8 @@ elif page == "Visualisasi & Hasil":
 # ║                       PAGE 2: INPUT DATASET                               ║
 # ║                                                                           ║
 # ║  Halaman untuk upload dataset CSV                                         ║
+# ║  - Muat hasil precomputed batch_run.py atau run dari Riwayat Run          ║
+# ║  - Tambah kasus baru ke klaster yang ada (mode append)                    ║
 # ║                                                                           ║
 # ╚═══════════════════════════════════════════════════════════════════════════╝
 elif page == "Input Dataset":
@@ -1391,14 +1587,21 @@ elif page == "Input Dataset":
     sample_file = next((p for p in sample_paths if os.path.exists(p)), None)
     if sample_file:
         try:
-            import base64
-            with open(sample_file, "rb") as _f:
-                sample_bytes = _f.read()
-            b64 = base64.b64encode(sample_bytes).decode("ascii")
-
-            download_html = f"""<div class="card" style="margin-top:12px;"><div class="dashboard-section"><div class="section-icon"><svg xmlns='http://www.w3.org/2000/svg' width='24' height='24' viewBox='0 0 24 24' fill='none' stroke='currentColor' stroke-width='2' stroke-linecap='round' stroke-linejoin='round'><path d='M21 15v4a2 2 0 0 1-2 2H5a2 2 0 0 1-2-2v-4'></path><path d='M12 3v12'></path><path d='M8 7l4 4 4-4'></path></svg></div><h3 class='section-title'>Contoh dataset</h3></div><div class='dashboard-content' style='display:flex;align-items:center;justify-content:space-between;gap:12px;'><div><p style="margin:0">Unduh dataset contoh untuk mencoba dashboard.</p></div><div><a class='download-btn-large' href='data:text/csv;base64,{b64}' download='homicide-data.csv' title='Download contoh dataset (CSV)'><svg xmlns="http://www.w3.org/2000/svg" width="18" height="18" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2" stroke-linecap="round" stroke-linejoin="round"><path d="M21 15v4a2 2 0 0 1-2 2H5a2 2 0 0 1-2-2v-4"></path><path d="M12 3v12"></path><path d="M8 7l4 4 4-4"></path></svg><span>Download contoh dataset (CSV)</span></a></div></div></div>"""
-
-            st.markdown(download_html, unsafe_allow_html=True)
+            # Tidak ada lagi base64 di markdown: file baru dibaca saat tombol download diklik (deferred),
+            # dan "Muat" membaca lewat cache parquet langsung ke df_raw tanpa lewat browser
+            st.markdown("""<div class="card" style="margin-top:12px;"><div class="dashboard-section"><div class="section-icon"><svg xmlns='http://www.w3.org/2000/svg' width='24' height='24' viewBox='0 0 24 24' fill='none' stroke='currentColor' stroke-width='2' stroke-linecap='round' stroke-linejoin='round'><path d='M21 15v4a2 2 0 0 1-2 2H5a2 2 0 0 1-2-2v-4'></path><path d='M12 3v12'></path><path d='M8 7l4 4 4-4'></path></svg></div><h3 class='section-title'>Contoh dataset</h3></div><div class='dashboard-content' style='display:flex;align-items:center;justify-content:space-between;gap:12px;'><div><p style="margin:0">Unduh atau muat langsung dataset contoh untuk mencoba dashboard.</p></div></div></div>""", unsafe_allow_html=True)
+            col_dl, col_load = st.columns(2)
+            with col_dl:
+                st.download_button("Download contoh dataset (CSV)", data=lambda: Path(sample_file).read_bytes(),
+                                   file_name="homicide-data.csv", mime="text/csv", on_click="ignore")
+            with col_load:
+                if st.button("Muat contoh dataset"):
+                    with track_stage("sample_read") as rec:
+                        df0 = read_csv_cached(sample_file)
+                        rec["rows"] = len(df0)
+                        rec["detail"] = sample_file
+                    set_raw_data(df0, ("sample", sample_file, os.path.getmtime(sample_file)))
+                    st.markdown(f"""<div class="bullet-item" style="background: rgba(16, 185, 129, 0.15); border-left-color: #10b981;"><svg xmlns="http://www.w3.org/2000/svg" width="18" height="18" viewBox="0 0 24 24" fill="none" stroke="#10b981" stroke-width="2" stroke-linecap="round" stroke-linejoin="round"><path d="M22 11.08V12a10 10 0 1 1-5.93-9.12"></path><polyline points="22 4 12 14.01 9 11.01"></polyline></svg><span>Contoh dataset dimuat: {len(df0):,} baris, {len(df0.columns)} kolom.</span></div>""", unsafe_allow_html=True)
         except Exception as e:
             st.warning(f"Gagal membuka contoh dataset: {e}")
     else:
@@ -1407,14 +1610,104 @@ elif page == "Input Dataset":
     uploaded = st.file_uploader("Upload file CSV", type=["csv"])
 
     if uploaded is not None:
-        df0 = robust_read_csv(uploaded)
-        st.session_state.df_raw = df0
+        # file_uploader mengembalikan file yang sama di setiap rerun: baca ulang hanya bila file berganti,
+        # supaya layer cleaning & hasil clustering di atas df_raw tetap berlaku
+        if st.session_state.get("raw_source") != ("upload", uploaded.file_id, uploaded.name):
+            with track_stage("csv_read") as rec:
+                df0 = robust_read_csv(uploaded)
+                rec["rows"] = len(df0)
+                rec["detail"] = f"{uploaded.name}, {len(df0.columns)} kolom"
+            set_raw_data(df0, ("upload", uploaded.file_id, uploaded.name))
+        df0 = st.session_state.df_raw
         st.markdown("""<div class="bullet-item" style="background: rgba(16, 185, 129, 0.15); border-left-color: #10b981;"><svg xmlns="http://www.w3.org/2000/svg" width="18" height="18" viewBox="0 0 24 24" fill="none" stroke="#10b981" stroke-width="2" stroke-linecap="round" stroke-linejoin="round"><path d="M22 11.08V12a10 10 0 1 1-5.93-9.14"></path><polyline points="22 4 12 14.01 9 11.01"></polyline></svg><span style="color: #a7f3d0;">CSV berhasil diupload dan dimuat ke sesi.</span></div>""", unsafe_allow_html=True)
         st.markdown(f"""<div class="bullet-item"><svg xmlns="http://www.w3.org/2000/svg" width="18" height="18" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2" stroke-linecap="round" stroke-linejoin="round"><circle cx="12" cy="12" r="10"></circle><line x1="12" y1="16" x2="12" y2="12"></line><line x1="12" y1="8" x2="12.01" y2="8"></line></svg><span><strong>Informasi</strong>: {len(df0)} baris, {len(df0.columns)} kolom</span></div>""", unsafe_allow_html=True)
         st.dataframe(df0.head(10), use_container_width=True)
     else:
         st.markdown("""<div class="bullet-item" style="background: rgba(59, 130, 246, 0.1); border-left-color: #3b82f6;"><svg xmlns="http://www.w3.org/2000/svg" width="18" height="18" viewBox="0 0 24 24" fill="none" stroke="#60a5fa" stroke-width="2" stroke-linecap="round" stroke-linejoin="round"><circle cx="12" cy="12" r="10"></circle><line x1="12" y1="16" x2="12" y2="12"></line><line x1="12" y1="8" x2="12.01" y2="8"></line></svg><span style="color: #bfdbfe;">Silakan upload file CSV untuk memulai analisis.</span></div>""", unsafe_allow_html=True)
-    
+
+    # Hasil precomputed dari batch runner (python batch_run.py --input ... --output <folder>)
+    st.markdown("""<div class="dashboard-section" style="margin-top: 20px;"><div class="section-icon"><svg xmlns="http://www.w3.org/2000/svg" width="20" height="20" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2" stroke-linecap="round" stroke-linejoin="round"><path d="M22 19a2 2 0 0 1-2 2H4a2 2 0 0 1-2-2V5a2 2 0 0 1 2-2h5l2 3h9a2 2 0 0 1 2 2z"></path></svg></div><h3 class="section-title" style="font-size: 1.1rem;">Muat Hasil Precomputed</h3></div>""", unsafe_allow_html=True)
+    results_dir = st.text_input("Folder hasil batch_run.py", value="results")
+    if st.button("Muat hasil precomputed"):
+        if not os.path.exists(os.path.join(results_dir, "metrics.json")):
+            st.markdown(f"""<div class="bullet-item" style="background: rgba(239, 68, 68, 0.15); border-left-color: #ef4444;"><svg xmlns="http://www.w3.org/2000/svg" width="18" height="18" viewBox="0 0 24 24" fill="none" stroke="#ef4444" stroke-width="2" stroke-linecap="round" stroke-linejoin="round"><circle cx="12" cy="12" r="10"></circle><line x1="15" y1="9" x2="9" y2="15"></line><line x1="9" y1="9" x2="15" y2="15"></line></svg><span style="color: #fca5a5;">Folder <code>{results_dir}</code> tidak berisi hasil batch (metrics.json tidak ditemukan).</span></div>""", unsafe_allow_html=True)
+        else:
+            with track_stage("load_results") as rec:
+                result = load_results(results_dir)
+                rec["rows"] = len(result["df_proc"])
+                rec["detail"] = results_dir
+            store_results(result)
+            st.markdown(f"""<div class="bullet-item" style="background: rgba(16, 185, 129, 0.15); border-left-color: #10b981;"><svg xmlns="http://www.w3.org/2000/svg" width="18" height="18" viewBox="0 0 24 24" fill="none" stroke="#10b981" stroke-width="2" stroke-linecap="round" stroke-linejoin="round"><path d="M22 11.08V12a10 10 0 1 1-5.93-9.14"></path><polyline points="22 4 12 14.01 9 11.01"></polyline></svg><span style="color: #a7f3d0;">Hasil dimuat: {len(result['df_proc'])} baris, K={result['final_k']}. Buka halaman 'Visualisasi' atau 'Hasil'.</span></div>""", unsafe_allow_html=True)
+            out_of_core_note(result)
+
+    # Riwayat run: setiap clustering yang selesai tersimpan di disk (run_store.py) dan bisa dimuat ulang
+    # setelah refresh / deploy ulang tanpa menghitung ulang K, KMeans maupun t-SNE
+    st.markdown("""<div class="dashboard-section" style="margin-top: 20px;"><div class="section-icon"><svg xmlns="http://www.w3.org/2000/svg" width="20" height="20" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2" stroke-linecap="round" stroke-linejoin="round"><circle cx="12" cy="12" r="10"></circle><polyline points="12 6 12 12 16 14"></polyline></svg></div><h3 class="section-title" style="font-size: 1.1rem;">Riwayat Run</h3></div>""", unsafe_allow_html=True)
+    store = get_run_store()
+    run_save = st.session_state.run_save
+    if run_save is not None and run_save.done() and run_save.exception() is not None:
+        st.markdown(f"""<div class="bullet-item" style="background: rgba(245, 158, 11, 0.15); border-left-color: #f59e0b;"><svg xmlns="http://www.w3.org/2000/svg" width="18" height="18" viewBox="0 0 24 24" fill="none" stroke="#f59e0b" stroke-width="2" stroke-linecap="round" stroke-linejoin="round"><path d="M10.29 3.86L1.82 18a2 2 0 0 0 1.71 3h16.94a2 2 0 0 0 1.71-3L13.71 3.86a2 2 0 0 0-3.42 0z"></path><line x1="12" y1="9" x2="12" y2="13"></line><line x1="12" y1="17" x2="12.01" y2="17"></line></svg><span style="color: #fde68a;">Run terakhir gagal disimpan ke riwayat: {run_save.exception()}</span></div>""", unsafe_allow_html=True)
+    runs = store.list_runs()
+    if runs.empty:
+        st.markdown("""<div class="bullet-item" style="background: rgba(59, 130, 246, 0.1); border-left-color: #3b82f6;"><svg xmlns="http://www.w3.org/2000/svg" width="18" height="18" viewBox="0 0 24 24" fill="none" stroke="#60a5fa" stroke-width="2" stroke-linecap="round" stroke-linejoin="round"><circle cx="12" cy="12" r="10"></circle><line x1="12" y1="16" x2="12" y2="12"></line><line x1="12" y1="8" x2="12.01" y2="8"></line></svg><span style="color: #bfdbfe;">Belum ada run tersimpan. Setiap clustering di halaman 'Visualisasi' otomatis masuk ke riwayat.</span></div>""", unsafe_allow_html=True)
+    else:
+        current = data_fingerprint(st.session_state.df_raw) if not st.session_state.df_raw.empty else None
+        table = runs[["run_id", "created_at", "source", "n_rows", "final_k", "silhouette", "engine", "dr_method"]].assign(
+            dataset_aktif=runs["fingerprint"] == current, mb=(runs["bytes"] / 1e6).round(1))
+        st.dataframe(table, hide_index=True, use_container_width=True)
+        st.caption(f"{len(runs)} run, {runs['bytes'].sum() / 1e6:.1f} MB dari budget {store.max_bytes / 1e6:.0f} MB "
+                   "(bila penuh, run yang paling lama tidak dipakai dihapus lebih dulu)")
+        labels_by_id = {r.run_id: f"{r.run_id} — {r.source or 'dataset'}, {r.n_rows} baris, K={r.final_k}, {r.engine}/{r.dr_method}"
+                        for r in runs.itertuples()}
+        col_run = st.columns([3, 1, 1])
+        with col_run[0]:
+            run_id = st.selectbox("Run", options=list(labels_by_id), format_func=labels_by_id.get, label_visibility="collapsed")
+        with col_run[1]:
+            load_run = st.button("Muat run", use_container_width=True)
+        with col_run[2]:
+            delete_run = st.button("Hapus run", use_container_width=True)
+        if load_run:
+            with track_stage("load_run") as rec:
+                result = store.load(run_id)
+                rec["rows"] = len(result["df_proc"])
+                rec["detail"] = run_id
+            store_results(result)
+            st.session_state.silhouette_values = result["silhouette_values"]
+            st.session_state.raw_source = ("run", run_id)
+            st.markdown(f"""<div class="bullet-item" style="background: rgba(16, 185, 129, 0.15); border-left-color: #10b981;"><svg xmlns="http://www.w3.org/2000/svg" width="18" height="18" viewBox="0 0 24 24" fill="none" stroke="#10b981" stroke-width="2" stroke-linecap="round" stroke-linejoin="round"><path d="M22 11.08V12a10 10 0 1 1-5.93-9.14"></path><polyline points="22 4 12 14.01 9 11.01"></polyline></svg><span style="color: #a7f3d0;">Run {run_id} dimuat: {len(result['df_proc'])} baris, K={result['final_k']}. Buka halaman 'Visualisasi' atau 'Hasil'.</span></div>""", unsafe_allow_html=True)
+            out_of_core_note(result)
+        elif delete_run:
+            store.delete(run_id)
+            st.rerun()
+
+    # Mode append: kasus baru masuk ke klaster & embedding yang ada tanpa k-sweep, KMeans dan t-SNE ulang
+    if st.session_state.cluster_labels is not None and st.session_state.embedding is not None:
+        st.markdown("""<div class="dashboard-section" style="margin-top: 20px;"><div class="section-icon"><svg xmlns="http://www.w3.org/2000/svg" width="20" height="20" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2" stroke-linecap="round" stroke-linejoin="round"><circle cx="12" cy="12" r="10"></circle><line x1="12" y1="8" x2="12" y2="16"></line><line x1="8" y1="12" x2="16" y2="12"></line></svg></div><h3 class="section-title" style="font-size: 1.1rem;">Tambah Kasus Baru (Append)</h3></div>""", unsafe_allow_html=True)
+        try:
+            incremental.check_engine(st.session_state.run_params or {})
+        except ValueError as e:
+            st.markdown(f"""<div class="bullet-item"><svg xmlns="http://www.w3.org/2000/svg" width="18" height="18" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2" stroke-linecap="round" stroke-linejoin="round"><circle cx="12" cy="12" r="10"></circle><line x1="12" y1="16" x2="12" y2="12"></line><line x1="12" y1="8" x2="12.01" y2="8"></line></svg><span>{e}</span></div>""", unsafe_allow_html=True)
+        else:
+            st.markdown(f"""<div class="bullet-item"><svg xmlns="http://www.w3.org/2000/svg" width="18" height="18" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2" stroke-linecap="round" stroke-linejoin="round"><circle cx="12" cy="12" r="10"></circle><line x1="12" y1="16" x2="12" y2="12"></line><line x1="12" y1="8" x2="12.01" y2="8"></line></svg><span>Baris baru diproses dengan opsi preprocessing yang sama, lalu ditempatkan ke {st.session_state.final_k} klaster dan posisi 2D yang sudah ada.</span></div>""", unsafe_allow_html=True)
+            appended = st.file_uploader("Upload CSV kasus baru", type=["csv"], key="append_upload")
+            update_centroids = st.checkbox("Perbarui centroid (mini-batch)", value=False,
+                                           help="Centroid digeser ke rata-rata berjalan termasuk baris baru; label baris lama tidak berubah")
+            if appended is not None and st.button("Tambahkan ke klaster"):
+                try:
+                    with track_stage("append") as rec:
+                        df_new = robust_read_csv(appended)
+                        rec["rows"] = len(df_new)
+                        batch = append_cases(df_new, update_centroids)
+                        rec["detail"] = f"{len(batch['df_proc'])} baris ditambahkan, {batch['unseen']} dengan kategori baru"
+                except ValueError as e:
+                    st.markdown(f"""<div class="bullet-item" style="background: rgba(239, 68, 68, 0.15); border-left-color: #ef4444;"><svg xmlns="http://www.w3.org/2000/svg" width="18" height="18" viewBox="0 0 24 24" fill="none" stroke="#ef4444" stroke-width="2" stroke-linecap="round" stroke-linejoin="round"><circle cx="12" cy="12" r="10"></circle><line x1="15" y1="9" x2="9" y2="15"></line><line x1="9" y1="9" x2="15" y2="15"></line></svg><span style="color: #fca5a5;">Gagal menambahkan kasus baru: {e}</span></div>""", unsafe_allow_html=True)
+                else:
+                    dropped = batch["dropped"]
+                    st.markdown(f"""<div class="bullet-item" style="background: rgba(16, 185, 129, 0.15); border-left-color: #10b981;"><svg xmlns="http://www.w3.org/2000/svg" width="18" height="18" viewBox="0 0 24 24" fill="none" stroke="#10b981" stroke-width="2" stroke-linecap="round" stroke-linejoin="round"><path d="M22 11.08V12a10 10 0 1 1-5.93-9.14"></path><polyline points="22 4 12 14.01 9 11.01"></polyline></svg><span style="color: #a7f3d0;">{len(batch['df_proc'])} kasus baru ditambahkan dalam {batch['seconds']:.2f} detik ({dropped['duplicates']} duplikat, {dropped['missing']} baris dengan nilai kosong dibuang). Total sekarang {len(st.session_state.cluster_labels)} baris.</span></div>""", unsafe_allow_html=True)
+        model = incremental_model()
+        if model is not None:
+            show_drift(model.drift())
+
     st.markdown("</div>", unsafe_allow_html=True)
 
 # ╔═══════════════════════════════════════════════════════════════════════════╗
@@ -1440,7 +1733,9 @@ elif page == "Preprocessing Data":
     
     # Step 1: Deteksi Masalah Kualitas Data
     st.markdown("""<div class="dashboard-section" style="margin-top: 20px;"><div class="section-icon"><svg xmlns="http://www.w3.org/2000/svg" width="20" height="20" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2" stroke-linecap="round" stroke-linejoin="round"><circle cx="12" cy="12" r="10"></circle><line x1="12" y1="8" x2="12" y2="12"></line><line x1="12" y1="16" x2="12.01" y2="16"></line></svg></div><h3 class="section-title" style="font-size: 1.1rem;">1. Deteksi Masalah Kualitas Data</h3></div>""", unsafe_allow_html=True)
-    issues = detect_data_quality_issues(df)
+    with track_stage("data_quality", rows=len(df)):
+        quality = profile_data(df)
+        issues = data_quality.missing_issues(quality)
     if issues:
         st.markdown("""<div class="recommendation">""", unsafe_allow_html=True)
         st.markdown("""<div style="display: flex; align-items: center; gap: 10px; margin-bottom: 10px;"><svg xmlns="http://www.w3.org/2000/svg" width="18" height="18" viewBox="0 0 24 24" fill="none" stroke="#f59e0b" stroke-width="2" stroke-linecap="round" stroke-linejoin="round"><path d="M10.29 3.86L1.82 18a2 2 0 0 0 1.71 3h16.94a2 2 0 0 0 1.71-3L13.71 3.86a2 2 0 0 0-3.42 0z"></path><line x1="12" y1="9" x2="12" y2="13"></line><line x1="12" y1="17" x2="12.01" y2="17"></line></svg><strong>Masalah data terdeteksi:</strong></div>""", unsafe_allow_html=True)
@@ -1450,9 +1745,13 @@ elif page == "Preprocessing Data":
     else:
         st.markdown("""<div class="bullet-item" style="background: rgba(16, 185, 129, 0.15); border-left-color: #10b981;"><svg xmlns="http://www.w3.org/2000/svg" width="18" height="18" viewBox="0 0 24 24" fill="none" stroke="#10b981" stroke-width="2" stroke-linecap="round" stroke-linejoin="round"><path d="M22 11.08V12a10 10 0 1 1-5.93-9.14"></path><polyline points="22 4 12 14.01 9 11.01"></polyline></svg><span style="color: #a7f3d0;">Tidak ada nilai kosong terdeteksi.</span></div>""", unsafe_allow_html=True)
     
+    with st.expander("Profil kolom (nilai kosong, penanda kosong, kardinalitas, rentang, outlier)"):
+        st.caption(f"{quality['rows']:,} baris · {quality['duplicates']:,} baris duplikat")
+        st.dataframe(quality["columns"], use_container_width=True)
+    
     # Step 2: Rekomendasi Cleaning
     st.markdown("""<div class="dashboard-section" style="margin-top: 20px;"><div class="section-icon"><svg xmlns="http://www.w3.org/2000/svg" width="20" height="20" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2" stroke-linecap="round" stroke-linejoin="round"><path d="M14 2H6a2 2 0 0 0-2 2v16a2 2 0 0 0 2 2h12a2 2 0 0 0 2-2V8z"></path><polyline points="14 2 14 8 20 8"></polyline><line x1="16" y1="13" x2="8" y2="13"></line><line x1="16" y1="17" x2="8" y2="17"></line></svg></div><h3 class="section-title" style="font-size: 1.1rem;">2. Rekomendasi Cleaning</h3></div>""", unsafe_allow_html=True)
-    recs = recommend_cleaning(df)
+    recs = data_quality.recommend_cleaning(quality)
     if recs:
         st.markdown("""<div class="recommendation">""", unsafe_allow_html=True)
         st.markdown("""<div style="display: flex; align-items: center; gap: 10px; margin-bottom: 10px;"><svg xmlns="http://www.w3.org/2000/svg" width="18" height="18" viewBox="0 0 24 24" fill="none" stroke="#f59e0b" stroke-width="2" stroke-linecap="round" stroke-linejoin="round"><circle cx="12" cy="12" r="10"></circle><line x1="12" y1="16" x2="12" y2="12"></line><line x1="12" y1="8" x2="12.01" y2="8"></line></svg><strong>Rekomendasi sistem:</strong></div>""", unsafe_allow_html=True)
@@ -1462,90 +1761,140 @@ elif page == "Preprocessing Data":
     else:
         st.markdown("""<div class="bullet-item" style="background: rgba(16, 185, 129, 0.15); border-left-color: #10b981;"><svg xmlns="http://www.w3.org/2000/svg" width="18" height="18" viewBox="0 0 24 24" fill="none" stroke="#10b981" stroke-width="2" stroke-linecap="round" stroke-linejoin="round"><path d="M22 11.08V12a10 10 0 1 1-5.93-9.14"></path><polyline points="22 4 12 14.01 9 11.01"></polyline></svg><span style="color: #a7f3d0;">Tidak ada rekomendasi cleaning khusus.</span></div>""", unsafe_allow_html=True)
     
-    # Step 3: Opsi Cleaning Manual
-    st.markdown("""<div class="dashboard-section" style="margin-top: 20px;"><div class="section-icon"><svg xmlns="http://www.w3.org/2000/svg" width="20" height="20" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2" stroke-linecap="round" stroke-linejoin="round"><path d="M11 4H4a2 2 0 0 0-2 2v14a2 2 0 0 0 2 2h14a2 2 0 0 0 2-2v-7"></path><path d="M18.5 2.5a2.121 2.121 0 0 1 3 3L12 15l-4 1 1-4 9.5-9.5z"></path></svg></div><h3 class="section-title" style="font-size: 1.1rem;">3. Opsi Cleaning Manual</h3></div>""", unsafe_allow_html=True)
-    
-    # Detect which types of columns have issues
-    numeric_issues = []
-    categorical_issues = []
-    
-    for col, issue in issues.items():
-        if issue['type'] == 'missing':
-            if df[col].dtype.kind in "biufc":  # numeric
-                numeric_issues.append(col)
-            else:  # categorical/string
-                categorical_issues.append(col)
-    
-    # Three main cleaning options
-    st.markdown("""<div class="bullet-item" style="background: rgba(59, 130, 246, 0.08); border-left-color: #3b82f6;"><svg xmlns="http://www.w3.org/2000/svg" width="18" height="18" viewBox="0 0 24 24" fill="none" stroke="#60a5fa" stroke-width="2" stroke-linecap="round" stroke-linejoin="round"><circle cx="12" cy="12" r="10"></circle><line x1="12" y1="16" x2="12" y2="12"></line><line x1="12" y1="8" x2="12.01" y2="8"></line></svg><span style="color: #bfdbfe;">Pilih metode cleaning yang ingin diterapkan:</span></div>""", unsafe_allow_html=True)
-    
-    # Checkbox for duplicate removal (independent)
-    remove_dup = st.checkbox("Hapus duplikat", value=False, help="Menghapus baris yang identik/duplikat")
-    
-    # Radio buttons for null value handling strategy (mutually exclusive)
-    st.markdown("""<div style="margin-top: 12px; margin-bottom: 8px; color: #e5e5e5; font-weight: 500;">Strategi penanganan nilai kosong:</div>""", unsafe_allow_html=True)
-    null_strategy = st.radio(
-        "Pilih strategi:",
-        options=["Ganti nilai kosong", "Hapus nilai null"],
-        index=0,
-        help="Pilih salah satu: mengganti nilai kosong dengan strategi tertentu ATAU menghapus baris dengan nilai kosong",
-        label_visibility="collapsed"
-    )
-    
-    # Set flags based on radio selection
-    remove_null = (null_strategy == "Hapus nilai null")
-    replace_values = (null_strategy == "Ganti nilai kosong")
-    
-    # Show info when remove_null is selected
-    if remove_null:
-        st.markdown("""<div class="bullet-item" style="background: rgba(245, 158, 11, 0.12); border-left-color: #f59e0b;"><svg xmlns="http://www.w3.org/2000/svg" width="18" height="18" viewBox="0 0 24 24" fill="none" stroke="#f59e0b" stroke-width="2" stroke-linecap="round" stroke-linejoin="round"><path d="M10.29 3.86L1.82 18a2 2 0 0 0 1.71 3h16.94a2 2 0 0 0 1.71-3L13.71 3.86a2 2 0 0 0-3.42 0z"></path><line x1="12" y1="9" x2="12" y2="13"></line><line x1="12" y1="17" x2="12.01" y2="17"></line></svg><span style="color: #fde68a;">⚠️ Mode "Hapus nilai null" - semua baris dengan nilai kosong akan dihapus</span></div>""", unsafe_allow_html=True)
-    
-    # Show replacement options only if replace_values is selected
-    fill_numeric_choice = "median"  # default
-    fill_categorical_choice = "Unknown"  # default
-    
-    if replace_values:
-        # Show numeric options only if there are numeric issues
-        if numeric_issues:
-            st.markdown(f"""<div class="bullet-item" style="background: rgba(59, 130, 246, 0.1); border-left-color: #3b82f6;"><svg xmlns="http://www.w3.org/2000/svg" width="18" height="18" viewBox="0 0 24 24" fill="none" stroke="#60a5fa" stroke-width="2" stroke-linecap="round" stroke-linejoin="round"><circle cx="12" cy="12" r="10"></circle><line x1="12" y1="16" x2="12" y2="12"></line><line x1="12" y1="8" x2="12.01" y2="8"></line></svg><span style="color: #bfdbfe;">Terdeteksi kolom <strong>numerik</strong> dengan nilai kosong: {', '.join(numeric_issues)}</span></div>""", unsafe_allow_html=True)
-            fill_numeric_choice = st.selectbox("🔢 Isi nilai numerik kosong dengan:", ["median", "mean", "0"], index=0, help="Pilihan ini akan diterapkan ke semua kolom numerik yang memiliki nilai kosong")
+    # Opsi cleaning, pilihan fitur dan preview sebagai fragment: mengubah opsi tidak menjalankan ulang
+    # deteksi kualitas data di atas maupun CSS & setup session state di awal script
+    @st.fragment
+    def preprocessing_options():
+        # Step 3: Opsi Cleaning Manual
+        st.markdown("""<div class="dashboard-section" style="margin-top: 20px;"><div class="section-icon"><svg xmlns="http://www.w3.org/2000/svg" width="20" height="20" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2" stroke-linecap="round" stroke-linejoin="round"><path d="M11 4H4a2 2 0 0 0-2 2v14a2 2 0 0 0 2 2h14a2 2 0 0 0 2-2v-7"></path><path d="M18.5 2.5a2.121 2.121 0 0 1 3 3L12 15l-4 1 1-4 9.5-9.5z"></path></svg></div><h3 class="section-title" style="font-size: 1.1rem;">3. Opsi Cleaning Manual</h3></div>""", unsafe_allow_html=True)
         
-        # Show categorical options only if there are categorical issues
-        if categorical_issues:
-            st.markdown(f"""<div class="bullet-item" style="background: rgba(59, 130, 246, 0.1); border-left-color: #3b82f6;"><svg xmlns="http://www.w3.org/2000/svg" width="18" height="18" viewBox="0 0 24 24" fill="none" stroke="#60a5fa" stroke-width="2" stroke-linecap="round" stroke-linejoin="round"><circle cx="12" cy="12" r="10"></circle><line x1="12" y1="16" x2="12" y2="12"></line><line x1="12" y1="8" x2="12.01" y2="8"></line></svg><span style="color: #bfdbfe;">Terdeteksi kolom <strong>kategorikal/string</strong> dengan nilai kosong: {', '.join(categorical_issues)}</span></div>""", unsafe_allow_html=True)
-            fill_categorical_choice = st.selectbox("📝 Isi nilai kategorikal kosong dengan:", ["Unknown", "mode"], index=0, help="Pilihan ini akan diterapkan ke semua kolom kategorikal yang memiliki nilai kosong")
+        # Detect which types of columns have issues
+        numeric_issues = []
+        categorical_issues = []
         
-        # If no issues detected, show info
-        if not numeric_issues and not categorical_issues:
-            st.markdown("""<div class="bullet-item" style="background: rgba(16, 185, 129, 0.1); border-left-color: #10b981;"><svg xmlns="http://www.w3.org/2000/svg" width="18" height="18" viewBox="0 0 24 24" fill="none" stroke="#10b981" stroke-width="2" stroke-linecap="round" stroke-linejoin="round"><path d="M22 11.08V12a10 10 0 1 1-5.93-9.14"></path><polyline points="22 4 12 14.01 9 11.01"></polyline></svg><span style="color: #a7f3d0;">Tidak ada nilai kosong terdeteksi pada data.</span></div>""", unsafe_allow_html=True)
-    
-    # Step 4: Pilih Fitur untuk Clustering
-    st.markdown("""<div class="dashboard-section" style="margin-top: 20px;"><div class="section-icon"><svg xmlns="http://www.w3.org/2000/svg" width="20" height="20" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2" stroke-linecap="round" stroke-linejoin="round"><polyline points="22 12 18 12 15 21 9 3 6 12 2 12"></polyline></svg></div><h3 class="section-title" style="font-size: 1.1rem;">4. Pilih Fitur untuk Clustering</h3></div>""", unsafe_allow_html=True)
-    st.markdown("""<div class="bullet-item"><svg xmlns="http://www.w3.org/2000/svg" width="18" height="18" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2" stroke-linecap="round" stroke-linejoin="round"><ellipse cx="12" cy="5" rx="9" ry="3"></ellipse><path d="M21 12c0 1.66-4 3-9 3s-9-1.34-9-3"></path><path d="M3 5v14c0 1.66 4 3 9 3s9-1.34 9-3V5"></path></svg><span>Kolom terdeteksi:</span></div>""", unsafe_allow_html=True)
-    st.dataframe(pd.DataFrame({"columns": df.columns.tolist()}), use_container_width=True)
-    
-    suggested = [c for c in ["victim_age", "victim_race", "victim_sex", "state", "disposition", "lat", "lon"] if c in df.columns]
-    selected = st.multiselect("Pilih fitur untuk clustering", options=list(df.columns), default=suggested)
-    st.session_state.selected_features = selected
-    
-    if st.button("Preview hasil pra-proses"):
-        if len(selected) == 0:
-            st.markdown("""<div class="bullet-item" style="background: rgba(239, 68, 68, 0.15); border-left-color: #ef4444;"><svg xmlns="http://www.w3.org/2000/svg" width="18" height="18" viewBox="0 0 24 24" fill="none" stroke="#ef4444" stroke-width="2" stroke-linecap="round" stroke-linejoin="round"><circle cx="12" cy="12" r="10"></circle><line x1="15" y1="9" x2="9" y2="15"></line><line x1="9" y1="9" x2="15" y2="15"></line></svg><span style="color: #fca5a5;">Pilih minimal satu fitur.</span></div>""", unsafe_allow_html=True)
-        else:
-            with st.spinner("Menghitung preview..."):
-                dfp, Xsc, feat_cols = preprocess_with_options(df, selected, fill_numeric_choice, fill_categorical_choice, remove_dup, remove_null)
-                if Xsc is None:
-                    st.markdown("""<div class="bullet-item" style="background: rgba(239, 68, 68, 0.15); border-left-color: #ef4444;"><svg xmlns="http://www.w3.org/2000/svg" width="18" height="18" viewBox="0 0 24 24" fill="none" stroke="#ef4444" stroke-width="2" stroke-linecap="round" stroke-linejoin="round"><circle cx="12" cy="12" r="10"></circle><line x1="15" y1="9" x2="9" y2="15"></line><line x1="9" y1="9" x2="15" y2="15"></line></svg><span style="color: #fca5a5;">Tidak ada fitur yang dapat diproses. Periksa pilihan fitur.</span></div>""", unsafe_allow_html=True)
-                else:
-                    st.session_state.df_cleaned = dfp
-                    st.session_state.X_scaled = Xsc
-                    st.session_state.feature_cols = feat_cols
-                    st.markdown("""<div class="bullet-item" style="background: rgba(16, 185, 129, 0.15); border-left-color: #10b981;"><svg xmlns="http://www.w3.org/2000/svg" width="18" height="18" viewBox="0 0 24 24" fill="none" stroke="#10b981" stroke-width="2" stroke-linecap="round" stroke-linejoin="round"><path d="M22 11.08V12a10 10 0 1 1-5.93-9.14"></path><polyline points="22 4 12 14.01 9 11.01"></polyline></svg><span style="color: #a7f3d0;">Pra-proses selesai.</span></div>""", unsafe_allow_html=True)
-                    
-                    st.markdown(f"""<div class="bullet-item"><svg xmlns="http://www.w3.org/2000/svg" width="18" height="18" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2" stroke-linecap="round" stroke-linejoin="round"><circle cx="12" cy="12" r="10"></circle><line x1="12" y1="16" x2="12" y2="12"></line><line x1="12" y1="8" x2="12.01" y2="8"></line></svg><span><strong>Hasil</strong>: {len(dfp)} baris (dari {len(df)} baris awal), {len(feat_cols)} fitur terkode</span></div>""", unsafe_allow_html=True)
-                    st.markdown("""<div class="dashboard-section" style="margin-top: 16px;"><div class="section-icon"><svg xmlns="http://www.w3.org/2000/svg" width="20" height="20" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2" stroke-linecap="round" stroke-linejoin="round"><ellipse cx="12" cy="5" rx="9" ry="3"></ellipse><path d="M21 12c0 1.66-4 3-9 3s-9-1.34-9-3"></path><path d="M3 5v14c0 1.66 4 3 9 3s9-1.34 9-3V5"></path></svg></div><h3 class="section-title" style="font-size: 1.1rem;">Data setelah cleaning:</h3></div>""", unsafe_allow_html=True)
-                    st.dataframe(dfp.head(10), use_container_width=True)
-    
+        for col, issue in issues.items():
+            if issue['type'] == 'missing':
+                if issue['kind'] == "numeric":
+                    numeric_issues.append(col)
+                else:  # categorical/string
+                    categorical_issues.append(col)
+        
+        # Three main cleaning options
+        st.markdown("""<div class="bullet-item" style="background: rgba(59, 130, 246, 0.08); border-left-color: #3b82f6;"><svg xmlns="http://www.w3.org/2000/svg" width="18" height="18" viewBox="0 0 24 24" fill="none" stroke="#60a5fa" stroke-width="2" stroke-linecap="round" stroke-linejoin="round"><circle cx="12" cy="12" r="10"></circle><line x1="12" y1="16" x2="12" y2="12"></line><line x1="12" y1="8" x2="12.01" y2="8"></line></svg><span style="color: #bfdbfe;">Pilih metode cleaning yang ingin diterapkan:</span></div>""", unsafe_allow_html=True)
+        
+        # Checkbox for duplicate removal (independent)
+        remove_dup = st.checkbox("Hapus duplikat", value=False, help="Menghapus baris yang identik/duplikat")
+        duplicate_keys = []
+        if remove_dup:
+            duplicate_keys = st.multiselect("Kolom kunci duplikat (opsional)", options=list(df.columns),
+                                            help="Kosongkan untuk membandingkan semua kolom; mis. pilih uid agar baris dengan uid sama dianggap duplikat")
+        
+        # Radio buttons for null value handling strategy (mutually exclusive)
+        st.markdown("""<div style="margin-top: 12px; margin-bottom: 8px; color: #e5e5e5; font-weight: 500;">Strategi penanganan nilai kosong:</div>""", unsafe_allow_html=True)
+        null_strategy = st.radio(
+            "Pilih strategi:",
+            options=["Ganti nilai kosong", "Hapus nilai null"],
+            index=0,
+            help="Pilih salah satu: mengganti nilai kosong dengan strategi tertentu ATAU menghapus baris dengan nilai kosong",
+            label_visibility="collapsed"
+        )
+        
+        # Set flags based on radio selection
+        remove_null = (null_strategy == "Hapus nilai null")
+        replace_values = (null_strategy == "Ganti nilai kosong")
+        
+        # Show info when remove_null is selected
+        if remove_null:
+            st.markdown("""<div class="bullet-item" style="background: rgba(245, 158, 11, 0.12); border-left-color: #f59e0b;"><svg xmlns="http://www.w3.org/2000/svg" width="18" height="18" viewBox="0 0 24 24" fill="none" stroke="#f59e0b" stroke-width="2" stroke-linecap="round" stroke-linejoin="round"><path d="M10.29 3.86L1.82 18a2 2 0 0 0 1.71 3h16.94a2 2 0 0 0 1.71-3L13.71 3.86a2 2 0 0 0-3.42 0z"></path><line x1="12" y1="9" x2="12" y2="13"></line><line x1="12" y1="17" x2="12.01" y2="17"></line></svg><span style="color: #fde68a;">⚠️ Mode "Hapus nilai null" - semua baris dengan nilai kosong akan dihapus</span></div>""", unsafe_allow_html=True)
+        
+        # Show replacement options only if replace_values is selected
+        fill_numeric_choice = "median"  # default
+        fill_categorical_choice = "Unknown"  # default
+        
+        if replace_values:
+            # Show numeric options only if there are numeric issues
+            if numeric_issues:
+                st.markdown(f"""<div class="bullet-item" style="background: rgba(59, 130, 246, 0.1); border-left-color: #3b82f6;"><svg xmlns="http://www.w3.org/2000/svg" width="18" height="18" viewBox="0 0 24 24" fill="none" stroke="#60a5fa" stroke-width="2" stroke-linecap="round" stroke-linejoin="round"><circle cx="12" cy="12" r="10"></circle><line x1="12" y1="16" x2="12" y2="12"></line><line x1="12" y1="8" x2="12.01" y2="8"></line></svg><span style="color: #bfdbfe;">Terdeteksi kolom <strong>numerik</strong> dengan nilai kosong: {', '.join(numeric_issues)}</span></div>""", unsafe_allow_html=True)
+                fill_numeric_choice = st.selectbox("🔢 Isi nilai numerik kosong dengan:", ["median", "mean", "0"], index=0, help="Pilihan ini akan diterapkan ke semua kolom numerik yang memiliki nilai kosong")
+            
+            # Show categorical options only if there are categorical issues
+            if categorical_issues:
+                st.markdown(f"""<div class="bullet-item" style="background: rgba(59, 130, 246, 0.1); border-left-color: #3b82f6;"><svg xmlns="http://www.w3.org/2000/svg" width="18" height="18" viewBox="0 0 24 24" fill="none" stroke="#60a5fa" stroke-width="2" stroke-linecap="round" stroke-linejoin="round"><circle cx="12" cy="12" r="10"></circle><line x1="12" y1="16" x2="12" y2="12"></line><line x1="12" y1="8" x2="12.01" y2="8"></line></svg><span style="color: #bfdbfe;">Terdeteksi kolom <strong>kategorikal/string</strong> dengan nilai kosong: {', '.join(categorical_issues)}</span></div>""", unsafe_allow_html=True)
+                fill_categorical_choice = st.selectbox("📝 Isi nilai kategorikal kosong dengan:", ["Unknown", "mode"], index=0, help="Pilihan ini akan diterapkan ke semua kolom kategorikal yang memiliki nilai kosong")
+            
+            # If no issues detected, show info
+            if not numeric_issues and not categorical_issues:
+                st.markdown("""<div class="bullet-item" style="background: rgba(16, 185, 129, 0.1); border-left-color: #10b981;"><svg xmlns="http://www.w3.org/2000/svg" width="18" height="18" viewBox="0 0 24 24" fill="none" stroke="#10b981" stroke-width="2" stroke-linecap="round" stroke-linejoin="round"><path d="M22 11.08V12a10 10 0 1 1-5.93-9.14"></path><polyline points="22 4 12 14.01 9 11.01"></polyline></svg><span style="color: #a7f3d0;">Tidak ada nilai kosong terdeteksi pada data.</span></div>""", unsafe_allow_html=True)
+        
+        # Step 4: Pilih Fitur untuk Clustering
+        st.markdown("""<div class="dashboard-section" style="margin-top: 20px;"><div class="section-icon"><svg xmlns="http://www.w3.org/2000/svg" width="20" height="20" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2" stroke-linecap="round" stroke-linejoin="round"><polyline points="22 12 18 12 15 21 9 3 6 12 2 12"></polyline></svg></div><h3 class="section-title" style="font-size: 1.1rem;">4. Pilih Fitur untuk Clustering</h3></div>""", unsafe_allow_html=True)
+        st.markdown("""<div class="bullet-item"><svg xmlns="http://www.w3.org/2000/svg" width="18" height="18" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2" stroke-linecap="round" stroke-linejoin="round"><ellipse cx="12" cy="5" rx="9" ry="3"></ellipse><path d="M21 12c0 1.66-4 3-9 3s-9-1.34-9-3"></path><path d="M3 5v14c0 1.66 4 3 9 3s9-1.34 9-3V5"></path></svg><span>Kolom terdeteksi:</span></div>""", unsafe_allow_html=True)
+        st.dataframe(pd.DataFrame({"columns": df.columns.tolist()}), use_container_width=True)
+        
+        suggested = [c for c in DEFAULT_FEATURES if c in df.columns]
+        selected = st.multiselect("Pilih fitur untuk clustering", options=list(df.columns), default=suggested)
+        st.session_state.selected_features = selected
+
+        # Encoder per fitur kategorikal: city / victim_last / uid tidak perlu satu kolom per nilai (encoders.py)
+        cat_selected = [f for f in selected if encoders.is_categorical(df[f])]
+        encoder_methods = {}
+        if cat_selected:
+            with st.expander("Encoder fitur kategorikal"):
+                st.caption(f"One-hot untuk fitur dengan lebih dari {encoders.CARDINALITY_LIMIT} nilai unik otomatis diganti "
+                           f"Top-{encoders.TOP_N} + other; frekuensi = 1 kolom, hashing = {encoders.HASH_BUCKETS} kolom.")
+                col_enc = st.columns(min(len(cat_selected), 3))
+                for i, f in enumerate(cat_selected):
+                    distinct = quality["columns"]["distinct"].get(f)
+                    capped = "≥" if quality["columns"]["distinct_capped"].get(f) else ""
+                    with col_enc[i % len(col_enc)]:
+                        encoder_methods[f] = st.selectbox(f"{f} ({capped}{distinct} nilai unik)", options=list(encoders.ENCODERS),
+                                                          format_func=encoders.ENCODERS.get, key=f"encoder_{f}")
+        
+        if st.button("Preview hasil pra-proses"):
+            if len(selected) == 0:
+                st.markdown("""<div class="bullet-item" style="background: rgba(239, 68, 68, 0.15); border-left-color: #ef4444;"><svg xmlns="http://www.w3.org/2000/svg" width="18" height="18" viewBox="0 0 24 24" fill="none" stroke="#ef4444" stroke-width="2" stroke-linecap="round" stroke-linejoin="round"><circle cx="12" cy="12" r="10"></circle><line x1="15" y1="9" x2="9" y2="15"></line><line x1="9" y1="9" x2="15" y2="15"></line></svg><span style="color: #fca5a5;">Pilih minimal satu fitur.</span></div>""", unsafe_allow_html=True)
+            else:
+                with st.spinner("Menghitung preview..."):
+                    with track_stage("preprocess", rows=len(df)) as rec:
+                        layer = fit_cleaning(df, selected, fill_numeric_choice, fill_categorical_choice, remove_dup, remove_null,
+                                             duplicate_keys or None)
+                        dfp = clean_view(df, layer)
+                        Xsc, feat_cols = encode_features(dfp, selected, encoder_methods)
+                        guarded = {f: spec for f, spec in encoders.fit_specs(dfp, selected, encoder_methods).items() if spec["auto"]}
+                        dedup = layer["duplicates"]
+                        if Xsc is not None:
+                            rec["detail"] = f"{len(dfp)} baris, {Xsc.shape[1]} fitur terkode"
+                            if dedup:
+                                rec["detail"] += f", {dedup['dropped']} duplikat dibuang ({dedup['seconds']:.2f}s)"
+                    if Xsc is None:
+                        st.markdown("""<div class="bullet-item" style="background: rgba(239, 68, 68, 0.15); border-left-color: #ef4444;"><svg xmlns="http://www.w3.org/2000/svg" width="18" height="18" viewBox="0 0 24 24" fill="none" stroke="#ef4444" stroke-width="2" stroke-linecap="round" stroke-linejoin="round"><circle cx="12" cy="12" r="10"></circle><line x1="15" y1="9" x2="9" y2="15"></line><line x1="9" y1="9" x2="15" y2="15"></line></svg><span style="color: #fca5a5;">Tidak ada fitur yang dapat diproses. Periksa pilihan fitur.</span></div>""", unsafe_allow_html=True)
+                    else:
+                        st.session_state.clean_layer = layer
+                        st.session_state.run_params = {
+                            "features": list(selected), "fill_numeric_method": fill_numeric_choice,
+                            "fill_categorical_method": fill_categorical_choice, "remove_duplicates": remove_dup,
+                            "duplicate_subset": duplicate_keys or None, "remove_missing": remove_null,
+                            "encoders": encoder_methods or None}
+                        st.session_state.X_scaled = Xsc
+                        st.session_state.feature_cols = feat_cols
+                        # hasil clustering lama tidak lagi cocok dengan baris/fitur baru
+                        st.session_state.embedding = None
+                        st.session_state.cluster_labels = None
+                        st.session_state.cluster_profile = None
+                        st.session_state.silhouette_values = None
+                        st.session_state.k_metrics = None
+                        st.markdown("""<div class="bullet-item" style="background: rgba(16, 185, 129, 0.15); border-left-color: #10b981;"><svg xmlns="http://www.w3.org/2000/svg" width="18" height="18" viewBox="0 0 24 24" fill="none" stroke="#10b981" stroke-width="2" stroke-linecap="round" stroke-linejoin="round"><path d="M22 11.08V12a10 10 0 1 1-5.93-9.14"></path><polyline points="22 4 12 14.01 9 11.01"></polyline></svg><span style="color: #a7f3d0;">Pra-proses selesai.</span></div>""", unsafe_allow_html=True)
+                        
+                        st.markdown(f"""<div class="bullet-item"><svg xmlns="http://www.w3.org/2000/svg" width="18" height="18" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2" stroke-linecap="round" stroke-linejoin="round"><circle cx="12" cy="12" r="10"></circle><line x1="12" y1="16" x2="12" y2="12"></line><line x1="12" y1="8" x2="12.01" y2="8"></line></svg><span><strong>Hasil</strong>: {len(dfp)} baris (dari {len(df)} baris awal), {len(feat_cols)} fitur terkode</span></div>""", unsafe_allow_html=True)
+                        if dedup:
+                            dedup_keys = ", ".join(dedup["subset"]) if dedup["subset"] else "semua kolom"
+                            st.markdown(f"""<div class="bullet-item"><svg xmlns="http://www.w3.org/2000/svg" width="18" height="18" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2" stroke-linecap="round" stroke-linejoin="round"><circle cx="12" cy="12" r="10"></circle><line x1="12" y1="16" x2="12" y2="12"></line><line x1="12" y1="8" x2="12.01" y2="8"></line></svg><span><strong>Duplikat</strong>: {dedup['dropped']} baris dibuang (kunci: {dedup_keys}), deteksi {dedup['seconds']:.2f} detik</span></div>""", unsafe_allow_html=True)
+                        for f, spec in guarded.items():
+                            st.markdown(f"""<div class="bullet-item" style="background: rgba(245, 158, 11, 0.12); border-left-color: #f59e0b;"><svg xmlns="http://www.w3.org/2000/svg" width="18" height="18" viewBox="0 0 24 24" fill="none" stroke="#f59e0b" stroke-width="2" stroke-linecap="round" stroke-linejoin="round"><path d="M10.29 3.86L1.82 18a2 2 0 0 0 1.71 3h16.94a2 2 0 0 0 1.71-3L13.71 3.86a2 2 0 0 0-3.42 0z"></path><line x1="12" y1="9" x2="12" y2="13"></line><line x1="12" y1="17" x2="12.01" y2="17"></line></svg><span style="color: #fde68a;"><strong>{f}</strong>: {spec['cardinality']} nilai unik, one-hot diganti Top-{len(spec['categories'])} + other ({len(spec['categories']) + 1} kolom)</span></div>""", unsafe_allow_html=True)
+                        st.markdown("""<div class="dashboard-section" style="margin-top: 16px;"><div class="section-icon"><svg xmlns="http://www.w3.org/2000/svg" width="20" height="20" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2" stroke-linecap="round" stroke-linejoin="round"><ellipse cx="12" cy="5" rx="9" ry="3"></ellipse><path d="M21 12c0 1.66-4 3-9 3s-9-1.34-9-3"></path><path d="M3 5v14c0 1.66 4 3 9 3s9-1.34 9-3V5"></path></svg></div><h3 class="section-title" style="font-size: 1.1rem;">Data setelah cleaning:</h3></div>""", unsafe_allow_html=True)
+                        st.dataframe(dfp.head(10), use_container_width=True)
+    preprocessing_options()
+
     st.markdown("</div>", unsafe_allow_html=True)
 
 # ╔═══════════════════════════════════════════════════════════════════════════╗
@@ -1557,6 +1906,7 @@ elif page == "Preprocessing Data":
 # ║  - Metode Silhouette Score                                                ║
 # ║  - Saran K terbaik secara otomatis                                        ║
 # ║  - Opsi pilih K manual                                                    ║
+# ║  - Clustering per state / kota dengan K otomatis sendiri (partitions.py)  ║
 # ║                                                                           ║
 # ╚═══════════════════════════════════════════════════════════════════════════╝
 elif page == "Analisis Data":
@@ -1576,54 +1926,115 @@ elif page == "Analisis Data":
     
     # Step 1: Hitung Metrik Elbow & Silhouette
     st.markdown("""<div class="dashboard-section" style="margin-top: 20px;"><div class="section-icon"><svg xmlns="http://www.w3.org/2000/svg" width="20" height="20" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2" stroke-linecap="round" stroke-linejoin="round"><polyline points="22 12 18 12 15 21 9 3 6 12 2 12"></polyline></svg></div><h3 class="section-title" style="font-size: 1.1rem;">1. Hitung Metrik Elbow & Silhouette</h3></div>""", unsafe_allow_html=True)
-    max_k = st.slider("Max K untuk diuji", min_value=3, max_value=12, value=8)
-    
-    compute = st.button("Compute Elbow & Silhouette")
-    if compute:
-        with st.spinner("Menghitung metrik untuk setiap K..."):
-            ks, inertias, silhouettes = compute_k_metrics(Xscaled, k_min=2, k_max=max_k, random_state=42)
-            suggested_k, method_used = suggest_k(ks, inertias, silhouettes)
-            st.session_state.suggested_k = suggested_k
-            st.session_state.suggested_method = method_used
-            
-            st.markdown(f"""<div class="bullet-item" style="background: rgba(16, 185, 129, 0.15); border-left-color: #10b981;"><svg xmlns="http://www.w3.org/2000/svg" width="18" height="18" viewBox="0 0 24 24" fill="none" stroke="#10b981" stroke-width="2" stroke-linecap="round" stroke-linejoin="round"><path d="M22 11.08V12a10 10 0 1 1-5.93-9.14"></path><polyline points="22 4 12 14.01 9 11.01"></polyline></svg><span style="color: #a7f3d0;"><strong>Saran K terbaik: {suggested_k}</strong> (metode: {method_used})</span></div>""", unsafe_allow_html=True)
-            
-            col1, col2 = st.columns(2)
-            with col1:
-                fig = px.line(x=ks, y=inertias, markers=True, title="Elbow (Inertia)", 
-                             labels={"x": "K", "y": "Inertia"})
-                fig.add_vline(x=suggested_k, line_dash="dash", line_color="red", annotation_text=f"K={suggested_k}")
-                fig.update_layout(paper_bgcolor='rgba(0,0,0,0)', plot_bgcolor='rgba(20,20,20,0.8)', font_color='#e5e5e5')
-                st.plotly_chart(fig, use_container_width=True)
-            with col2:
-                fig2 = px.line(x=ks, y=[s if s is not None else np.nan for s in silhouettes], markers=True, 
-                              title="Silhouette Score", labels={"x": "K", "y": "Silhouette"})
-                fig2.add_vline(x=suggested_k, line_dash="dash", line_color="red", annotation_text=f"K={suggested_k}")
-                fig2.update_layout(paper_bgcolor='rgba(0,0,0,0)', plot_bgcolor='rgba(20,20,20,0.8)', font_color='#e5e5e5')
-                st.plotly_chart(fig2, use_container_width=True)
-    else:
-        if st.session_state.suggested_k is not None:
-            st.markdown(f"""<div class="bullet-item"><svg xmlns="http://www.w3.org/2000/svg" width="18" height="18" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2" stroke-linecap="round" stroke-linejoin="round"><circle cx="12" cy="12" r="10"></circle><line x1="12" y1="16" x2="12" y2="12"></line><line x1="12" y1="8" x2="12.01" y2="8"></line></svg><span>Saran K sebelumnya: {st.session_state.suggested_k}</span></div>""", unsafe_allow_html=True)
+    # Kontrol metrik K sebagai fragment: slider / batas waktu tidak menjalankan ulang seluruh halaman
+    @st.fragment
+    def k_metrics_controls():
+        max_k = st.slider("Max K untuk diuji", min_value=3, max_value=12, value=8)
+        k_budget = st.number_input("Batas waktu (detik)", min_value=5, max_value=3600, value=jobs.STAGE_BUDGETS["compute_k_metrics"], step=5,
+                                   help="Bila habis, metrik hanya memakai K yang sudah selesai dihitung")
+        
+        # Dijalankan sebagai job latar belakang (jobs.py); progress K ke-i dari N di-polling halaman ini
+        if st.button("Compute Elbow & Silhouette", disabled=job_pending("k_metrics")):
+            job = jobs.Job("k_metrics", "Elbow & Silhouette", ["compute_k_metrics"], page=page, inputs=Xscaled)
+            st.session_state.jobs["k_metrics"] = jobs.submit(get_executor(), job, jobs.k_metrics_job, Xscaled, k_min=2, k_max=max_k,
+                                                             random_state=42, budget=k_budget, cache=get_result_cache())
+            # rerun seluruh halaman supaya progress & grafik di luar fragment ikut tampil
+            st.rerun()
+    k_metrics_controls()
+
+    if job_pending("k_metrics"):
+        job_progress("k_metrics")
+    show_job_status("k_metrics")
+
+    if st.session_state.k_metrics is not None:
+        ks = st.session_state.k_metrics["ks"]
+        inertias = st.session_state.k_metrics["inertias"]
+        silhouettes = st.session_state.k_metrics["silhouettes"]
+        suggested_k = st.session_state.suggested_k
+        method_used = st.session_state.suggested_method
+        
+        st.markdown(f"""<div class="bullet-item" style="background: rgba(16, 185, 129, 0.15); border-left-color: #10b981;"><svg xmlns="http://www.w3.org/2000/svg" width="18" height="18" viewBox="0 0 24 24" fill="none" stroke="#10b981" stroke-width="2" stroke-linecap="round" stroke-linejoin="round"><path d="M22 11.08V12a10 10 0 1 1-5.93-9.14"></path><polyline points="22 4 12 14.01 9 11.01"></polyline></svg><span style="color: #a7f3d0;"><strong>Saran K terbaik: {suggested_k}</strong> (metode: {method_used})</span></div>""", unsafe_allow_html=True)
+        
+        col1, col2 = st.columns(2)
+        with col1:
+            fig = px.line(x=ks, y=inertias, markers=True, title="Elbow (Inertia)", 
+                         labels={"x": "K", "y": "Inertia"})
+            fig.add_vline(x=suggested_k, line_dash="dash", line_color="red", annotation_text=f"K={suggested_k}")
+            fig.update_layout(paper_bgcolor='rgba(0,0,0,0)', plot_bgcolor='rgba(20,20,20,0.8)', font_color='#e5e5e5')
+            st.plotly_chart(fig, use_container_width=True)
+        with col2:
+            fig2 = px.line(x=ks, y=[s if s is not None else np.nan for s in silhouettes], markers=True, 
+                          title="Silhouette Score", labels={"x": "K", "y": "Silhouette"})
+            fig2.add_vline(x=suggested_k, line_dash="dash", line_color="red", annotation_text=f"K={suggested_k}")
+            fig2.update_layout(paper_bgcolor='rgba(0,0,0,0)', plot_bgcolor='rgba(20,20,20,0.8)', font_color='#e5e5e5')
+            st.plotly_chart(fig2, use_container_width=True)
+    elif st.session_state.suggested_k is not None:
+        st.markdown(f"""<div class="bullet-item"><svg xmlns="http://www.w3.org/2000/svg" width="18" height="18" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2" stroke-linecap="round" stroke-linejoin="round"><circle cx="12" cy="12" r="10"></circle><line x1="12" y1="16" x2="12" y2="12"></line><line x1="12" y1="8" x2="12.01" y2="8"></line></svg><span>Saran K sebelumnya: {st.session_state.suggested_k}</span></div>""", unsafe_allow_html=True)
     
     # Step 2: Pilih K untuk Clustering
     st.markdown("""<div class="dashboard-section" style="margin-top: 20px;"><div class="section-icon"><svg xmlns="http://www.w3.org/2000/svg" width="20" height="20" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2" stroke-linecap="round" stroke-linejoin="round"><circle cx="12" cy="12" r="10"></circle><circle cx="12" cy="12" r="6"></circle><circle cx="12" cy="12" r="2"></circle></svg></div><h3 class="section-title" style="font-size: 1.1rem;">2. Pilih K untuk Clustering</h3></div>""", unsafe_allow_html=True)
-    use_auto = st.checkbox("Gunakan K saran otomatis", value=True)
-    if not use_auto:
-        k_manual = st.number_input("K manual", min_value=2, max_value=20, value=3, step=1)
-        final_k = int(k_manual)
-    else:
-        if st.session_state.suggested_k is not None:
-            final_k = st.session_state.suggested_k
+    # Pilihan K sebagai fragment: centang K otomatis / K manual hanya menjalankan ulang bagian ini
+    @st.fragment
+    def k_selection():
+        use_auto = st.checkbox("Gunakan K saran otomatis", value=True)
+        if not use_auto:
+            k_manual = st.number_input("K manual", min_value=2, max_value=20, value=3, step=1)
+            final_k = int(k_manual)
         else:
-            final_k = 3
-            st.markdown("""<div class="bullet-item" style="background: rgba(245, 158, 11, 0.15); border-left-color: #f59e0b;"><svg xmlns="http://www.w3.org/2000/svg" width="18" height="18" viewBox="0 0 24 24" fill="none" stroke="#f59e0b" stroke-width="2" stroke-linecap="round" stroke-linejoin="round"><path d="M10.29 3.86L1.82 18a2 2 0 0 0 1.71 3h16.94a2 2 0 0 0 1.71-3L13.71 3.86a2 2 0 0 0-3.42 0z"></path><line x1="12" y1="9" x2="12" y2="13"></line><line x1="12" y1="17" x2="12.01" y2="17"></line></svg><span style="color: #fde68a;">Belum ada saran K. Gunakan default K=3 atau compute terlebih dahulu.</span></div>""", unsafe_allow_html=True)
-    
-    st.markdown(f"""<div class="bullet-item"><svg xmlns="http://www.w3.org/2000/svg" width="18" height="18" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2" stroke-linecap="round" stroke-linejoin="round"><circle cx="12" cy="12" r="10"></circle><line x1="12" y1="16" x2="12" y2="12"></line><line x1="12" y1="8" x2="12.01" y2="8"></line></svg><span><strong>K yang akan digunakan: {final_k}</strong></span></div>""", unsafe_allow_html=True)
-    
-    if st.button("Konfirmasi & Lanjut ke Visualisasi"):
-        st.session_state.final_k = final_k
-        st.markdown("""<div class="bullet-item" style="background: rgba(16, 185, 129, 0.15); border-left-color: #10b981;"><svg xmlns="http://www.w3.org/2000/svg" width="18" height="18" viewBox="0 0 24 24" fill="none" stroke="#10b981" stroke-width="2" stroke-linecap="round" stroke-linejoin="round"><path d="M22 11.08V12a10 10 0 1 1-5.93-9.14"></path><polyline points="22 4 12 14.01 9 11.01"></polyline></svg><span style="color: #a7f3d0;">K dikonfirmasi. Lanjut ke halaman 'Visualisasi' untuk melihat hasil clustering.</span></div>""", unsafe_allow_html=True)
-    
+            if st.session_state.suggested_k is not None:
+                final_k = st.session_state.suggested_k
+            else:
+                final_k = 3
+                st.markdown("""<div class="bullet-item" style="background: rgba(245, 158, 11, 0.15); border-left-color: #f59e0b;"><svg xmlns="http://www.w3.org/2000/svg" width="18" height="18" viewBox="0 0 24 24" fill="none" stroke="#f59e0b" stroke-width="2" stroke-linecap="round" stroke-linejoin="round"><path d="M10.29 3.86L1.82 18a2 2 0 0 0 1.71 3h16.94a2 2 0 0 0 1.71-3L13.71 3.86a2 2 0 0 0-3.42 0z"></path><line x1="12" y1="9" x2="12" y2="13"></line><line x1="12" y1="17" x2="12.01" y2="17"></line></svg><span style="color: #fde68a;">Belum ada saran K. Gunakan default K=3 atau compute terlebih dahulu.</span></div>""", unsafe_allow_html=True)
+        
+        st.markdown(f"""<div class="bullet-item"><svg xmlns="http://www.w3.org/2000/svg" width="18" height="18" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2" stroke-linecap="round" stroke-linejoin="round"><circle cx="12" cy="12" r="10"></circle><line x1="12" y1="16" x2="12" y2="12"></line><line x1="12" y1="8" x2="12.01" y2="8"></line></svg><span><strong>K yang akan digunakan: {final_k}</strong></span></div>""", unsafe_allow_html=True)
+        
+        if st.button("Konfirmasi & Lanjut ke Visualisasi"):
+            st.session_state.final_k = final_k
+            st.markdown("""<div class="bullet-item" style="background: rgba(16, 185, 129, 0.15); border-left-color: #10b981;"><svg xmlns="http://www.w3.org/2000/svg" width="18" height="18" viewBox="0 0 24 24" fill="none" stroke="#10b981" stroke-width="2" stroke-linecap="round" stroke-linejoin="round"><path d="M22 11.08V12a10 10 0 1 1-5.93-9.14"></path><polyline points="22 4 12 14.01 9 11.01"></polyline></svg><span style="color: #a7f3d0;">K dikonfirmasi. Lanjut ke halaman 'Visualisasi' untuk melihat hasil clustering.</span></div>""", unsafe_allow_html=True)
+    k_selection()
+
+    # Step 3: Clustering per wilayah — tiap state / kota di-cluster sendiri dengan K otomatis sendiri
+    # di proses worker (partitions.py); hasil per partisi masuk cache bersama
+    st.markdown("""<div class="dashboard-section" style="margin-top: 20px;"><div class="section-icon"><svg xmlns="http://www.w3.org/2000/svg" width="20" height="20" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2" stroke-linecap="round" stroke-linejoin="round"><path d="M21 10c0 7-9 13-9 13s-9-6-9-13a9 9 0 0 1 18 0z"></path><circle cx="12" cy="10" r="3"></circle></svg></div><h3 class="section-title" style="font-size: 1.1rem;">3. Clustering per Wilayah (opsional)</h3></div>""", unsafe_allow_html=True)
+    part_columns = [c for c in partitions.PARTITION_COLUMNS if c in cleaned_frame().columns]
+    if not part_columns:
+        st.markdown("""<div class="bullet-item"><svg xmlns="http://www.w3.org/2000/svg" width="18" height="18" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2" stroke-linecap="round" stroke-linejoin="round"><circle cx="12" cy="12" r="10"></circle><line x1="12" y1="16" x2="12" y2="12"></line><line x1="12" y1="8" x2="12.01" y2="8"></line></svg><span>Kolom <code>state</code> / <code>city</code> tidak ada di data.</span></div>""", unsafe_allow_html=True)
+    else:
+        @st.fragment
+        def partition_controls():
+            col_p = st.columns(4)
+            with col_p[0]:
+                part_col = st.radio("Partisi per", options=part_columns, format_func=partitions.PARTITION_COLUMNS.get, horizontal=True)
+            with col_p[1]:
+                part_k_max = st.slider("Max K per partisi", 3, 10, 6)
+            with col_p[2]:
+                min_rows = st.number_input("Min baris", min_value=10, max_value=10000, value=partitions.MIN_PARTITION_ROWS, step=10)
+            with col_p[3]:
+                workers = st.number_input("Proses worker", min_value=1, max_value=64, value=os.cpu_count() or 1, step=1, key="partition_workers")
+            if st.button("Jalankan clustering per wilayah", disabled=job_pending("partitions")):
+                job = jobs.Job("partitions", f"Clustering per {partitions.PARTITION_COLUMNS[part_col].lower()}", ["partitions"], page=page, inputs=Xscaled)
+                st.session_state.jobs["partitions"] = jobs.submit(get_executor(), job, jobs.partitions_job, cleaned_frame(), part_col, selected,
+                                                                  k_max=part_k_max, min_rows=int(min_rows), max_workers=int(workers),
+                                                                  cache=get_result_cache())
+                st.rerun()
+        partition_controls()
+        if job_pending("partitions"):
+            job_progress("partitions")
+        show_job_status("partitions")
+
+        p_state = st.session_state.partitions
+        if p_state is not None and p_state["inputs"] is Xscaled:
+            p_result = p_state["result"]
+            p_summary = p_result["summary"]
+            st.caption(f"{len(p_summary)} partisi ({p_summary['cached'].sum()} dari cache) dalam {p_result['seconds']:.1f} detik"
+                       + (f"; dilewati: {len(p_result['skipped'])} partisi kecil" if p_result["skipped"] else ""))
+            fig_part = px.bar(p_summary.head(30), x="partition", y="silhouette", color="k", title="Kualitas klaster per partisi (30 teratas)",
+                              labels={"partition": partitions.PARTITION_COLUMNS[p_result["column"]], "silhouette": "Silhouette", "k": "K"})
+            fig_part.update_layout(paper_bgcolor='rgba(0,0,0,0)', plot_bgcolor='rgba(20,20,20,0.8)', font_color='#e5e5e5')
+            st.plotly_chart(fig_part, use_container_width=True)
+            st.dataframe(p_summary, hide_index=True, use_container_width=True)
+
     st.markdown("</div>", unsafe_allow_html=True)
 
 # ╔═══════════════════════════════════════════════════════════════════════════╗
@@ -1632,10 +2043,12 @@ elif page == "Analisis Data":
 # ║                                                                           ║
 # ║  Halaman untuk menjalankan clustering dan visualisasi:                    ║
 # ║  - Pilih metode reduksi dimensi (PCA, t-SNE, UMAP)                        ║
-# ║  - Jalankan K-Means clustering                                            ║
+# ║  - Jalankan K-Means clustering, atau DBSCAN pada lat/lon (eps dalam km)   ║
+# ║    atau K-Prototypes pada kode kategori (tanpa one-hot)                   ║
 # ║  - Visualisasi klaster 2D                                                 ║
 # ║  - Peta geografis (jika ada koordinat lat/lon)                            ║
-# ║  - Download hasil clustering                                              ║
+# ║  - Cari kasus per lokasi: radius / terdekat / kotak (geo.py)              ║
+# ║  - Ekspor hasil: Parquet / CSV gzip per chunk + profil klaster (export.py)║
 # ║                                                                           ║
 # ╚═══════════════════════════════════════════════════════════════════════════╝
 elif page == "Visualisasi":
@@ -1643,7 +2056,7 @@ elif page == "Visualisasi":
     st.markdown("""<div class="card"><div class="dashboard-section"><div class="section-icon"><svg xmlns="http://www.w3.org/2000/svg" width="24" height="24" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2" stroke-linecap="round" stroke-linejoin="round"><circle cx="12" cy="12" r="10"></circle><line x1="2" y1="12" x2="22" y2="12"></line><path d="M12 2a15.3 15.3 0 0 1 4 10 15.3 15.3 0 0 1-4 10 15.3 15.3 0 0 1-4-10 15.3 15.3 0 0 1 4-10z"></path></svg></div><h3 class="section-title">Visualisasi Hasil Clustering</h3></div>""", unsafe_allow_html=True)
     
     Xscaled = st.session_state.X_scaled
-    dfp = st.session_state.df_cleaned if not st.session_state.df_cleaned.empty else st.session_state.df_raw
+    dfp = cleaned_frame()
     final_k = st.session_state.final_k
     
     if Xscaled is None or final_k is None:
@@ -1651,57 +2064,80 @@ elif page == "Visualisasi":
         st.markdown("</div>", unsafe_allow_html=True)
         st.stop()
     
-    # Step 1: Pilih Metode Reduksi Dimensi
-    st.markdown("""<div class="dashboard-section" style="margin-top: 20px;"><div class="section-icon"><svg xmlns="http://www.w3.org/2000/svg" width="20" height="20" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2" stroke-linecap="round" stroke-linejoin="round"><polygon points="12 2 2 7 12 12 22 7 12 2"></polygon><polyline points="2 17 12 22 22 17"></polyline><polyline points="2 12 12 17 22 12"></polyline></svg></div><h3 class="section-title" style="font-size: 1.1rem;">1. Pilih Metode Reduksi Dimensi</h3></div>""", unsafe_allow_html=True)
-    col_dr = st.columns([1, 2])
-    with col_dr[0]:
-        dr_method = st.selectbox("Metode", options=["PCA", "t-SNE", "UMAP"] if UMAP_AVAILABLE else ["PCA", "t-SNE"])
-    if dr_method == "t-SNE":
-        with col_dr[1]:
-            tsne_perp = st.slider("t-SNE perplexity", 5, 50, 30)
-    else:
-        tsne_perp = None
-    
-    if st.button("Jalankan Clustering & Visualisasi"):
-        with st.spinner("Menjalankan K-Means..."):
-            kmeans = KMeans(n_clusters=int(final_k), random_state=42, n_init=10)
-            labels = kmeans.fit_predict(Xscaled)
-            dfp = dfp.copy()
-            dfp["cluster"] = labels
-            st.session_state.df_proc = dfp
-            st.session_state.cluster_labels = labels
-            
-            # DR
-            if dr_method == "PCA":
-                reducer = PCA(n_components=2, random_state=42)
-                coords = reducer.fit_transform(Xscaled)
-            elif dr_method == "t-SNE":
-                reducer = TSNE(n_components=2, perplexity=tsne_perp, random_state=42, init="pca")
-                coords = reducer.fit_transform(Xscaled)
-            elif dr_method == "UMAP" and UMAP_AVAILABLE:
-                reducer = umap.UMAP(n_components=2, random_state=42)
-                coords = reducer.fit_transform(Xscaled)
-            else:
-                reducer = PCA(n_components=2, random_state=42)
-                coords = reducer.fit_transform(Xscaled)
-            
-            dfp["_x"] = coords[:, 0]
-            dfp["_y"] = coords[:, 1]
-            
-            try:
-                sil = silhouette_score(Xscaled, labels) if len(set(labels)) > 1 else None
-                st.session_state.silhouette_score_val = sil
-            except Exception:
-                sil = None
+    # Kontrol DR, batas waktu dan tombol jalankan sebagai fragment: menggeser perplexity / mengganti
+    # metode hanya menjalankan ulang bagian ini, scatter & peta di bawah tidak digambar ulang
+    @st.fragment
+    def clustering_controls():
+        # Step 1: Pilih Metode Reduksi Dimensi
+        st.markdown("""<div class="dashboard-section" style="margin-top: 20px;"><div class="section-icon"><svg xmlns="http://www.w3.org/2000/svg" width="20" height="20" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2" stroke-linecap="round" stroke-linejoin="round"><polygon points="12 2 2 7 12 12 22 7 12 2"></polygon><polyline points="2 17 12 22 22 17"></polyline><polyline points="2 12 12 17 22 12"></polyline></svg></div><h3 class="section-title" style="font-size: 1.1rem;">1. Pilih Metode Reduksi Dimensi</h3></div>""", unsafe_allow_html=True)
+        col_dr = st.columns([1, 2])
+        with col_dr[0]:
+            dr_method = st.selectbox("Metode", options=DR_METHODS)
+        if dr_method == "t-SNE":
+            with col_dr[1]:
+                tsne_perp = st.slider("t-SNE perplexity", 5, 50, 30)
+        else:
+            tsne_perp = None
+
+        # Batas waktu per tahap: bila habis, t-SNE diganti PCA dan silhouette exact diganti sampel
+        with st.expander("Batas waktu per tahap"):
+            col_b = st.columns(2)
+            with col_b[0]:
+                sil_budget = st.number_input("Silhouette exact (detik)", min_value=1, max_value=3600, value=jobs.STAGE_BUDGETS["silhouette_samples"], step=5)
+            with col_b[1]:
+                tsne_budget = st.number_input("t-SNE (detik)", min_value=1, max_value=3600, value=jobs.STAGE_BUDGETS["dr_t-SNE"], step=5)
         
+        # Engine: KMeans dengan K dari halaman Analisis, atau DBSCAN haversine pada lat/lon untuk hotspot
+        # spasial berbentuk bebas (graf tetangga di-cache, mengganti eps tidak membangun ulang graf)
+        geo_cols = [c for c in ("lat", "lon") if c in dfp.columns] or [c for c in ("latitude", "longitude") if c in dfp.columns]
+        engines = {"kmeans": f"K-Means (K={final_k})", "kprototypes": f"K-Prototypes (K={final_k}, kode kategori)"}
+        if len(geo_cols) == 2:
+            engines["dbscan"] = "DBSCAN lokasi (haversine)"
+        engine = st.radio("Engine clustering", options=list(engines), format_func=engines.get, horizontal=True)
+        density = None
+        if engine == "dbscan":
+            col_e = st.columns(2)
+            with col_e[0]:
+                eps_km = st.slider("eps (km)", 0.1, 25.0, 1.0, step=0.1)
+            with col_e[1]:
+                min_samples = st.number_input("Min kasus per inti", min_value=2, max_value=1000, value=10, step=1)
+            density = {"lat": dfp[geo_cols[0]], "lon": dfp[geo_cols[1]], "eps_km": float(eps_km), "min_samples": int(min_samples)}
+        # k-prototypes: jarak pada kode kategori + numerik, tanpa kolom dummy (kprototypes.py)
+        prototypes = {"features": list(st.session_state.selected_features or [])} if engine == "kprototypes" else None
+
+        # KMeans / DBSCAN, silhouette, DR dan profil berjalan sebagai job latar belakang (jobs.py); pengguna bisa
+        # pindah halaman selama job berjalan, hasil masuk ke session state saat selesai
+        if st.button("Jalankan Clustering & Visualisasi", disabled=job_pending("clustering")):
+            job = jobs.Job("clustering", "Clustering & Visualisasi", jobs.clustering_stages(dr_method, engine), page=page, inputs=Xscaled)
+            st.session_state.jobs["clustering"] = jobs.submit(get_executor(), job, jobs.clustering_job, dfp, Xscaled, final_k,
+                                                              dr_method, tsne_perp, st.session_state.get('feature_cols', []) or [],
+                                                              budgets={"silhouette_samples": sil_budget, "dr_t-SNE": tsne_budget},
+                                                              cache=get_result_cache(), density=density,
+                                                              prototypes=prototypes)
+            st.rerun()
+    clustering_controls()
+
+    c_job = st.session_state.jobs.get("clustering")
+    if job_pending("clustering"):
+        job_progress("clustering")
+    show_job_status("clustering")
+    if c_job is not None and c_job.applied and c_job.error() is None and c_job.inputs is Xscaled:
         st.markdown("""<div class="bullet-item" style="background: rgba(16, 185, 129, 0.15); border-left-color: #10b981;"><svg xmlns="http://www.w3.org/2000/svg" width="18" height="18" viewBox="0 0 24 24" fill="none" stroke="#10b981" stroke-width="2" stroke-linecap="round" stroke-linejoin="round"><path d="M22 11.08V12a10 10 0 1 1-5.93-9.14"></path><polyline points="22 4 12 14.01 9 11.01"></polyline></svg><span style="color: #a7f3d0;">Clustering selesai.</span></div>""", unsafe_allow_html=True)
+    
+    # Hasil terakhir (dari tombol di atas atau hasil precomputed batch_run.py) tetap tampil saat kembali ke halaman ini
+    dfp = clustered_frame()
+    if dfp is not None:
+        labels = st.session_state.cluster_labels
+        sil = st.session_state.silhouette_score_val
+        profile = st.session_state.cluster_profile
+        numeric_feats = list(profile["feature_means"].columns)
         
         # Display
         st.markdown("""<div class="dashboard-section" style="margin-top: 20px;"><div class="section-icon"><svg xmlns="http://www.w3.org/2000/svg" width="20" height="20" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2" stroke-linecap="round" stroke-linejoin="round"><circle cx="12" cy="12" r="10"></circle><line x1="2" y1="12" x2="22" y2="12"></line><path d="M12 2a15.3 15.3 0 0 1 4 10 15.3 15.3 0 0 1-4 10 15.3 15.3 0 0 1-4-10 15.3 15.3 0 0 1 4-10z"></path></svg></div><h3 class="section-title" style="font-size: 1.1rem;">2. Visualisasi Klaster (2D)</h3></div>""", unsafe_allow_html=True)
         left, right = st.columns([2, 1])
         hover_cols = [c for c in ["uid", "report_date", "victim_race", "victim_age", "victim_sex", "state", "disposition", "lat", "lon"] if c in dfp.columns]
         
-        with left:
+        with left, track_stage("figure_scatter", rows=len(dfp)):
             fig = px.scatter(dfp, x="_x", y="_y", color=dfp["cluster"].astype(str), 
                            hover_data=hover_cols, title="Visualisasi Klaster (2D)", 
                            labels={"_x": "Dimensi 1", "_y": "Dimensi 2"})
@@ -1710,7 +2146,12 @@ elif page == "Visualisasi":
         
         with right:
             st.markdown("""<div class="dashboard-section"><div class="section-icon"><svg xmlns="http://www.w3.org/2000/svg" width="20" height="20" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2" stroke-linecap="round" stroke-linejoin="round"><line x1="18" y1="20" x2="18" y2="10"></line><line x1="12" y1="20" x2="12" y2="4"></line><line x1="6" y1="20" x2="6" y2="14"></line></svg></div><h3 class="section-title" style="font-size: 1rem;">Ringkasan</h3></div>""", unsafe_allow_html=True)
-            st.markdown(f"""<div class="bullet-item"><svg xmlns="http://www.w3.org/2000/svg" width="16" height="16" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2"><circle cx="12" cy="12" r="10"></circle></svg><span><strong>K final:</strong> {final_k}</span></div>""", unsafe_allow_html=True)
+            n_noise = int((labels < 0).sum())
+            if n_noise:
+                # hasil DBSCAN: jumlah klaster ditentukan eps, bukan K; noise diberi label -1
+                st.markdown(f"""<div class="bullet-item"><svg xmlns="http://www.w3.org/2000/svg" width="16" height="16" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2"><circle cx="12" cy="12" r="10"></circle></svg><span><strong>Klaster ditemukan:</strong> {len(set(labels.tolist()) - {-1})} (noise -1: {n_noise} kasus)</span></div>""", unsafe_allow_html=True)
+            else:
+                st.markdown(f"""<div class="bullet-item"><svg xmlns="http://www.w3.org/2000/svg" width="16" height="16" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2"><circle cx="12" cy="12" r="10"></circle></svg><span><strong>K final:</strong> {final_k}</span></div>""", unsafe_allow_html=True)
             if sil is not None:
                 st.markdown(f"""<div class="bullet-item"><svg xmlns="http://www.w3.org/2000/svg" width="16" height="16" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2"><polyline points="22 12 18 12 15 21 9 3 6 12 2 12"></polyline></svg><span><strong>Silhouette:</strong> {sil:.3f}</span></div>""", unsafe_allow_html=True)
             st.table(dfp["cluster"].value_counts().sort_index().rename("count").to_frame())
@@ -1721,91 +2162,68 @@ elif page == "Visualisasi":
         lon_col = "lon" if "lon" in dfp.columns else ("longitude" if "longitude" in dfp.columns else None)
         
         if lat_col and lon_col and dfp[lat_col].notna().sum() > 0:
-            df_map = dfp.dropna(subset=[lat_col, lon_col])
-            fig_map = px.scatter_mapbox(df_map, lat=lat_col, lon=lon_col, color=df_map["cluster"].astype(str),
-                                       hover_data=hover_cols, zoom=10, height=600, title="Distribusi Klaster per Lokasi")
-            # add centroid markers with cluster stats on hover
-            try:
-                import plotly.graph_objects as go
-                grp = df_map.groupby("cluster")
-                clusters = grp.size().rename("count").reset_index()
-                clusters["mean_lat"] = grp[lat_col].mean().values
-                clusters["mean_lon"] = grp[lon_col].mean().values
-                if "victim_age" in df_map.columns:
-                    clusters["mean_age"] = grp["victim_age"].apply(lambda s: round(pd.to_numeric(s, errors="coerce").dropna().mean(), 2))
-                else:
-                    clusters["mean_age"] = ""
-                for cat in ["victim_race", "victim_sex", "state", "disposition"]:
-                    if cat in df_map.columns:
-                        clusters[f"top_{cat}"] = grp[cat].agg(lambda s: s.mode().iloc[0] if not s.mode().empty else "")
-                    else:
-                        clusters[f"top_{cat}"] = ""
-                customdata = clusters[["cluster","count","mean_age","top_victim_race","top_victim_sex","top_state","top_disposition"]].values
-                hovertemplate = ("Cluster: %{customdata[0]}<br>Count: %{customdata[1]}<br>Mean age: %{customdata[2]}<br>"
-                                 "Top race: %{customdata[3]}<br>Top sex: %{customdata[4]}<br>Top state: %{customdata[5]}<br>"
-                                 "Top disposition: %{customdata[6]}<extra></extra>")
-                fig_map.add_trace(go.Scattermapbox(
-                    lat=clusters["mean_lat"],
-                    lon=clusters["mean_lon"],
-                    mode="markers+text",
-                    marker=dict(size=18, color="#ffffff", opacity=0.9, symbol="circle"),
-                    text=clusters["cluster"].astype(str),
-                    textposition="middle center",
-                    hovertemplate=hovertemplate,
-                    customdata=customdata,
-                    showlegend=False
-                ))
-            except Exception:
-                pass
-
-            fig_map.update_layout(mapbox_style="open-street-map", margin={"r": 0, "t": 0, "l": 0, "b": 0})
-            st.plotly_chart(fig_map, use_container_width=True)
+            with track_stage("figure_map", rows=len(dfp)):
+                df_map = dfp.dropna(subset=[lat_col, lon_col])
+                fig_map = px.scatter_mapbox(df_map, lat=lat_col, lon=lon_col, color=df_map["cluster"].astype(str),
+                                           hover_data=hover_cols, zoom=10, height=600, title="Distribusi Klaster per Lokasi")
+                # add centroid markers with cluster stats on hover
+                try:
+                    add_cluster_centroids(fig_map, profile)
+                except Exception:
+                    pass
+
+                fig_map.update_layout(mapbox_style="open-street-map", margin={"r": 0, "t": 0, "l": 0, "b": 0})
+                st.plotly_chart(fig_map, use_container_width=True)
+
+            # Query spasial: kasus dalam radius / terdekat / di dalam kotak, difilter per klaster & disposition
+            with st.expander("Cari kasus per lokasi"):
+                geo_query_panel(dfp, lat_col, lon_col, hover_cols)
 
             # --- Tambahan visualisasi setelah clustering: Silhouette, Donut per cluster, Heatmap ---
             try:
                 import traceback
-                from sklearn.metrics import silhouette_samples
                 import plotly.graph_objects as go
 
                 if len(set(labels)) > 1:
-                    sil_samples = silhouette_samples(Xscaled, labels)
-                    if len(sil_samples) != len(dfp):
-                        st.warning(f"Peringatan: panjang silhouette ({len(sil_samples)}) berbeda dari jumlah baris ({len(dfp)})")
-                    dfp = dfp.assign(silhouette=sil_samples)
-
-                    # Silhouette: add section header with icon and horizontal bar plot per cluster
-                    st.markdown("""<div class='dashboard-section' style='margin-top: 12px;'><div class='section-icon'><svg xmlns='http://www.w3.org/2000/svg' width='20' height='20' viewBox='0 0 24 24' fill='none' stroke='currentColor' stroke-width='2' stroke-linecap='round' stroke-linejoin='round'><path d='M3 12h18'></path><path d='M12 3v18'></path></svg></div><h3 class='section-title' style='font-size: 1.1rem;'>4. Silhouette per klaster</h3></div>""", unsafe_allow_html=True)
-                    sil_df = dfp[["silhouette", "cluster"]].copy()
-                    sil_df["cluster"] = sil_df["cluster"].astype(int)
-                    sil_df = sil_df.sort_values(["cluster", "silhouette"], ascending=[True, False])
-                    colors = px.colors.qualitative.Plotly
-                    traces = []
-                    y_base = 0
-                    cluster_order = sorted(sil_df["cluster"].unique())
-                    for i, cl in enumerate(cluster_order):
-                        sub = sil_df[sil_df["cluster"] == cl]
-                        n = len(sub)
-                        ys = list(range(y_base, y_base + n))
-                        traces.append(go.Bar(x=sub["silhouette"].values, y=ys, orientation="h", name=f"Cluster {cl}", marker=dict(color=colors[i % len(colors)], opacity=0.9)))
-                        y_base += n
-                    fig_sil = go.Figure(data=traces)
-                    avg_sil = float(np.mean(sil_samples)) if len(sil_samples) > 0 else 0.0
-                    fig_sil.update_layout(barmode='stack', height=420, title='4. Silhouette per klaster', xaxis_title='Silhouette value', yaxis=dict(showticklabels=False))
-                    fig_sil.add_vline(x=avg_sil, line=dict(color='black', dash='dash'), annotation_text=f'Global mean: {avg_sil:.3f}', annotation_position='top left')
-                    st.plotly_chart(fig_sil, use_container_width=True)
-
-                    # Heatmap: mean of numeric features per cluster (include coordinates and other numeric features)
-                    feat_cols = st.session_state.get('feature_cols', []) or []
-                    if feat_cols:
-                        numeric_feats = [c for c in feat_cols if c in dfp.columns and pd.api.types.is_numeric_dtype(dfp[c])]
+                    # nilai per baris dari job clustering; untuk label hasil append / run precomputed tanpa nilai
+                    # silhouette dihitung sekali oleh job latar belakang (request_silhouette)
+                    sil_samples = st.session_state.silhouette_values
+                    if sil_samples is not None and len(sil_samples) != len(labels):
+                        sil_samples = None
+                    if sil_samples is None:
+                        request_silhouette(Xscaled, labels)
+                        if job_pending("silhouette"):
+                            job_progress("silhouette")
+                        show_job_status("silhouette")
                     else:
-                        numeric_feats = [c for c in dfp.select_dtypes(include='number').columns if c in dfp.columns]
-                    if len(numeric_feats) == 0 and 'victim_age' in dfp.columns:
-                        numeric_feats = ['victim_age']
-                    st.write(f"Numeric features used for heatmap: {numeric_feats}")
-
+                        dfp = dfp.assign(silhouette=sil_samples)
+
+                        # Silhouette: add section header with icon and horizontal bar plot per cluster
+                        st.markdown("""<div class='dashboard-section' style='margin-top: 12px;'><div class='section-icon'><svg xmlns='http://www.w3.org/2000/svg' width='20' height='20' viewBox='0 0 24 24' fill='none' stroke='currentColor' stroke-width='2' stroke-linecap='round' stroke-linejoin='round'><path d='M3 12h18'></path><path d='M12 3v18'></path></svg></div><h3 class='section-title' style='font-size: 1.1rem;'>4. Silhouette per klaster</h3></div>""", unsafe_allow_html=True)
+                        with track_stage("figure_silhouette", rows=len(dfp)):
+                            # fallback sampel: baris di luar sampel bernilai NaN
+                            sil_df = dfp[["silhouette", "cluster"]].dropna()
+                            sil_df["cluster"] = sil_df["cluster"].astype(int)
+                            sil_df = sil_df.sort_values(["cluster", "silhouette"], ascending=[True, False])
+                            colors = px.colors.qualitative.Plotly
+                            traces = []
+                            y_base = 0
+                            cluster_order = sorted(sil_df["cluster"].unique())
+                            for i, cl in enumerate(cluster_order):
+                                sub = sil_df[sil_df["cluster"] == cl]
+                                n = len(sub)
+                                ys = list(range(y_base, y_base + n))
+                                traces.append(go.Bar(x=sub["silhouette"].values, y=ys, orientation="h", name=f"Cluster {cl}", marker=dict(color=colors[i % len(colors)], opacity=0.9)))
+                                y_base += n
+                            fig_sil = go.Figure(data=traces)
+                            avg_sil = float(np.nanmean(sil_samples)) if len(sil_df) > 0 else 0.0
+                            fig_sil.update_layout(barmode='stack', height=420, title='4. Silhouette per klaster', xaxis_title='Silhouette value', yaxis=dict(showticklabels=False))
+                            fig_sil.add_vline(x=avg_sil, line=dict(color='black', dash='dash'), annotation_text=f'Global mean: {avg_sil:.3f}', annotation_position='top left')
+                            st.plotly_chart(fig_sil, use_container_width=True)
+
+                    # Heatmap: mean of numeric features per cluster (precomputed in the cluster profile)
                     if len(numeric_feats) > 0:
-                        cluster_means = dfp.groupby('cluster')[numeric_feats].mean()
+                        cluster_means = profile["feature_means"]
                         st.markdown("""<div class='dashboard-section' style='margin-top: 12px;'><div class='section-icon'><svg xmlns='http://www.w3.org/2000/svg' width='20' height='20' viewBox='0 0 24 24' fill='none' stroke='currentColor' stroke-width='2' stroke-linecap='round' stroke-linejoin='round'><rect x='3' y='3' width='18' height='18' rx='2'></rect></svg></div><h3 class='section-title' style='font-size: 1.1rem;'>5. Heatmap: Rata-rata fitur per klaster</h3></div>""", unsafe_allow_html=True)
                         heat_df = cluster_means.copy()
                         heat_df.index = heat_df.index.astype(str)
@@ -1820,7 +2238,19 @@ elif page == "Visualisasi":
         else:
             st.markdown("""<div class="bullet-item"><svg xmlns="http://www.w3.org/2000/svg" width="18" height="18" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2" stroke-linecap="round" stroke-linejoin="round"><circle cx="12" cy="12" r="10"></circle><line x1="12" y1="16" x2="12" y2="12"></line><line x1="12" y1="8" x2="12.01" y2="8"></line></svg><span>Kolom lat/lon tidak ada atau kosong — peta tidak ditampilkan.</span></div>""", unsafe_allow_html=True)
         
-        # Contoh baris per klaster and download removed per user request
+        # Ekspor hasil: file dibuat saat tombol diklik (callable, thread terpisah) dan ditulis per chunk
+        # ke file sementara (export.py), bukan satu string CSV besar di memori
+        st.markdown("""<div class="dashboard-section" style="margin-top: 20px;"><div class="section-icon"><svg xmlns="http://www.w3.org/2000/svg" width="20" height="20" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2" stroke-linecap="round" stroke-linejoin="round"><path d="M21 15v4a2 2 0 0 1-2 2H5a2 2 0 0 1-2-2v-4"></path><polyline points="7 10 12 15 17 10"></polyline><line x1="12" y1="15" x2="12" y2="3"></line></svg></div><h3 class="section-title" style="font-size: 1.1rem;">6. Ekspor Hasil</h3></div>""", unsafe_allow_html=True)
+        st.caption(f"{len(labels):,} baris: data cleaning + cluster, _x, _y, silhouette per baris")
+        export_args = (cleaned_frame(), labels, st.session_state.embedding, st.session_state.silhouette_values)
+        col_x = st.columns(len(export.EXPORT_FORMATS) + 1)
+        for i, (fmt, info) in enumerate(export.EXPORT_FORMATS.items()):
+            with col_x[i]:
+                st.download_button(f"Download {info['label']}", data=lambda fmt=fmt: export.export_file(fmt, *export_args),
+                                   file_name=f"hasil_clustering.{fmt}", mime=info["mime"], on_click="ignore")
+        with col_x[-1]:
+            st.download_button("Download profil klaster (CSV)", data=lambda: export.profile_table(profile).to_csv(index=False),
+                               file_name="profil_klaster.csv", mime="text/csv", on_click="ignore")
     
     else:
         st.markdown("""<div class="bullet-item"><svg xmlns="http://www.w3.org/2000/svg" width="18" height="18" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2" stroke-linecap="round" stroke-linejoin="round"><circle cx="12" cy="12" r="10"></circle><line x1="12" y1="16" x2="12" y2="12"></line><line x1="12" y1="8" x2="12.01" y2="8"></line></svg><span>Klik 'Jalankan Clustering & Visualisasi' untuk memulai.</span></div>""", unsafe_allow_html=True)
@@ -1836,37 +2266,45 @@ elif page == "Visualisasi":
 # ║  - Insights & kesimpulan otomatis                                         ║
 # ║  - Rekomendasi kebijakan                                                  ║
 # ║  - Metrik kualitas clustering (Silhouette Score)                          ║
+# ║  - Perubahan klaster per tahun / kuartal (temporal.py)                    ║
 # ║                                                                           ║
 # ╚═══════════════════════════════════════════════════════════════════════════╝
 elif page == "Hasil":
     # Section header
     st.markdown("""<div class="card"><div class="dashboard-section"><div class="section-icon"><svg xmlns="http://www.w3.org/2000/svg" width="24" height="24" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2" stroke-linecap="round" stroke-linejoin="round"><path d="M14 2H6a2 2 0 0 0-2 2v16a2 2 0 0 0 2 2h12a2 2 0 0 0 2-2V8z"></path><polyline points="14 2 14 8 20 8"></polyline><line x1="16" y1="13" x2="8" y2="13"></line><line x1="16" y1="17" x2="8" y2="17"></line><polyline points="10 9 9 9 8 9"></polyline></svg></div><h3 class="section-title">Kesimpulan & Hasil Analisis</h3></div>""", unsafe_allow_html=True)
     
-    dfp = st.session_state.df_proc
+    dfp = clustered_frame()
     labels = st.session_state.cluster_labels
     final_k = st.session_state.final_k
     sil = st.session_state.silhouette_score_val
     
-    if dfp.empty or labels is None:
+    if dfp is None:
         st.markdown("""<div class="bullet-item" style="background: rgba(245, 158, 11, 0.15); border-left-color: #f59e0b;"><svg xmlns="http://www.w3.org/2000/svg" width="18" height="18" viewBox="0 0 24 24" fill="none" stroke="#f59e0b" stroke-width="2" stroke-linecap="round" stroke-linejoin="round"><path d="M10.29 3.86L1.82 18a2 2 0 0 0 1.71 3h16.94a2 2 0 0 0 1.71-3L13.71 3.86a2 2 0 0 0-3.42 0z"></path><line x1="12" y1="9" x2="12" y2="13"></line><line x1="12" y1="17" x2="12.01" y2="17"></line></svg><span style="color: #fde68a;">Belum ada clustering hasil. Silakan jalankan clustering di halaman 'Visualisasi' terlebih dahulu.</span></div>""", unsafe_allow_html=True)
         st.markdown("</div>", unsafe_allow_html=True)
         st.stop()
     
     # Statistik Per Klaster
     st.markdown("""<div class="dashboard-section" style="margin-top: 20px;"><div class="section-icon"><svg xmlns="http://www.w3.org/2000/svg" width="20" height="20" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2" stroke-linecap="round" stroke-linejoin="round"><line x1="18" y1="20" x2="18" y2="10"></line><line x1="12" y1="20" x2="12" y2="4"></line><line x1="6" y1="20" x2="6" y2="14"></line></svg></div><h3 class="section-title" style="font-size: 1.1rem;">Statistik Per Klaster</h3></div>""", unsafe_allow_html=True)
+    # Profil dihitung sekali saat clustering dijalankan; hitung ulang hanya jika belum ada
+    profile = st.session_state.cluster_profile
+    if profile is None:
+        profile = compute_cluster_profile(dfp, dfp["cluster"].to_numpy(), profile_numeric_features(dfp, st.session_state.feature_cols))
+        st.session_state.cluster_profile = profile
+    summary = profile["summary"]
+    model = incremental_model()
+    if model is not None:
+        show_drift(model.drift())
+
     stats = []
-    for cl in sorted(dfp["cluster"].unique()):
-        sub = dfp[dfp["cluster"] == cl]
-        row = {"Klaster": int(cl), "Jumlah": len(sub), "Persentase": f"{100*len(sub)/len(dfp):.1f}%"}
-        if "victim_age" in sub.columns:
-            # Convert to numeric, handling any non-numeric values
-            age_numeric = pd.to_numeric(sub["victim_age"], errors='coerce')
-            row["Rata-rata Usia"] = round(age_numeric.dropna().mean(), 1) if not age_numeric.dropna().empty else "—"
-            row["Median Usia"] = float(age_numeric.median()) if not age_numeric.dropna().empty else "—"
-        for cat in ["victim_race", "victim_sex", "state", "disposition"]:
-            if cat in sub.columns:
-                top = sub[cat].mode()
-                row[f"Top {cat}"] = top.iloc[0] if not top.empty else "—"
+    for cl, prow in summary.iterrows():
+        row = {"Klaster": int(cl), "Jumlah": int(prow["count"]), "Persentase": f"{prow['pct']:.1f}%"}
+        if "mean_age" in summary.columns:
+            row["Rata-rata Usia"] = round(prow["mean_age"], 1) if pd.notna(prow["mean_age"]) else "—"
+            row["Median Usia"] = float(prow["median_age"]) if pd.notna(prow["median_age"]) else "—"
+        for cat in PROFILE_CATEGORICALS:
+            if f"top_{cat}" in summary.columns:
+                top = prow[f"top_{cat}"]
+                row[f"Top {cat}"] = top if pd.notna(top) else "—"
         stats.append(row)
     
     st.dataframe(pd.DataFrame(stats), use_container_width=True)
@@ -1875,16 +2313,16 @@ elif page == "Hasil":
     st.markdown("""<div class="dashboard-section" style="margin-top: 20px;"><div class="section-icon"><svg xmlns="http://www.w3.org/2000/svg" width="20" height="20" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2" stroke-linecap="round" stroke-linejoin="round"><circle cx="11" cy="11" r="8"></circle><line x1="21" y1="21" x2="16.65" y2="16.65"></line></svg></div><h3 class="section-title" style="font-size: 1.1rem;">Insights & Kesimpulan</h3></div>""", unsafe_allow_html=True)
     
     # Generate insights
-    for cl in sorted(dfp["cluster"].unique()):
-        sub = dfp[dfp["cluster"] == cl]
-        pct = 100*len(sub)/len(dfp)
+    for cl, prow in summary.iterrows():
+        n_cases = int(prow["count"])
+        pct = prow["pct"]
         
         st.markdown(f"""<div class="insight">""", unsafe_allow_html=True)
-        st.markdown(f"""<div class="bullet-item"><svg xmlns="http://www.w3.org/2000/svg" width="18" height="18" viewBox="0 0 24 24" fill="none" stroke="#ef4444" stroke-width="2"><circle cx="12" cy="12" r="10"></circle><circle cx="12" cy="12" r="3"></circle></svg><span><strong>Klaster {int(cl)}</strong> ({len(sub)} kasus, {pct:.1f}%)</span></div>""", unsafe_allow_html=True)
+        st.markdown(f"""<div class="bullet-item"><svg xmlns="http://www.w3.org/2000/svg" width="18" height="18" viewBox="0 0 24 24" fill="none" stroke="#ef4444" stroke-width="2"><circle cx="12" cy="12" r="10"></circle><circle cx="12" cy="12" r="3"></circle></svg><span><strong>Klaster {int(cl)}</strong> ({n_cases} kasus, {pct:.1f}%)</span></div>""", unsafe_allow_html=True)
         
         insights = []
-        if "victim_age" in sub.columns:
-            avg_age = pd.to_numeric(sub["victim_age"], errors='coerce').dropna().mean()
+        if "mean_age" in summary.columns:
+            avg_age = prow["mean_age"]
             if avg_age < 25:
                 insights.append(("users", "Didominasi korban muda (< 25 tahun) — tinggi risiko di kalangan anak-anak & remaja"))
             elif avg_age > 60:
@@ -1892,26 +2330,22 @@ elif page == "Hasil":
             else:
                 insights.append(("user", f"Korban dewasa (rata-rata {avg_age:.0f} tahun)"))
         
-        if "victim_race" in sub.columns:
-            top_race = sub["victim_race"].mode()
-            if not top_race.empty:
-                insights.append(("globe", f"Ras dominan: {top_race.iloc[0]}"))
+        top_race = prow.get("top_victim_race")
+        if pd.notna(top_race):
+            insights.append(("globe", f"Ras dominan: {top_race}"))
         
-        if "victim_sex" in sub.columns:
-            top_sex = sub["victim_sex"].mode()
-            if not top_sex.empty and top_sex.iloc[0] == "Female":
-                insights.append(("user", "Tingkat korban perempuan tinggi — perlu program perlindungan khusus"))
-            elif not top_sex.empty:
-                insights.append(("user", f"Jenis kelamin dominan: {top_sex.iloc[0]}"))
+        top_sex = prow.get("top_victim_sex")
+        if pd.notna(top_sex) and top_sex == "Female":
+            insights.append(("user", "Tingkat korban perempuan tinggi — perlu program perlindungan khusus"))
+        elif pd.notna(top_sex):
+            insights.append(("user", f"Jenis kelamin dominan: {top_sex}"))
         
-        if "state" in sub.columns:
-            top_state = sub["state"].mode()
-            if not top_state.empty:
-                insights.append(("map-pin", f"Lokasi dominan: {top_state.iloc[0]}"))
+        top_state = prow.get("top_state")
+        if pd.notna(top_state):
+            insights.append(("map-pin", f"Lokasi dominan: {top_state}"))
         
-        if "disposition" in sub.columns:
-            closed_rate = (sub["disposition"].str.contains("Closed", case=False).sum() / len(sub)) * 100
-            insights.append(("file-text", f"Tingkat penyelesaian kasus: {closed_rate:.1f}%"))
+        if "closed_rate" in summary.columns:
+            insights.append(("file-text", f"Tingkat penyelesaian kasus: {prow['closed_rate']:.1f}%"))
         
         for icon_type, insight_text in insights:
             if icon_type == "users":
@@ -1954,6 +2388,52 @@ elif page == "Hasil":
             st.markdown("""<div class="bullet-item"><svg xmlns="http://www.w3.org/2000/svg" width="18" height="18" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2" stroke-linecap="round" stroke-linejoin="round"><circle cx="12" cy="12" r="10"></circle><line x1="12" y1="16" x2="12" y2="12"></line><line x1="12" y1="8" x2="12.01" y2="8"></line></svg><span>Clustering kualitas sedang (0.3 < silhouette ≤ 0.5)</span></div>""", unsafe_allow_html=True)
         else:
             st.markdown("""<div class="bullet-item" style="background: rgba(245, 158, 11, 0.15); border-left-color: #f59e0b;"><svg xmlns="http://www.w3.org/2000/svg" width="18" height="18" viewBox="0 0 24 24" fill="none" stroke="#f59e0b" stroke-width="2" stroke-linecap="round" stroke-linejoin="round"><path d="M10.29 3.86L1.82 18a2 2 0 0 0 1.71 3h16.94a2 2 0 0 0 1.71-3L13.71 3.86a2 2 0 0 0-3.42 0z"></path><line x1="12" y1="9" x2="12" y2="13"></line><line x1="12" y1="17" x2="12.01" y2="17"></line></svg><span style="color: #fde68a;">Clustering kualitas kurang (silhouette ≤ 0.3)</span></div>""", unsafe_allow_html=True)
+
+    # Perubahan klaster per waktu: tiap tahun / kuartal di-cluster ulang di proses worker (temporal.py),
+    # klaster antar jendela dipasangkan ke nomor klaster di atas lewat kemiripan centroid
+    st.markdown("""<div class="dashboard-section" style="margin-top: 20px;"><div class="section-icon"><svg xmlns="http://www.w3.org/2000/svg" width="20" height="20" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2" stroke-linecap="round" stroke-linejoin="round"><circle cx="12" cy="12" r="10"></circle><polyline points="12 6 12 12 16 14"></polyline></svg></div><h3 class="section-title" style="font-size: 1.1rem;">Perubahan Klaster per Waktu</h3></div>""", unsafe_allow_html=True)
+    if "report_date" not in dfp.columns:
+        st.markdown("""<div class="bullet-item"><svg xmlns="http://www.w3.org/2000/svg" width="18" height="18" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2" stroke-linecap="round" stroke-linejoin="round"><circle cx="12" cy="12" r="10"></circle><line x1="12" y1="16" x2="12" y2="12"></line><line x1="12" y1="8" x2="12.01" y2="8"></line></svg><span>Kolom <code>report_date</code> tidak ada di data, analisis per waktu tidak tersedia.</span></div>""", unsafe_allow_html=True)
+    elif (st.session_state.run_params or {}).get("engine") == "dbscan":
+        # jendela di-cluster ulang dengan KMeans dan dipasangkan lewat centroid: tidak cocok untuk label DBSCAN (noise -1)
+        st.markdown("""<div class="bullet-item"><svg xmlns="http://www.w3.org/2000/svg" width="18" height="18" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2" stroke-linecap="round" stroke-linejoin="round"><circle cx="12" cy="12" r="10"></circle><line x1="12" y1="16" x2="12" y2="12"></line><line x1="12" y1="8" x2="12.01" y2="8"></line></svg><span>Analisis per waktu memasangkan klaster lewat centroid K-Means, tidak tersedia untuk hasil DBSCAN.</span></div>""", unsafe_allow_html=True)
+    else:
+        Xscaled = st.session_state.X_scaled
+
+        @st.fragment
+        def temporal_controls():
+            col_t = st.columns(2)
+            with col_t[0]:
+                freq = st.radio("Jendela waktu", options=list(temporal.FREQS), format_func=temporal.FREQS.get, horizontal=True)
+            with col_t[1]:
+                workers = st.number_input("Proses worker", min_value=1, max_value=64, value=os.cpu_count() or 1, step=1)
+            if st.button("Jalankan clustering per jendela", disabled=job_pending("temporal")):
+                windows = temporal.window_labels(dfp["report_date"], freq)
+                _, reference = temporal.cluster_centroids(Xscaled, labels)
+                job = jobs.Job("temporal", f"Clustering per {temporal.FREQS[freq].lower()}", ["temporal_windows"], page=page, inputs=Xscaled)
+                st.session_state.jobs["temporal"] = jobs.submit(get_executor(), job, jobs.temporal_job, Xscaled, windows, len(reference),
+                                                                reference=reference, max_workers=int(workers), cache=get_result_cache())
+                st.rerun()
+        temporal_controls()
+        if job_pending("temporal"):
+            job_progress("temporal")
+        show_job_status("temporal")
+
+        t_state = st.session_state.temporal
+        if t_state is not None and t_state["inputs"] is Xscaled:
+            t_result = t_state["result"]
+            drift = t_result["drift"].assign(track=lambda d: d["track"].astype(str))
+            st.caption(f"{len(t_result['windows'])} jendela di-cluster dalam {t_result['seconds']:.1f} detik"
+                       + (f"; dilewati (baris terlalu sedikit): {', '.join(t_result['skipped'])}" if t_result["skipped"] else ""))
+            fig_share = px.line(drift, x="window", y="share", color="track", markers=True, title="Proporsi kasus per klaster",
+                                labels={"window": "Jendela", "share": "Proporsi", "track": "Klaster"})
+            fig_share.update_layout(paper_bgcolor='rgba(0,0,0,0)', plot_bgcolor='rgba(20,20,20,0.8)', font_color='#e5e5e5')
+            st.plotly_chart(fig_share, use_container_width=True)
+            fig_shift = px.line(drift, x="window", y="centroid_shift", color="track", markers=True,
+                                title="Pergeseran centroid dari jendela sebelumnya",
+                                labels={"window": "Jendela", "centroid_shift": "Jarak centroid", "track": "Klaster"})
+            fig_shift.update_layout(paper_bgcolor='rgba(0,0,0,0)', plot_bgcolor='rgba(20,20,20,0.8)', font_color='#e5e5e5')
+            st.plotly_chart(fig_shift, use_container_width=True)
 # ╔═══════════════════════════════════════════════════════════════════════════╗
 # ║                                                                           ║
 # ║                          PAGE 7: TEAM                                     ║
@@ -1964,15 +2444,11 @@ elif page == "Hasil":
 # ║                                                                           ║
 # ╚═══════════════════════════════════════════════════════════════════════════╝
 elif page == "Team":
-    import base64 
-
-    # Fungsi helper gambar
+    # Fungsi helper gambar (thumbnail ter-cache per mtime, lihat assets.py)
     def img_to_html(img_path):
         try:
             if os.path.exists(img_path):
-                with open(img_path, "rb") as f:
-                    data = base64.b64encode(f.read()).decode()
-                return f'<img src="data:image/png;base64,{data}" class="member-img">'
+                return f'<img src="{assets.image_data_uri(img_path)}" class="member-img">'
             else:
                 return f'<img src="https://via.placeholder.com/300x400/1a1a1a/ef4444?text=Foto" class="member-img">'
         except Exception:
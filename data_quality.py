@@ -0,0 +1,190 @@
+# ╔═══════════════════════════════════════════════════════════════════════════╗
+# ║                                                                           ║
+# ║              PROFIL KUALITAS DATA (SATU PASS, BISA PER CHUNK)             ║
+# ║                                                                           ║
+# ║  Semua kolom diprofilkan sekaligus: nilai kosong, nilai penanda kosong    ║
+# ║  ("kosong", "Unknown", ""), kardinalitas, baris duplikat, rentang         ║
+# ║  numerik dan outlier (1.5 x IQR).                                         ║
+# ║  - Profiler: update(chunk) per chunk, result() di akhir                   ║
+# ║  - profile_frame(): Profil satu DataFrame                                 ║
+# ║  - profile_csv(): Profil CSV besar per chunk tanpa memuat seluruh file    ║
+# ║  - missing_issues(), recommend_cleaning(): Dipakai halaman Preprocessing ║
+# ║                                                                           ║
+# ║  Statistik yang bisa digabung antar chunk dihitung exact (count, sum,     ║
+# ║  min, max, duplikat via hash baris 64-bit). Kuartil untuk outlier         ║
+# ║  diambil dari sampel acak (bottom-k) berukuran SAMPLE_SIZE per kolom:     ║
+# ║  exact bila baris <= SAMPLE_SIZE, estimasi bila lebih.                    ║
+# ║                                                                           ║
+# ╚═══════════════════════════════════════════════════════════════════════════╝
+import numpy as np
+import pandas as pd
+
+SENTINELS = ("kosong", "unknown", "")
+SAMPLE_SIZE = 20_000
+# di atas batas ini jumlah nilai unik dilaporkan sebagai batas bawah (distinct_capped)
+DISTINCT_CAP = 100_000
+IQR_FACTOR = 1.5
+DEFAULT_CHUNKSIZE = 200_000
+
+COLUMNS = ["dtype", "kind", "missing", "missing_pct", "sentinel", "sentinel_pct", "distinct", "distinct_capped",
+           "min", "max", "mean", "std", "outliers", "outlier_pct"]
+
+
+def _is_numeric(series):
+    return series.dtype.kind in "biufc"
+
+
+class Profiler:
+    def __init__(self, sample_size=SAMPLE_SIZE, distinct_cap=DISTINCT_CAP, random_state=42):
+        self.sample_size = sample_size
+        self.distinct_cap = distinct_cap
+        self._rng = np.random.default_rng(random_state)
+        self.rows = 0
+        self._cols = {}
+        self._row_hashes = []
+
+    def _col(self, name):
+        state = self._cols.get(name)
+        if state is None:
+            state = self._cols[name] = {
+                "dtype": None, "numeric": True, "missing": 0, "sentinel": 0,
+                "hashes": np.empty(0, dtype=np.uint64), "capped": False,
+                "count": 0, "sum": 0.0, "sumsq": 0.0, "min": np.inf, "max": -np.inf,
+                "sample_keys": np.empty(0), "sample_values": np.empty(0),
+            }
+        return state
+
+    def update(self, chunk):
+        n = len(chunk)
+        if n == 0:
+            return self
+        self.rows += n
+        # baris duplikat: hash 64-bit per baris, dihitung unik di result()
+        self._row_hashes.append(pd.util.hash_pandas_object(chunk, index=False).to_numpy())
+
+        # null count & statistik numerik untuk semua kolom sekaligus
+        missing = chunk.isna().sum()
+        num = chunk.select_dtypes(include=["number", "bool"]).astype(float)
+        counts, sums = num.count(), num.sum()
+        sumsq, mins, maxs = (num ** 2).sum(), num.min(), num.max()
+
+        keys = self._rng.random(n)
+        for name in chunk.columns:
+            state = self._col(name)
+            series = chunk[name]
+            state["dtype"] = str(series.dtype) if state["dtype"] in (None, str(series.dtype)) else "mixed"
+            state["missing"] += int(missing[name])
+            valid = series.notna().to_numpy()
+
+            if name in num.columns:
+                if counts[name]:
+                    state["count"] += int(counts[name])
+                    state["sum"] += float(sums[name])
+                    state["sumsq"] += float(sumsq[name])
+                    state["min"] = min(state["min"], float(mins[name]))
+                    state["max"] = max(state["max"], float(maxs[name]))
+                    # sampel bottom-k: kunci acak terkecil = sampel seragam, bisa digabung antar chunk
+                    all_keys = np.concatenate([state["sample_keys"], keys[valid]])
+                    all_values = np.concatenate([state["sample_values"], num[name].to_numpy()[valid]])
+                    if len(all_keys) > self.sample_size:
+                        keep = np.argpartition(all_keys, self.sample_size)[:self.sample_size]
+                        all_keys, all_values = all_keys[keep], all_values[keep]
+                    state["sample_keys"], state["sample_values"] = all_keys, all_values
+            else:
+                # kolom teks di chunk mana pun membuat kolom ini kategorikal
+                state["numeric"] = False
+                text = series[valid].astype(str).str.strip().str.lower()
+                state["sentinel"] += int(text.isin(SENTINELS).sum())
+
+            if not state["capped"]:
+                hashes = np.unique(np.concatenate([state["hashes"], pd.util.hash_array(series.to_numpy()[valid])]))
+                if len(hashes) > self.distinct_cap:
+                    state["capped"] = True
+                    hashes = hashes[:self.distinct_cap]
+                state["hashes"] = hashes
+        return self
+
+    def result(self):
+        rows = self.rows
+        out = {}
+        for name, s in self._cols.items():
+            numeric = s["numeric"] and s["count"] > 0
+            rec = {
+                "dtype": s["dtype"],
+                "kind": "numeric" if s["numeric"] else "categorical",
+                "missing": s["missing"],
+                "missing_pct": 100 * s["missing"] / rows if rows else 0.0,
+                "sentinel": s["sentinel"],
+                "sentinel_pct": 100 * s["sentinel"] / rows if rows else 0.0,
+                "distinct": len(s["hashes"]),
+                "distinct_capped": s["capped"],
+                "min": s["min"] if numeric else np.nan,
+                "max": s["max"] if numeric else np.nan,
+                "mean": np.nan, "std": np.nan, "outliers": np.nan, "outlier_pct": np.nan,
+            }
+            if numeric:
+                mean = s["sum"] / s["count"]
+                var = max(s["sumsq"] / s["count"] - mean ** 2, 0.0)
+                rec["mean"] = mean
+                rec["std"] = np.sqrt(var * s["count"] / max(s["count"] - 1, 1))
+                sample = s["sample_values"]
+                q1, q3 = np.percentile(sample, [25, 75])
+                lo, hi = q1 - IQR_FACTOR * (q3 - q1), q3 + IQR_FACTOR * (q3 - q1)
+                frac = float(np.mean((sample < lo) | (sample > hi)))
+                rec["outliers"] = int(round(frac * s["count"]))
+                rec["outlier_pct"] = 100 * frac
+            out[name] = rec
+        columns = pd.DataFrame.from_dict(out, orient="index", columns=COLUMNS)
+        columns.index.name = "column"
+        hashes = np.concatenate(self._row_hashes) if self._row_hashes else np.empty(0, dtype=np.uint64)
+        duplicates = int(len(hashes) - len(np.unique(hashes)))
+        return {"rows": rows, "duplicates": duplicates, "columns": columns}
+
+
+def profile_frame(df):
+    return Profiler().update(df).result()
+
+
+def profile_csv(path, chunksize=DEFAULT_CHUNKSIZE, try_encodings=None, **read_kwargs):
+    # Sama dengan profile_frame(pd.read_csv(path)) tanpa memuat seluruh file; encoding dicoba
+    # bergantian seperti pipeline.robust_read_csv (chunk yang sudah diproses diulang dari awal)
+    if try_encodings is None:
+        try_encodings = ["utf-8", "utf-8-sig", "cp1252", "latin-1"]
+    for enc in try_encodings:
+        profiler = Profiler()
+        try:
+            for chunk in pd.read_csv(path, chunksize=chunksize, encoding=enc, **read_kwargs):
+                profiler.update(chunk)
+            return profiler.result()
+        except UnicodeDecodeError:
+            continue
+    raise ValueError(f"Tidak dapat membaca {path} dengan encoding {try_encodings}")
+
+
+def missing_issues(profile):
+    # Format lama detect_data_quality_issues(): {kolom: {"type", "count", "pct", "kind"}}
+    cols = profile["columns"]
+    cols = cols[cols["missing"] > 0]
+    return {name: {"type": "missing", "count": int(row["missing"]), "pct": float(row["missing_pct"]), "kind": row["kind"]}
+            for name, row in cols.iterrows()}
+
+
+def recommend_cleaning(profile):
+    recs = []
+    for name, row in profile["columns"].iterrows():
+        if row["missing"] > 0:
+            if name in ["victim_age"]:
+                recs.append(f"📌 **{name}**: {row['missing']} nilai kosong. Rekomendasi: isi dengan median atau hapus baris.")
+            elif row["kind"] == "numeric":
+                recs.append(f"📌 **{name}**: {row['missing']} nilai kosong. Rekomendasi: isi dengan median/mean atau hapus baris.")
+            else:
+                recs.append(f"📌 **{name}**: {row['missing']} nilai kosong. Rekomendasi: isi dengan nilai 'Unknown' atau hapus baris.")
+        if row["sentinel"] > 0:
+            recs.append(f"📌 **{name}**: {row['sentinel']} nilai penanda kosong ('kosong'/'Unknown'/teks kosong) "
+                        f"yang tidak terbaca sebagai NaN. Rekomendasi: perlakukan sebagai nilai kosong atau kategori tersendiri.")
+        if row["kind"] == "numeric" and row["outliers"] > 0:
+            recs.append(f"📌 **{name}**: ±{int(row['outliers'])} outlier ({row['outlier_pct']:.1f}%) di luar "
+                        f"{IQR_FACTOR} x IQR, rentang {row['min']:g} – {row['max']:g}. Rekomendasi: periksa nilai ekstrem.")
+    if profile["duplicates"] > 0:
+        recs.append(f"📌 **Duplikat**: {profile['duplicates']} baris identik. Rekomendasi: centang 'Hapus duplikat'.")
+    return recs
@@ -0,0 +1,83 @@
+# ╔═══════════════════════════════════════════════════════════════════════════╗
+# ║                                                                           ║
+# ║                  DIAGNOSTIK: WAKTU & MEMORI PER TAHAP                     ║
+# ║                                                                           ║
+# ║  - stage(): Context manager pengukur waktu (perf_counter) dan selisih     ║
+# ║    RSS proses satu tahap pipeline; puncak memori tracemalloc hanya bila   ║
+# ║    diminta (track_memory=True, ~1.5x lebih lambat)                        ║
+# ║  - to_frame(): Log tahap sebagai DataFrame untuk panel sidebar            ║
+# ║                                                                           ║
+# ║  Kedua angka memori berlaku untuk seluruh proses: sesi & job lain yang    ║
+# ║  berjalan bersamaan di server ikut terhitung.                             ║
+# ║                                                                           ║
+# ║  Contoh:                                                                  ║
+# ║    with stage(log, "kmeans", page="Visualisasi", rows=len(X)) as rec:     ║
+# ║        labels = fit_kmeans(X, k)                                          ║
+# ║        rec["detail"] = f"k={k}"                                           ║
+# ║                                                                           ║
+# ╚═══════════════════════════════════════════════════════════════════════════╝
+import os
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+import pandas as pd
+
+MAX_RECORDS = 100
+COLUMNS = ["time", "page", "stage", "rows", "seconds", "rss_delta_mb", "peak_mb", "status", "detail"]
+
+_tracing_lock = threading.Lock()
+
+
+def rss_mb():
+    # RSS proses saat ini (Linux /proc); None di platform lain
+    try:
+        with open("/proc/self/statm") as fh:
+            pages = int(fh.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") / 1e6
+    except (OSError, ValueError, AttributeError, IndexError):
+        return None
+
+
+@contextmanager
+def stage(log, name, page=None, rows=None, track_memory=False, on_record=None):
+    # tracemalloc global per proses: hanya tahap yang menyalakannya yang mengukur dan mematikannya;
+    # tahap lain (bersarang / thread lain) selama tracing aktif hanya diukur waktu & RSS
+    with _tracing_lock:
+        track = track_memory and not tracemalloc.is_tracing()
+        if track:
+            tracemalloc.start()
+    rec = {"time": time.strftime("%H:%M:%S"), "page": page, "stage": name, "rows": rows,
+           "seconds": None, "rss_delta_mb": None, "peak_mb": None, "status": "ok", "detail": ""}
+    rss0 = rss_mb()
+    t0 = time.perf_counter()
+    try:
+        yield rec
+    except Exception as e:
+        # exception boleh membawa status sendiri (mis. "timeout", "cancelled" dari jobs.py)
+        rec["status"] = getattr(e, "status", "error")
+        rec["detail"] = f"{type(e).__name__}: {e}"
+        raise
+    except BaseException:
+        # st.stop() / rerun Streamlit, bukan error pipeline
+        rec["status"] = "interrupted"
+        raise
+    finally:
+        rec["seconds"] = round(time.perf_counter() - t0, 4)
+        rss1 = rss_mb()
+        if rss0 is not None and rss1 is not None:
+            rec["rss_delta_mb"] = round(rss1 - rss0, 2)
+        if track:
+            with _tracing_lock:
+                rec["peak_mb"] = round(tracemalloc.get_traced_memory()[1] / 1e6, 2)
+                tracemalloc.stop()
+        log.append(rec)
+        del log[:-MAX_RECORDS]
+        if on_record is not None:
+            on_record(log)
+
+
+def to_frame(log):
+    # Tahap terbaru di atas
+    return pd.DataFrame(list(reversed(log)), columns=COLUMNS)
@@ -0,0 +1,86 @@
+# ╔═══════════════════════════════════════════════════════════════════════════╗
+# ║                                                                           ║
+# ║           ENCODER KATEGORIKAL DENGAN LEBAR TERBATAS (HIGH-CARDINALITY)    ║
+# ║                                                                           ║
+# ║  pd.get_dummies membuat satu kolom per nilai unik: city / victim_last /   ║
+# ║  uid bisa jadi puluhan ribu kolom. Pilihan encoder per fitur:             ║
+# ║  - onehot: Satu kolom per nilai (perilaku lama)                           ║
+# ║  - top_n: N nilai tersering + satu kolom "(other)"                        ║
+# ║  - frequency: Satu kolom, proporsi kemunculan nilai di data fit           ║
+# ║  - hashing: Nilai di-hash ke sejumlah bucket tetap                        ║
+# ║                                                                           ║
+# ║  - fit_specs(): Spesifikasi encoder per fitur dari data fit; onehot untuk ║
+# ║    fitur dengan nilai unik > CARDINALITY_LIMIT otomatis diganti top_n     ║
+# ║  - encode_column(): Satu fitur -> kolom terkode sesuai spesifikasi        ║
+# ║                                                                           ║
+# ║  Spesifikasi (kategori top-N, tabel frekuensi, jumlah bucket) disimpan    ║
+# ║  bersama hasil run sehingga batch append di-encode dengan kolom yang sama.║
+# ║                                                                           ║
+# ╚═══════════════════════════════════════════════════════════════════════════╝
+import numpy as np
+import pandas as pd
+
+ENCODERS = {
+    "onehot": "One-hot",
+    "top_n": "Top-N + other",
+    "frequency": "Frekuensi",
+    "hashing": "Hashing",
+}
+# di atas jumlah nilai unik ini onehot diganti top_n (lebar kolom maksimum TOP_N + 1); cukup longgar
+# untuk victim_age mentah (angka + "Unknown"), state dan city di dataset asli
+CARDINALITY_LIMIT = 200
+TOP_N = 20
+HASH_BUCKETS = 32
+OTHER = "(other)"
+
+
+def is_categorical(series):
+    # Aturan sama dengan pipeline.encode_raw: selain numerik = kategorikal
+    return series.dtype.kind not in "biufc"
+
+
+def fit_spec(series, method="onehot", limit=CARDINALITY_LIMIT, top_n=TOP_N, buckets=HASH_BUCKETS):
+    values = series.astype(str)
+    return spec_from_counts(values.value_counts(sort=True), len(values), method, limit, top_n, buckets)
+
+
+def spec_from_counts(counts, n_rows, method="onehot", limit=CARDINALITY_LIMIT, top_n=TOP_N, buckets=HASH_BUCKETS):
+    # counts: jumlah per nilai (urut menurun), n_rows: jumlah baris termasuk NA; dipakai juga oleh
+    # streaming.py yang menjumlahkan hitungan per chunk tanpa memuat seluruh kolom
+    spec = {"method": method, "cardinality": int(len(counts)), "auto": False}
+    if method == "onehot" and len(counts) > limit:
+        spec.update(method="top_n", auto=True)
+    if spec["method"] == "top_n":
+        spec["categories"] = counts.index[:top_n].tolist()
+    elif spec["method"] == "frequency":
+        spec["freq"] = (counts / max(n_rows, 1)).to_dict()
+    elif spec["method"] == "hashing":
+        spec["buckets"] = int(buckets)
+    return spec
+
+
+def fit_specs(dfp, features, methods=None, limit=CARDINALITY_LIMIT, top_n=TOP_N, buckets=HASH_BUCKETS):
+    # methods: {fitur: metode}; fitur tanpa pilihan = onehot (dengan guard kardinalitas)
+    methods = methods or {}
+    return {f: fit_spec(dfp[f], methods.get(f, "onehot"), limit, top_n, buckets)
+            for f in features if f in dfp.columns and is_categorical(dfp[f])}
+
+
+def encode_column(series, feature, spec=None):
+    values = series.astype(str)
+    method = spec["method"] if spec else "onehot"
+    if method == "top_n":
+        categories = list(spec["categories"]) + [OTHER]
+        mapped = values.where(values.isin(spec["categories"]), OTHER)
+        # kategori tetap: kolom sama walau sebagian nilai tidak muncul di batch ini
+        return pd.get_dummies(pd.Categorical(mapped, categories=categories), prefix=feature).set_axis(series.index)
+    if method == "frequency":
+        return pd.DataFrame({f"{feature}_freq": values.map(spec["freq"]).astype(float).fillna(0.0)}, index=series.index)
+    if method == "hashing":
+        buckets = spec["buckets"]
+        codes = pd.util.hash_array(values.to_numpy(dtype=object)) % np.uint64(buckets)
+        onehot = np.zeros((len(values), buckets), dtype=np.uint8)
+        onehot[np.arange(len(values)), codes.astype(np.int64)] = 1
+        return pd.DataFrame(onehot, columns=[f"{feature}_h{i}" for i in range(buckets)], index=series.index)
+    return pd.get_dummies(values, prefix=feature)
+
@@ -0,0 +1,97 @@
+# ╔═══════════════════════════════════════════════════════════════════════════╗
+# ║                                                                           ║
+# ║                 EKSPOR HASIL CLUSTERING (PARQUET / CSV GZIP)              ║
+# ║                                                                           ║
+# ║  Data cleaning + cluster, _x, _y, silhouette per baris ditulis per chunk  ║
+# ║  (CHUNK_ROWS baris) ke file sementara, tanpa membangun satu DataFrame     ║
+# ║  gabungan maupun satu string CSV besar di memori:                         ║
+# ║  - iter_chunks(): Potongan df_proc + kolom hasil, satu chunk sekaligus    ║
+# ║  - write_parquet(): Satu row group per chunk (pyarrow ParquetWriter)      ║
+# ║  - write_csv_gz(): CSV terkompresi gzip, header hanya di chunk pertama    ║
+# ║  - export_file(): File siap unduh (format dari EXPORT_FORMATS)            ║
+# ║  - profile_table(): Profil klaster (ringkasan + rata-rata fitur)          ║
+# ║                                                                           ║
+# ║  Di dashboard export_file() dipasang sebagai callable st.download_button: ║
+# ║  file baru dibuat saat tombol diklik, di thread terpisah dari script.     ║
+# ║                                                                           ║
+# ╚═══════════════════════════════════════════════════════════════════════════╝
+import gzip
+import io
+import os
+import tempfile
+
+import numpy as np
+
+from pipeline import PARQUET_AVAILABLE
+
+CHUNK_ROWS = 100_000
+EXPORT_FORMATS = {
+    "csv.gz": {"label": "CSV (gzip)", "mime": "application/gzip"},
+}
+if PARQUET_AVAILABLE:
+    EXPORT_FORMATS["parquet"] = {"label": "Parquet", "mime": "application/vnd.apache.parquet"}
+
+
+def iter_chunks(dfp, labels, coords, silhouette_values=None, chunk_rows=CHUNK_ROWS):
+    labels = np.asarray(labels)
+    coords = np.asarray(coords)
+    for start in range(0, len(dfp), chunk_rows):
+        stop = min(start + chunk_rows, len(dfp))
+        extra = {"cluster": labels[start:stop], "_x": coords[start:stop, 0], "_y": coords[start:stop, 1]}
+        if silhouette_values is not None:
+            extra["silhouette"] = np.asarray(silhouette_values[start:stop], dtype=float)
+        yield dfp.iloc[start:stop].assign(**extra)
+
+
+def write_parquet(chunks, fh):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    writer = None
+    try:
+        for chunk in chunks:
+            if writer is None:
+                table = pa.Table.from_pandas(chunk, preserve_index=False)
+                writer = pq.ParquetWriter(fh, table.schema, compression="zstd")
+            else:
+                # skema chunk pertama dipakai untuk semua chunk (kolom object bisa ditebak berbeda)
+                table = pa.Table.from_pandas(chunk, schema=writer.schema, preserve_index=False)
+            writer.write_table(table)
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+def write_csv_gz(chunks, fh):
+    # to_csv menulis langsung ke stream gzip: tidak ada string CSV per chunk maupun untuk seluruh data
+    with gzip.GzipFile(fileobj=fh, mode="wb", compresslevel=6) as gz:
+        text = io.TextIOWrapper(gz, encoding="utf-8", newline="")
+        for i, chunk in enumerate(chunks):
+            chunk.to_csv(text, header=i == 0, index=False)
+        text.flush()
+        # lepas wrapper tanpa menutup gz (ditutup oleh with)
+        text.detach()
+
+
+def export_file(fmt, dfp, labels, coords, silhouette_values=None, chunk_rows=CHUNK_ROWS):
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Format ekspor tidak dikenal: {fmt}")
+    # ditulis ke file sementara di disk; st.download_button hanya menerima BufferedReader (open(..., "rb")),
+    # bukan SpooledTemporaryFile. Path langsung dihapus: isi tetap terbaca lewat handle yang terbuka
+    fd, path = tempfile.mkstemp(suffix=f".{fmt}")
+    try:
+        chunks = iter_chunks(dfp, labels, coords, silhouette_values, chunk_rows)
+        with os.fdopen(fd, "wb") as fh:
+            if fmt == "parquet":
+                write_parquet(chunks, fh)
+            else:
+                write_csv_gz(chunks, fh)
+        return open(path, "rb")
+    finally:
+        os.unlink(path)
+
+
+def profile_table(profile):
+    summary = profile["summary"]
+    means = profile["feature_means"].add_prefix("mean_feature_")
+    return summary.join(means).reset_index()
@@ -0,0 +1,333 @@
+# ╔═══════════════════════════════════════════════════════════════════════════╗
+# ║                                                                           ║
+# ║              MODE APPEND (KASUS BARU KE CLUSTERING YANG ADA)              ║
+# ║                                                                           ║
+# ║  Baris baru diproses dengan state preprocessing hasil fit (nilai pengisi, ║
+# ║  spesifikasi encoder + kolom terkode, mean & skala StandardScaler),       ║
+# ║  ditempatkan ke centroid terdekat dan ke embedding 2D yang sudah ada,     ║
+# ║  tanpa k-sweep, KMeans ulang maupun t-SNE ulang.                          ║
+# ║  - IncrementalModel.from_result(): State dari hasil run / session         ║
+# ║  - IncrementalModel.append(): Proses satu batch baris baru                ║
+# ║  - IncrementalModel.profile(): Profil klaster fit + semua batch           ║
+# ║  - IncrementalModel.drift(): Indikator kapan refit penuh diperlukan       ║
+# ║  - combine(): Hasil run + batch append (untuk save_results)               ║
+# ║  - save_state(), load_state(): State encoder & centroid (batch_run.py)    ║
+# ║  - check_engine(): Tolak hasil engine non-centroid (DBSCAN, k-prototypes) ║
+# ║                                                                           ║
+# ║  Posisi 2D baris baru = rata-rata posisi N_NEIGHBORS tetangga terdekat    ║
+# ║  (di ruang fitur terskala) di antara baris fit, berbobot 1/jarak: sama    ║
+# ║  untuk PCA, t-SNE dan UMAP. Centroid opsional diperbarui dengan langkah   ║
+# ║  mini-batch (rata-rata berjalan per klaster); label baris lama tetap.     ║
+# ║                                                                           ║
+# ╚═══════════════════════════════════════════════════════════════════════════╝
+import json
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from sklearn.neighbors import NearestNeighbors
+
+import encoders
+import pipeline
+
+N_NEIGHBORS = 5
+STATE_FILE = "incremental.json"
+# Batas indikator drift; satu saja terlampaui -> refit penuh disarankan
+DRIFT_LIMITS = {
+    "distance_ratio": 1.5,   # rata-rata jarak ke centroid baris baru / baris fit
+    "cluster_shift": 0.2,    # total variation distance proporsi klaster baru vs fit
+    "unseen_share": 0.1,     # porsi baris baru dengan kategori yang tidak dikenal encoder
+    "centroid_shift": 0.5,   # pergeseran centroid terbesar / rata-rata jarak fit
+    "growth": 0.5,           # baris tambahan / baris fit
+}
+DRIFT_REASONS = {
+    "distance_ratio": "baris baru jauh lebih jauh dari centroid dibanding data fit",
+    "cluster_shift": "proporsi klaster baris baru berbeda dari data fit",
+    "unseen_share": "banyak kategori baru yang tidak dikenal encoder",
+    "centroid_shift": "centroid sudah bergeser jauh dari hasil fit",
+    "growth": "data tambahan sudah besar dibanding data fit",
+}
+CLUSTER_COLUMNS = ["cluster", "_x", "_y", "silhouette"]
+# Engine yang labelnya tidak bisa diteruskan lewat centroid terdekat di X_scaled (append / scoring)
+UNSUPPORTED_ENGINES = {
+    "dbscan": "klaster DBSCAN ditentukan kepadatan lokasi dan punya noise (-1), bukan centroid",
+    "kprototypes": "klaster k-prototypes memakai jarak campuran (kode kategori + gamma), bukan jarak one-hot",
+}
+
+
+def _fit_fills(dfp, params):
+    # Aturan dtype sama dengan pipeline.fit_cleaning, dihitung dari data fit (sudah bersih)
+    fills, as_str = {}, []
+    for col in dfp.columns:
+        if dfp[col].dtype.kind in "biufc":
+            if params.get("fill_numeric_method") == "mean":
+                fills[col] = float(dfp[col].mean())
+            elif params.get("fill_numeric_method") == "0":
+                fills[col] = 0
+            else:
+                fills[col] = float(dfp[col].median())
+        elif dfp[col].dtype == "object" or dfp[col].dtype.name == "category":
+            mode_val = dfp[col].mode() if params.get("fill_categorical_method") == "mode" else []
+            fills[col] = mode_val[0] if len(mode_val) > 0 else "Unknown"
+            as_str.append(col)
+    return fills, as_str
+
+
+def _as_dtypes(df, dtypes):
+    # Batch CSV bisa terbaca dengan dtype lain dari df_proc (mis. int64 vs float64 bila kolom fit punya NaN);
+    # hash pandas bergantung dtype, jadi disamakan dulu. Kolom yang tidak bisa dicast dibiarkan.
+    out = df.copy()
+    for col, dtype in dtypes.items():
+        if out[col].dtype != dtype:
+            try:
+                out[col] = out[col].astype(dtype)
+            except (TypeError, ValueError):
+                pass
+    return out
+
+
+def check_engine(params):
+    # ValueError (pesan untuk pengguna) bila hasil run dibuat engine yang tidak didukung mode append / scoring
+    engine = params.get("engine") or "kmeans"
+    if engine in UNSUPPORTED_ENGINES:
+        raise ValueError(f"Mode append / scoring tidak tersedia untuk engine {engine}: {UNSUPPORTED_ENGINES[engine]}. "
+                         "Jalankan clustering K-Means untuk memakainya.")
+
+
+def _to_builtin(v):
+    if isinstance(v, np.generic):
+        return v.item()
+    return v
+
+
+class IncrementalModel:
+    def __init__(self, features, params, fills, as_str, feature_cols, mean, scale, clusters, centroids, counts,
+                 fit_distance, n_fit, encoding=None):
+        self.features = list(features)
+        self.params = dict(params)
+        self.fills = dict(fills)
+        self.as_str = list(as_str)
+        self.feature_cols = list(feature_cols)
+        self.mean = np.asarray(mean, dtype=float)
+        self.scale = np.asarray(scale, dtype=float)
+        self.clusters = np.asarray(clusters)
+        self.centroids = np.array(centroids, dtype=float)
+        self.fit_centroids = self.centroids.copy()
+        self.counts = np.asarray(counts, dtype=np.int64).copy()
+        self.fit_counts = self.counts.copy()
+        self.fit_distance = float(fit_distance)
+        self.n_fit = int(n_fit)
+        # spesifikasi encoder kategorikal dari data fit (encoders.fit_specs); None = state lama (one-hot)
+        self.encoding = encoding
+        # akumulasi semua batch sejak fit (untuk drift)
+        self.n_appended = 0
+        self.appended_counts = np.zeros(len(self.clusters), dtype=np.int64)
+        self.distance_sum = 0.0
+        self.unseen_rows = 0
+        self.dropped = {"duplicates": 0, "missing": 0}
+        self._nn = None
+        self._coords = None
+        self._profile_state = None
+        self._numeric_feats = []
+        self._dedup = None
+        self._dedup_dtypes = None
+
+    # ── fit dari hasil run ───────────────────────────────────────────────────
+    @classmethod
+    def from_result(cls, result, layer=None, state=None):
+        # result: format run_pipeline / load_results (df_proc, X_scaled, feature_cols, labels, coords, params);
+        # layer: layer cleaning dari session (nilai pengisi asli); state: hasil load_state() bila ada
+        dfp = result["df_proc"].drop(columns=CLUSTER_COLUMNS, errors="ignore")
+        X = np.asarray(result["X_scaled"], dtype=float)
+        labels = np.asarray(result["labels"])
+        params = result["params"]
+        check_engine(params)
+        if state is not None:
+            model = cls(**state["model"])
+            model._restore(state["progress"])
+        else:
+            fills, as_str = _fit_fills(dfp, params)
+            if layer is not None:
+                fills.update(layer["fills"])
+            # mean & skala StandardScaler dari encoding data fit (kolom sama dengan feature_cols)
+            encoding = encoders.fit_specs(dfp, params["features"], params.get("encoders"))
+            raw = pipeline.encode_raw(dfp, params["features"], encoding).reindex(columns=result["feature_cols"], fill_value=0)
+            mean = raw.mean().to_numpy(dtype=float)
+            scale = raw.std(ddof=0).to_numpy(dtype=float, copy=True)
+            scale[scale == 0] = 1.0
+            clusters, codes = np.unique(labels, return_inverse=True)
+            codes = codes.ravel()
+            counts = np.bincount(codes, minlength=len(clusters))
+            centroids = np.zeros((len(clusters), X.shape[1]))
+            np.add.at(centroids, codes, X)
+            centroids /= np.maximum(counts, 1)[:, None]
+            fit_distance = np.linalg.norm(X - centroids[codes], axis=1).mean() if len(X) else 0.0
+            model = cls(params["features"], params, fills, as_str, result["feature_cols"], mean, scale,
+                        clusters, centroids, counts, fit_distance, len(X), encoding)
+        model._nn = NearestNeighbors(n_neighbors=min(N_NEIGHBORS, len(X))).fit(X)
+        model._coords = np.asarray(result["coords"], dtype=float)
+        model._numeric_feats = pipeline.profile_numeric_features(dfp, model.feature_cols)
+        model._profile_state = pipeline.cluster_profile_state(dfp, labels, model._numeric_feats)
+        if params.get("remove_duplicates"):
+            model._dedup = pipeline.DuplicateFilter(params.get("duplicate_subset") or list(dfp.columns))
+            model._dedup_dtypes = dfp[model._dedup.subset].dtypes
+            model._dedup.keep_mask(dfp)
+        return model
+
+    def to_dict(self):
+        # model: argumen __init__ (state fit); progress: akumulasi batch sejak fit, supaya drift
+        # tetap dihitung terhadap fit awal walau append dijalankan berkali-kali lewat batch_run.py
+        return {
+            "model": {
+                "features": self.features, "params": self.params,
+                "fills": {k: _to_builtin(v) for k, v in self.fills.items()}, "as_str": self.as_str,
+                "feature_cols": self.feature_cols, "mean": self.mean.tolist(), "scale": self.scale.tolist(),
+                "clusters": self.clusters.tolist(), "centroids": self.fit_centroids.tolist(),
+                "counts": self.fit_counts.tolist(), "fit_distance": self.fit_distance, "n_fit": self.n_fit,
+                "encoding": self.encoding,
+            },
+            "progress": {
+                "centroids": self.centroids.tolist(), "counts": self.counts.tolist(),
+                "n_appended": self.n_appended, "appended_counts": self.appended_counts.tolist(),
+                "distance_sum": self.distance_sum, "unseen_rows": self.unseen_rows, "dropped": self.dropped,
+            },
+        }
+
+    def _restore(self, progress):
+        self.centroids = np.array(progress["centroids"], dtype=float)
+        self.counts = np.asarray(progress["counts"], dtype=np.int64)
+        self.n_appended = int(progress["n_appended"])
+        self.appended_counts = np.asarray(progress["appended_counts"], dtype=np.int64)
+        self.distance_sum = float(progress["distance_sum"])
+        self.unseen_rows = int(progress["unseen_rows"])
+        self.dropped = dict(progress["dropped"])
+
+    # ── batch baru ───────────────────────────────────────────────────────────
+    def transform(self, df_new, filter_rows=True):
+        # Cleaning + encoding dengan state fit; kategori yang tidak dikenal encoder jadi vektor nol.
+        # filter_rows=False (scoring_service.py): satu baris hasil per baris input, tanpa buang duplikat /
+        # baris kosong dan tanpa mengubah state duplikat model
+        missing = [f for f in self.features if f not in df_new.columns]
+        if missing:
+            raise ValueError(f"Kolom fitur tidak ada di data baru: {', '.join(missing)}")
+        dropped = {"duplicates": 0, "missing": 0}
+        dfp = df_new.reset_index(drop=True)
+        layer = {"rows": None, "fills": self.fills, "as_str": [c for c in self.as_str if c in dfp.columns]}
+        dfp = pipeline.apply_cleaning(dfp, layer)
+        if filter_rows and self._dedup is not None:
+            # kunci duplikat dibandingkan dengan data fit dan semua batch sebelumnya; sisi fit di-hash dari
+            # df_proc (sudah dibersihkan), jadi batch juga di-hash setelah cleaning dengan dtype kolom fit
+            subset = [c for c in self._dedup.subset if c in dfp.columns]
+            if subset == self._dedup.subset:
+                keep = self._dedup.keep_mask(_as_dtypes(dfp[subset], self._dedup_dtypes))
+                dropped["duplicates"] = int((~keep).sum())
+                dfp = dfp[keep].reset_index(drop=True)
+        if filter_rows and self.params.get("remove_missing"):
+            keep = dfp[self.features].notna().all(axis=1).to_numpy()
+            dropped["missing"] = int((~keep).sum())
+            dfp = dfp[keep].reset_index(drop=True)
+
+        raw = pipeline.encode_raw(dfp, self.features, self.encoding)
+        unknown = [c for c in raw.columns if c not in self.feature_cols]
+        unseen = raw[unknown].to_numpy(dtype=bool).any(axis=1) if unknown else np.zeros(len(dfp), dtype=bool)
+        raw = raw.reindex(columns=self.feature_cols, fill_value=0)
+        X = (raw.to_numpy(dtype=float) - self.mean) / self.scale
+        return dfp, X, unseen, dropped
+
+    def assign(self, X):
+        # centroid terdekat (jarak Euclidean di ruang fitur terskala)
+        d2 = (X ** 2).sum(axis=1)[:, None] - 2 * X @ self.centroids.T + (self.centroids ** 2).sum(axis=1)[None, :]
+        idx = d2.argmin(axis=1)
+        return idx, np.sqrt(np.maximum(d2[np.arange(len(X)), idx], 0))
+
+    def place(self, X):
+        # posisi 2D dari tetangga terdekat di antara baris fit, berbobot 1/jarak
+        dist, ind = self._nn.kneighbors(X)
+        w = 1.0 / np.maximum(dist, 1e-9)
+        w /= w.sum(axis=1, keepdims=True)
+        return (self._coords[ind] * w[:, :, None]).sum(axis=1)
+
+    def append(self, df_new, update_centroids=False):
+        t0 = time.perf_counter()
+        dfp, X, unseen, dropped = self.transform(df_new)
+        idx, dist = self.assign(X) if len(X) else (np.zeros(0, dtype=int), np.zeros(0))
+        labels = self.clusters[idx]
+        coords = self.place(X) if len(X) else np.zeros((0, 2))
+
+        batch_counts = np.bincount(idx, minlength=len(self.clusters))
+        if update_centroids and len(X):
+            # langkah mini-batch: centroid = rata-rata berjalan semua baris klaster itu
+            sums = np.zeros_like(self.centroids)
+            np.add.at(sums, idx, X)
+            total = self.counts + batch_counts
+            hit = batch_counts > 0
+            self.centroids[hit] += (sums[hit] - batch_counts[hit, None] * self.centroids[hit]) / total[hit, None]
+        self.counts += batch_counts
+        self.appended_counts += batch_counts
+        self.n_appended += len(X)
+        self.distance_sum += float(dist.sum())
+        self.unseen_rows += int(unseen.sum())
+        for key in dropped:
+            self.dropped[key] += dropped[key]
+        if len(X):
+            batch_state = pipeline.cluster_profile_state(dfp, labels, self._numeric_feats)
+            self._profile_state = pipeline.merge_profile_states(self._profile_state, batch_state)
+
+        return {
+            "df_proc": pipeline.attach_clusters(dfp, labels, coords),
+            "X_scaled": X,
+            "labels": labels,
+            "coords": coords,
+            "distance": dist,
+            "unseen": int(unseen.sum()),
+            "dropped": dropped,
+            "seconds": time.perf_counter() - t0,
+            "drift": self.drift(),
+        }
+
+    # ── profil & drift ───────────────────────────────────────────────────────
+    def profile(self):
+        return pipeline.profile_from_state(self._profile_state)
+
+    def drift(self):
+        n = self.n_appended
+        values = {"distance_ratio": None, "cluster_shift": None, "unseen_share": None, "centroid_shift": 0.0,
+                  "growth": n / max(self.n_fit, 1)}
+        if n:
+            values["distance_ratio"] = (self.distance_sum / n) / max(self.fit_distance, 1e-12)
+            p_fit = self.fit_counts / max(self.fit_counts.sum(), 1)
+            values["cluster_shift"] = 0.5 * float(np.abs(self.appended_counts / n - p_fit).sum())
+            values["unseen_share"] = self.unseen_rows / n
+        moved = np.linalg.norm(self.centroids - self.fit_centroids, axis=1)
+        values["centroid_shift"] = float(moved.max()) / max(self.fit_distance, 1e-12) if len(moved) else 0.0
+        reasons = [DRIFT_REASONS[key] for key, limit in DRIFT_LIMITS.items()
+                   if values[key] is not None and values[key] > limit]
+        return {**values, "appended": n, "dropped": dict(self.dropped), "refit": bool(reasons), "reasons": reasons}
+
+
+def combine(result, batch, model):
+    # Hasil run (format run_pipeline / load_results) + satu batch append -> hasil baru untuk save_results;
+    # silhouette & metrik K tetap milik fit (tidak dihitung ulang)
+    params = {**result["params"], "appended_rows": model.n_appended}
+    return {**result,
+            "df_proc": pd.concat([result["df_proc"], batch["df_proc"]], ignore_index=True),
+            "X_scaled": np.vstack([result["X_scaled"], batch["X_scaled"]]),
+            "labels": np.concatenate([np.asarray(result["labels"]), batch["labels"]]),
+            "coords": np.vstack([result["coords"], batch["coords"]]),
+            "profile": model.profile(),
+            "params": params}
+
+
+def save_state(model, out_dir):
+    with open(Path(out_dir) / STATE_FILE, "w", encoding="utf-8") as fh:
+        json.dump(model.to_dict(), fh, indent=2)
+
+
+def load_state(out_dir):
+    # None bila folder hasil belum punya state (run penuh biasa): state diturunkan dari hasilnya
+    path = Path(out_dir) / STATE_FILE
+    if not path.exists():
+        return None
+    with open(path, encoding="utf-8") as fh:
+        return json.load(fh)
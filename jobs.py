@@ -0,0 +1,450 @@
+# ╔═══════════════════════════════════════════════════════════════════════════╗
+# ║                                                                           ║
+# ║                  JOB LATAR BELAKANG (CLUSTERING & METRIK K)               ║
+# ║                                                                           ║
+# ║  Tahap berat dijalankan di thread pool, bukan di thread script Streamlit, ║
+# ║  sehingga interaksi lain (pindah halaman, klik) tidak mengulang run:      ║
+# ║  - make_executor(): Thread pool (dibungkus st.cache_resource di dashboard)║
+# ║  - Job: Status, progress per tahap, log diagnostik, hasil / error         ║
+# ║  - submit(): Jalankan fungsi job di pool                                  ║
+# ║  - k_metrics_job(), clustering_job(): Pipeline halaman Analisis dan       ║
+# ║    Visualisasi dengan progress (K ke-i dari N, iterasi t-SNE, blok        ║
+# ║    silhouette)                                                            ║
+# ║  - silhouette_job(): Silhouette per baris untuk label hasil append atau   ║
+# ║    run tanpa silhouette.npy (sekali, bukan per rerun)                     ║
+# ║  - temporal_job(): Clustering per jendela waktu (temporal.py, proses      ║
+# ║    worker) dengan progress per jendela                                    ║
+# ║  - partitions_job(): Clustering per state / kota (partitions.py)          ║
+# ║                                                                           ║
+# ║  Engine clustering: KMeans pada X_scaled (default), DBSCAN haversine pada ║
+# ║  lat/lon (density=...) atau k-prototypes pada kode kategori + numerik     ║
+# ║  (prototypes=..., kprototypes.py). Graf tetangga DBSCAN dan embedding DR  ║
+# ║  masing-masing di-cache terpisah, jadi mengganti eps hanya mengulang      ║
+# ║  DBSCAN + silhouette.                                                     ║
+# ║                                                                           ║
+# ║  Pembatalan & batas waktu: Job.cancel() dan budget per tahap dicek pada   ║
+# ║  setiap laporan progress / output verbose (iterasi KMeans & t-SNE, blok   ║
+# ║  silhouette, K ke-i). Bila budget habis: t-SNE -> PCA, silhouette         ║
+# ║  exact -> sampel, metrik K -> K yang sudah selesai (Job.fallbacks).       ║
+# ║                                                                           ║
+# ║  Hasil lengkap metrik K dan clustering disimpan di cache bersama          ║
+# ║  (result_cache.py) sehingga sesi lain dengan data & parameter sama tidak  ║
+# ║  menghitung ulang.                                                        ║
+# ║                                                                           ║
+# ║  Job tidak menyentuh st.session_state; dashboard memindahkan hasilnya ke  ║
+# ║  session state setelah job selesai.                                       ║
+# ║                                                                           ║
+# ╚═══════════════════════════════════════════════════════════════════════════╝
+import re
+import sys
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+import numpy as np
+
+import diagnostics
+import geo
+import kprototypes
+import partitions
+import pipeline
+import restarts
+import temporal
+
+MAX_WORKERS = 2
+TSNE_ITERATION = re.compile(r"\[t-SNE\] Iteration (\d+)")
+TSNE_MAX_ITER = 1000  # default max_iter TSNE sklearn, total untuk progress iterasi
+# Budget default (detik) per tahap; None = tanpa batas (tetap bisa dibatalkan)
+STAGE_BUDGETS = {"compute_k_metrics": 120, "silhouette_samples": 30, "dr_t-SNE": 90}
+SILHOUETTE_SAMPLE_SIZE = 2000
+
+
+class JobCancelled(Exception):
+    status = "cancelled"
+
+
+class StageTimeout(Exception):
+    status = "timeout"
+
+
+class _ThreadRoutedStdout:
+    # sys.stdout pengganti: tulisan dari thread job diteruskan ke callback job itu,
+    # tulisan dari thread lain tetap ke stdout asli
+    def __init__(self, stream):
+        self._stream = stream
+        self._routes = {}
+
+    def route(self, callback):
+        self._routes[threading.get_ident()] = callback
+
+    def unroute(self):
+        self._routes.pop(threading.get_ident(), None)
+
+    def write(self, text):
+        callback = self._routes.get(threading.get_ident())
+        if callback is None:
+            return self._stream.write(text)
+        callback(text)
+        return len(text)
+
+    def flush(self):
+        self._stream.flush()
+
+    def __getattr__(self, name):
+        return getattr(self._stream, name)
+
+
+_stdout = None
+_stdout_lock = threading.Lock()
+
+
+def _routed_stdout():
+    global _stdout
+    with _stdout_lock:
+        if _stdout is None:
+            _stdout = _ThreadRoutedStdout(sys.stdout)
+            sys.stdout = _stdout
+    return _stdout
+
+
+def make_executor(max_workers=MAX_WORKERS):
+    _routed_stdout()
+    return ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="clustering-job")
+
+
+class Job:
+    def __init__(self, kind, name, stages, page=None, inputs=None):
+        self.id = uuid.uuid4().hex[:8]
+        self.kind = kind
+        self.name = name
+        self.stages = list(stages)
+        self.page = page
+        # referensi input (mis. X_scaled) untuk mengecek apakah hasil masih cocok dengan session
+        self.inputs = inputs
+        self.log = []
+        self.applied = False
+        self.future = None
+        self.started = time.time()
+        self.finished = None
+        self._lock = threading.Lock()
+        self.fallbacks = []
+        self._cancel = threading.Event()
+        self._deadline = None
+        self._budget = None
+        self._stage = None
+        self._stage_idx = 0
+        self._done = 0
+        self._total = None
+        self._message = ""
+
+    def report(self, done=None, total=None, message=None):
+        with self._lock:
+            if done is not None:
+                self._done = done
+            if total is not None:
+                self._total = total
+            if message is not None:
+                self._message = message
+
+    @contextmanager
+    def stage(self, name, rows=None, total=None, budget=None):
+        with self._lock:
+            self._stage, self._done, self._total, self._message = name, 0, total, ""
+            if name in self.stages:
+                self._stage_idx = self.stages.index(name)
+        self._budget = budget
+        self._deadline = time.perf_counter() + budget if budget else None
+        self.check()
+        try:
+            with diagnostics.stage(self.log, name, page=self.page, rows=rows) as rec:
+                yield rec
+        finally:
+            self._deadline = self._budget = None
+
+    def cancel(self):
+        self._cancel.set()
+
+    def cancelled(self):
+        return self._cancel.is_set()
+
+    def check(self):
+        if self._cancel.is_set():
+            raise JobCancelled("dibatalkan pengguna")
+        if self._deadline is not None and time.perf_counter() > self._deadline:
+            raise StageTimeout(f"{self._stage} melewati batas {self._budget:g}s")
+
+    def progress(self, done, total, message=""):
+        # callback untuk pipeline (silhouette_samples_blocked); juga titik cek pembatalan/budget
+        self.report(done, total, message)
+        self.check()
+
+    def _on_output(self, text):
+        # t-SNE verbose=2: "[t-SNE] Iteration 50: error = ..., gradient norm = ..."
+        for match in TSNE_ITERATION.finditer(text):
+            self.report(done=int(match.group(1)), message=f"iterasi {match.group(1)}")
+        # setiap baris verbose (iterasi KMeans/t-SNE) adalah titik cek; exception keluar lewat print()
+        self.check()
+
+    def snapshot(self):
+        with self._lock:
+            stage, idx, done, total, message = self._stage, self._stage_idx, self._done, self._total, self._message
+        within = min(done / total, 1.0) if total else 0.0
+        fraction = 1.0 if self.done() else (idx + within) / max(len(self.stages), 1)
+        return {"stage": stage, "done": done, "total": total, "message": message,
+                "fraction": fraction, "elapsed": (self.finished or time.time()) - self.started}
+
+    def running(self):
+        return self.future is not None and not self.future.done()
+
+    def done(self):
+        return self.future is not None and self.future.done()
+
+    def error(self):
+        if not self.done():
+            return None
+        return self.future.exception()
+
+    def result(self):
+        return self.future.result()
+
+
+def _run(job, fn, args, kwargs):
+    stdout = _routed_stdout()
+    stdout.route(job._on_output)
+    try:
+        return fn(job, *args, **kwargs)
+    finally:
+        stdout.unroute()
+        job.finished = time.time()
+
+
+def submit(executor, job, fn, *args, **kwargs):
+    job.future = executor.submit(_run, job, fn, args, kwargs)
+    return job
+
+
+# ── Fungsi job ────────────────────────────────────────────────────────────────
+
+def k_metrics_job(job, X, k_min=2, k_max=8, random_state=42, budget=STAGE_BUDGETS["compute_k_metrics"], cache=None):
+    # cache: result_cache.ResultCache bersama; hanya hasil lengkap (tanpa fallback) yang disimpan
+    key = cache.make_key("compute_k_metrics", X, k_min, k_max, random_state) if cache is not None else None
+    hit, metrics = cache.get(key) if key else (False, None)
+    timed_out = []
+
+    def progress(done, total, message):
+        job.report(done, total, message)
+        try:
+            job.check()
+        except StageTimeout as e:
+            # minimal 3 nilai K supaya saran Elbow/Silhouette tetap bermakna
+            if done < 3 and done < total:
+                return True
+            timed_out.append(str(e))
+            return False
+        return True
+
+    with job.stage("compute_k_metrics", rows=len(X), total=k_max - k_min + 1, budget=budget) as rec:
+        if hit:
+            ks, inertias, silhouettes = metrics
+        else:
+            t0 = time.perf_counter()
+            ks, inertias, silhouettes = pipeline.compute_k_metrics(X, k_min=k_min, k_max=k_max,
+                                                                   random_state=random_state, progress=progress)
+            if key and not timed_out:
+                cache.put(key, (ks, inertias, silhouettes), cost=time.perf_counter() - t0, label="compute_k_metrics")
+        rec["detail"] = f"K={ks[0]}..{ks[-1]}" + (" (cache)" if hit else "")
+    if timed_out and ks[-1] < k_max:
+        job.fallbacks.append(f"{timed_out[0]}: metrik hanya untuk K={ks[0]}..{ks[-1]} (bukan sampai {k_max})")
+    suggested_k, method = pipeline.suggest_k(ks, inertias, silhouettes)
+    return {"ks": ks, "inertias": inertias, "silhouettes": silhouettes,
+            "suggested_k": suggested_k, "suggested_method": method}
+
+
+def clustering_stages(dr_method, engine="kmeans"):
+    first = {"dbscan": ["neighbor_graph", "dbscan"], "kprototypes": ["kprototypes"]}.get(engine, ["kmeans"])
+    return first + ["silhouette_samples", f"dr_{dr_method}", "cluster_profile"]
+
+
+def _density_labels(job, density, cache):
+    # density: {"lat", "lon", "eps_km", "min_samples"}; graf dibangun pada radius bucket >= eps
+    n_rows = len(density["lat"])
+    radius = geo.graph_radius(density["eps_km"])
+    with job.stage("neighbor_graph", rows=n_rows) as rec:
+        key = cache.make_key("neighbor_graph", density["lat"], density["lon"], radius) if cache is not None else None
+        hit, graph = cache.get(key) if key else (False, None)
+        if not hit:
+            t0 = time.perf_counter()
+            build_index = cache.memoize(geo.build_index) if cache is not None else geo.build_index
+            graph = geo.neighbor_graph(build_index(density["lat"], density["lon"]), radius)
+            if key:
+                cache.put(key, graph, cost=time.perf_counter() - t0, label="neighbor_graph")
+        stored = "disimpan" if graph["indices"] is not None else "terlalu besar, query BallTree langsung"
+        rec["detail"] = f"radius {radius:g} km, {graph['edges']} pasangan ({stored}){', dari cache' if hit else ''}"
+    with job.stage("dbscan", rows=n_rows) as rec:
+        labels = geo.dbscan_labels(graph, density["eps_km"], density["min_samples"])
+        rec["detail"] = (f"eps={density['eps_km']:g} km, min_samples={density['min_samples']}: "
+                         f"{len(set(labels.tolist()) - {-1})} klaster, {int((labels < 0).sum())} noise")
+    return labels
+
+
+def _silhouette_values(job, X, labels, budget, random_state):
+    # Exact per blok; bila budget habis diganti sampel SILHOUETTE_SAMPLE_SIZE baris (baris lain NaN).
+    # Noise DBSCAN (-1) tidak dinilai (NaN); None bila kurang dari 2 klaster
+    scored = labels >= 0
+    if len(set(labels[scored].tolist())) < 2:
+        return None
+    n_scored = int(scored.sum())
+    X_scored, l_scored = (X, labels) if scored.all() else (X[scored], labels[scored])
+    try:
+        with job.stage("silhouette_samples", rows=n_scored, budget=budget):
+            values = pipeline.silhouette_samples_blocked(X_scored, l_scored, progress=job.progress)
+    except StageTimeout as e:
+        with job.stage("silhouette_sampled", rows=min(SILHOUETTE_SAMPLE_SIZE, n_scored)):
+            values = pipeline.silhouette_sampled(X_scored, l_scored, SILHOUETTE_SAMPLE_SIZE, random_state, progress=job.progress)
+        job.fallbacks.append(f"{e}: silhouette dihitung pada sampel {min(SILHOUETTE_SAMPLE_SIZE, n_scored)} baris")
+    if scored.all():
+        return values
+    sil_values = np.full(len(X), np.nan)
+    sil_values[scored] = values
+    return sil_values
+
+
+def _clustering_core(job, X, k, dr_method, tsne_perplexity, random_state, budgets, density=None, cache=None,
+                     dfp=None, prototypes=None):
+    n_rows = len(X)
+    if density is not None:
+        labels = _density_labels(job, density, cache)
+    elif prototypes is not None:
+        # jarak dihitung pada kode kategori + numerik scaled, bukan pada kolom one-hot X_scaled
+        with job.stage("kprototypes", rows=n_rows) as rec:
+            mixed = kprototypes.encode_mixed(dfp, prototypes["features"])
+            fit = kprototypes.fit_kprototypes(mixed["numeric"], mixed["categorical"], k, gamma=prototypes.get("gamma"),
+                                              random_state=random_state, progress=job.progress)
+            labels = fit["labels"]
+            rec["detail"] = (f"k={k}, {mixed['numeric'].shape[1]} numerik + {mixed['categorical'].shape[1]} kategorikal "
+                             f"(X_scaled: {X.shape[1]} kolom), gamma={fit['gamma']:.2f}")
+    else:
+        with job.stage("kmeans", rows=n_rows) as rec:
+            if restarts.workers():
+                # restart paralel: titik cek pembatalan per seed selesai (progress), bukan per iterasi
+                model, info = restarts.fit(X, k, random_state=random_state, max_workers=restarts.workers(),
+                                           progress=job.progress)
+                labels = model.labels_
+                rec["detail"] = (f"k={k}, {info['abandoned']}/{info['seeds']} seed dihentikan dini "
+                                 f"({restarts.workers()} proses)")
+            else:
+                labels = pipeline.fit_kmeans(X, k, random_state=random_state, verbose=1)
+                rec["detail"] = f"k={k}"
+
+    # silhouette per baris sekaligus memberi skor global (rata-ratanya), jadi tidak dihitung dua kali
+    sil_values = _silhouette_values(job, X, labels, budgets.get("silhouette_samples"), random_state)
+
+    # embedding tidak bergantung pada label: dipakai ulang saat hanya engine / eps / K yang berubah
+    dr_key = cache.make_key("embedding", X, dr_method, tsne_perplexity, random_state) if cache is not None else None
+    hit, embedding = cache.get(dr_key) if dr_key else (False, None)
+    if hit:
+        with job.stage("embedding_cache", rows=n_rows) as rec:
+            rec["detail"] = f"{embedding['dr_method']} dari cache bersama"
+        return {"labels": labels, "silhouette_values": sil_values, **embedding}
+
+    n_fallbacks = len(job.fallbacks)
+    t0 = time.perf_counter()
+    dr_used = dr_method
+    try:
+        with job.stage(f"dr_{dr_method}", rows=n_rows, total=TSNE_MAX_ITER if dr_method == "t-SNE" else None,
+                       budget=budgets.get(f"dr_{dr_method}")):
+            # UMAP tidak punya titik cek di tengah jalan: budget hanya berlaku untuk t-SNE
+            coords = pipeline.reduce_dimensions(X, dr_method, tsne_perplexity or 30, random_state=random_state,
+                                                verbose=2 if dr_method == "t-SNE" else 0)
+    except StageTimeout as e:
+        dr_used = "PCA"
+        with job.stage("dr_PCA", rows=n_rows):
+            coords = pipeline.reduce_dimensions(X, "PCA", random_state=random_state)
+        job.fallbacks.append(f"{e}: memakai PCA sebagai pengganti {dr_method}")
+    embedding = {"coords": coords, "dr_method": dr_used}
+    if dr_key and len(job.fallbacks) == n_fallbacks:
+        cache.put(dr_key, embedding, cost=time.perf_counter() - t0, label="embedding")
+    return {"labels": labels, "silhouette_values": sil_values, **embedding}
+
+
+def clustering_job(job, dfp, X, k, dr_method="PCA", tsne_perplexity=30, feature_cols=None, random_state=42,
+                   budgets=None, cache=None, density=None, prototypes=None):
+    budgets = {**STAGE_BUDGETS, **(budgets or {})}
+    n_rows = len(X)
+    # label, silhouette dan embedding hanya bergantung pada X dan parameter: dipakai ulang lintas sesi
+    engine = "kmeans"
+    if density is not None:
+        engine = ("dbscan", density["lat"], density["lon"], float(density["eps_km"]), int(density["min_samples"]))
+    elif prototypes is not None:
+        engine = ("kprototypes", list(prototypes["features"]), prototypes.get("gamma"))
+    key = cache.make_key("clustering", X, int(k), dr_method, tsne_perplexity, random_state, engine) if cache is not None else None
+    hit, core = cache.get(key) if key else (False, None)
+    if hit:
+        with job.stage("clustering_cache", rows=n_rows) as rec:
+            rec["detail"] = f"{'DBSCAN' if density is not None else f'k={k}'}, {dr_method} dari cache bersama"
+    else:
+        t0 = time.perf_counter()
+        core = _clustering_core(job, X, k, dr_method, tsne_perplexity, random_state, budgets, density=density, cache=cache,
+                                dfp=dfp, prototypes=prototypes)
+        if key and not job.fallbacks:
+            cache.put(key, core, cost=time.perf_counter() - t0, label="clustering")
+    labels, sil_values, coords = core["labels"], core["silhouette_values"], core["coords"]
+    sil = None
+    if sil_values is not None and not np.all(np.isnan(sil_values)):
+        sil = float(np.nanmean(sil_values))
+
+    # dfp hanya dibaca (profil memakai labels langsung); kolom cluster/_x/_y dipasang dashboard
+    # secara lazy dari labels + coords, tanpa salinan DataFrame di hasil job
+    with job.stage("cluster_profile", rows=n_rows):
+        numeric_feats = pipeline.profile_numeric_features(dfp, feature_cols or [])
+        profile = pipeline.compute_cluster_profile(dfp, labels, numeric_feats)
+    # parameter run (untuk riwayat run_store); dr_method = metode yang benar-benar dipakai (setelah fallback)
+    params = {"k": int(k), "engine": engine if isinstance(engine, str) else engine[0], "dr_method": core["dr_method"],
+              "tsne_perplexity": tsne_perplexity, "random_state": random_state}
+    if density is not None:
+        params.update(eps_km=float(density["eps_km"]), min_samples=int(density["min_samples"]))
+    return {"labels": labels, "coords": coords, "silhouette": sil, "silhouette_values": sil_values,
+            "profile": profile, "dr_method": core["dr_method"], "params": params}
+
+
+def silhouette_job(job, X, labels, budget=STAGE_BUDGETS["silhouette_samples"], random_state=42, cache=None):
+    # Silhouette per baris untuk label yang tidak berasal dari clustering_job (hasil append / run tanpa
+    # silhouette.npy); dijalankan sekali per X_scaled, bukan di setiap rerun halaman Visualisasi
+    key = cache.make_key("silhouette", X, labels, random_state) if cache is not None else None
+    hit, values = cache.get(key) if key else (False, None)
+    if hit:
+        with job.stage("silhouette_cache", rows=len(X)) as rec:
+            rec["detail"] = "silhouette per baris dari cache bersama"
+    else:
+        t0 = time.perf_counter()
+        values = _silhouette_values(job, X, labels, budget, random_state)
+        if key and not job.fallbacks:
+            cache.put(key, values, cost=time.perf_counter() - t0, label="silhouette")
+    return {"labels": labels, "silhouette_values": values}
+
+
+def temporal_job(job, X, windows, k, reference=None, random_state=42, max_workers=None, cache=None):
+    key = cache.make_key("temporal", X, windows, int(k), reference, random_state) if cache is not None else None
+    hit, result = cache.get(key) if key else (False, None)
+    with job.stage("temporal_windows", rows=len(X)) as rec:
+        if not hit:
+            t0 = time.perf_counter()
+            result = temporal.temporal_clustering(X, windows, k, reference=reference, max_workers=max_workers,
+                                                  random_state=random_state, progress=job.progress)
+            if key:
+                cache.put(key, result, cost=time.perf_counter() - t0, label="temporal")
+        rec["detail"] = f"{len(result['windows'])} jendela, K={k}" + (" (cache)" if hit else "")
+    return result
+
+
+def partitions_job(job, dfp, column, features, k_max=8, min_rows=partitions.MIN_PARTITION_ROWS, max_workers=None,
+                   random_state=42, cache=None):
+    # cache per partisi ada di partition_clustering (partisi yang tidak berubah tidak dihitung ulang)
+    with job.stage("partitions", rows=len(dfp)) as rec:
+        result = partitions.partition_clustering(dfp, column, features, k_max=k_max, min_rows=min_rows,
+                                                 max_workers=max_workers, random_state=random_state, cache=cache,
+                                                 progress=job.progress)
+        rec["detail"] = f"{len(result['summary'])} partisi per {column}, {int(result['summary']['cached'].sum())} dari cache"
+    return result
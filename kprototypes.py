@@ -0,0 +1,136 @@
+# ╔═══════════════════════════════════════════════════════════════════════════╗
+# ║                                                                           ║
+# ║             ENGINE K-PROTOTYPES (FITUR CAMPURAN TANPA ONE-HOT)            ║
+# ║                                                                           ║
+# ║  Alternatif KMeans pada X_scaled: kategorikal tetap satu kolom kode       ║
+# ║  integer (bukan puluhan/ratusan kolom dummy), numerik di-scale:           ║
+# ║  - encode_mixed(): Matriks numerik (scaled) + matriks kode kategori       ║
+# ║  - fit_kprototypes(): Lloyd batch dengan jarak campuran                   ║
+# ║      d = ||x_num - c_num||^2 + gamma * jumlah kategori yang berbeda       ║
+# ║    centroid numerik = rata-rata, prototipe kategorikal = modus            ║
+# ║  - fit_predict(): encode_mixed + fit_kprototypes -> label                 ║
+# ║                                                                           ║
+# ║  Biaya per iterasi O(n * K * jumlah fitur asli), tidak bergantung pada    ║
+# ║  jumlah nilai unik kategori. gamma default (Huang): 0.5 x rata-rata std   ║
+# ║  numerik = 0.5 setelah scaling.                                           ║
+# ║                                                                           ║
+# ╚═══════════════════════════════════════════════════════════════════════════╝
+import numpy as np
+import pandas as pd
+from sklearn.preprocessing import StandardScaler
+
+N_INIT = 4
+MAX_ITER = 100
+
+
+def encode_mixed(dfp, features):
+    # Aturan numerik vs kategorikal sama dengan pipeline.encode_raw
+    numeric, categorical = [], []
+    numeric_cols, categorical_cols, categories = [], [], {}
+    for f in features:
+        if f not in dfp.columns:
+            continue
+        if dfp[f].dtype.kind in "biufc":
+            numeric.append(dfp[f].astype(float).fillna(0).to_numpy())
+            numeric_cols.append(f)
+        else:
+            codes, uniques = pd.factorize(dfp[f].astype(str), sort=True, use_na_sentinel=False)
+            categorical.append(codes.astype(np.int32))
+            categorical_cols.append(f)
+            categories[f] = np.asarray(uniques, dtype=object)
+    n = len(dfp)
+    return {
+        "numeric": StandardScaler().fit_transform(np.column_stack(numeric)) if numeric else np.zeros((n, 0)),
+        "categorical": np.column_stack(categorical) if categorical else np.zeros((n, 0), dtype=np.int32),
+        "numeric_cols": numeric_cols,
+        "categorical_cols": categorical_cols,
+        "categories": categories,
+    }
+
+
+def default_gamma(numeric):
+    return 0.5 * float(numeric.std(axis=0).mean()) if numeric.shape[1] else 1.0
+
+
+def _distances(numeric, categorical, centers, modes, gamma):
+    d = (numeric ** 2).sum(axis=1)[:, None] - 2 * numeric @ centers.T + (centers ** 2).sum(axis=1)[None, :]
+    np.maximum(d, 0, out=d)
+    for j in range(categorical.shape[1]):
+        d += gamma * (categorical[:, j, None] != modes[None, :, j])
+    return d
+
+
+def _modes(categorical, labels, k):
+    modes = np.zeros((k, categorical.shape[1]), dtype=categorical.dtype)
+    for j in range(categorical.shape[1]):
+        n_cat = int(categorical[:, j].max()) + 1
+        table = np.bincount(labels * n_cat + categorical[:, j], minlength=k * n_cat).reshape(k, n_cat)
+        modes[:, j] = table.argmax(axis=1)
+    return modes
+
+
+def _init_centers(numeric, categorical, k, gamma, rng):
+    # k-means++ dengan jarak campuran
+    n = len(numeric)
+    chosen = [int(rng.integers(n))]
+    closest = _distances(numeric, categorical, numeric[chosen], categorical[chosen], gamma)[:, 0]
+    for _ in range(1, k):
+        total = closest.sum()
+        i = int(rng.choice(n, p=closest / total)) if total > 0 else int(rng.integers(n))
+        chosen.append(i)
+        closest = np.minimum(closest, _distances(numeric, categorical, numeric[[i]], categorical[[i]], gamma)[:, 0])
+    return numeric[chosen].copy(), categorical[chosen].copy()
+
+
+def _fit_once(numeric, categorical, k, gamma, rng, max_iter, progress=None):
+    centers, modes = _init_centers(numeric, categorical, k, gamma, rng)
+    labels = None
+    for it in range(1, max_iter + 1):
+        d = _distances(numeric, categorical, centers, modes, gamma)
+        new_labels = d.argmin(axis=1)
+        counts = np.bincount(new_labels, minlength=k)
+        # klaster kosong: diisi titik yang paling jauh dari prototipenya
+        for c in np.flatnonzero(counts == 0):
+            far = int(d[np.arange(len(d)), new_labels].argmax())
+            new_labels[far] = c
+            d[far] = 0
+            counts = np.bincount(new_labels, minlength=k)
+        if progress is not None:
+            progress(it, max_iter, f"iterasi {it}")
+        if labels is not None and np.array_equal(new_labels, labels):
+            break
+        labels = new_labels
+        sums = np.zeros((k, numeric.shape[1]))
+        np.add.at(sums, labels, numeric)
+        centers = sums / np.maximum(counts, 1)[:, None]
+        modes = _modes(categorical, labels, k)
+    d = _distances(numeric, categorical, centers, modes, gamma)
+    cost = float(d[np.arange(len(d)), labels].sum())
+    return {"labels": labels, "centers": centers, "modes": modes, "cost": cost, "n_iter": it}
+
+
+def fit_kprototypes(numeric, categorical, k, gamma=None, n_init=N_INIT, max_iter=MAX_ITER, random_state=42,
+                    progress=None):
+    # Hasil terbaik (cost terkecil) dari n_init inisialisasi; progress(done, total, message) per iterasi
+    numeric = np.asarray(numeric, dtype=float)
+    categorical = np.asarray(categorical)
+    gamma = default_gamma(numeric) if gamma is None else float(gamma)
+    rng = np.random.default_rng(random_state)
+    best = None
+    for run in range(n_init):
+        report = None
+        if progress is not None:
+            report = lambda it, total, message, run=run: progress(run, n_init, f"init {run + 1}/{n_init}, {message}")
+        result = _fit_once(numeric, categorical, int(k), gamma, rng, max_iter, report)
+        if best is None or result["cost"] < best["cost"]:
+            best = result
+    best["gamma"] = gamma
+    return best
+
+
+def fit_predict(dfp, features, k, gamma=None, random_state=42, progress=None):
+    mixed = encode_mixed(dfp, features)
+    if mixed["numeric"].shape[1] + mixed["categorical"].shape[1] == 0:
+        raise ValueError("Tidak ada fitur yang dapat diproses. Periksa pilihan fitur.")
+    return fit_kprototypes(mixed["numeric"], mixed["categorical"], k, gamma=gamma, random_state=random_state,
+                           progress=progress)["labels"]
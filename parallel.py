@@ -0,0 +1,86 @@
+# ╔═══════════════════════════════════════════════════════════════════════════╗
+# ║                                                                           ║
+# ║                  PROSES WORKER UNTUK TUGAS INDEPENDEN                     ║
+# ║                                                                           ║
+# ║  Dipakai mode yang meng-cluster banyak potongan data sekaligus            ║
+# ║  (temporal.py per jendela waktu, partitions.py per state/kota):           ║
+# ║  - process_map(): Jalankan fn untuk tiap tugas di process pool, progress  ║
+# ║    per tugas yang selesai; worker di-terminate saat batal / timeout       ║
+# ║  - process_pool(): Pool yang dipakai ulang lintas process_map()           ║
+# ║    (restarts.py: dua fase seed dan semua K metrik Elbow)                  ║
+# ║  - single_threaded(): BLAS/OpenMP 1 thread di dalam worker                ║
+# ║                                                                           ║
+# ║  Start method "spawn": aman dipanggil dari thread job dashboard (fork     ║
+# ║  dari proses ber-thread bisa deadlock). fn harus fungsi top-level modul   ║
+# ║  supaya bisa di-pickle.                                                   ║
+# ║                                                                           ║
+# ╚═══════════════════════════════════════════════════════════════════════════╝
+import multiprocessing
+import os
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from contextlib import contextmanager
+
+
+def default_workers():
+    return os.cpu_count() or 1
+
+
+@contextmanager
+def single_threaded():
+    # N worker x semua core per worker = oversubscription; tiap worker cukup satu thread
+    from threadpoolctl import threadpool_limits
+    with threadpool_limits(limits=1):
+        yield
+
+
+@contextmanager
+def process_pool(max_workers=None):
+    # Pool yang dipakai ulang oleh beberapa process_map() (tanpa start proses lagi); worker di-terminate
+    # bila blok keluar karena exception (batal / timeout)
+    executor = ProcessPoolExecutor(max_workers=max(1, max_workers or default_workers()),
+                                   mp_context=multiprocessing.get_context("spawn"))
+    try:
+        yield executor
+    except BaseException:
+        _terminate(executor)
+        raise
+    executor.shutdown(wait=True)
+
+
+def process_map(fn, tasks, max_workers=None, progress=None, label="tugas", pool=None):
+    # tasks: {kunci: tuple argumen}; hasil {kunci: fn(*argumen)}. Tugas besar didahulukan oleh pemanggil
+    # (urutan dict = urutan submit). progress(done, total, message) boleh melempar exception untuk
+    # membatalkan: tugas yang belum mulai dibatalkan dan worker yang sedang jalan di-terminate, jadi
+    # pembatalan / timeout job tidak meninggalkan proses yang masih menghitung di latar.
+    # pool: dari process_pool() milik pemanggil; tanpa pool, pool sendiri dibuat dan ditutup di sini
+    results = {}
+    if not tasks:
+        return results
+    if pool is None:
+        with process_pool(min(max_workers or default_workers(), len(tasks))) as pool:
+            return process_map(fn, tasks, progress=progress, label=label, pool=pool)
+    pending = {pool.submit(fn, *args): key for key, args in tasks.items()}
+    try:
+        while pending:
+            done, _ = wait(pending, timeout=1.0, return_when=FIRST_COMPLETED)
+            for future in done:
+                results[pending.pop(future)] = future.result()
+            if progress is not None:
+                progress(len(results), len(tasks), f"{len(results)}/{len(tasks)} {label}")
+    except BaseException:
+        for future in pending:
+            future.cancel()
+        raise
+    return results
+
+
+def _terminate(executor):
+    # ProcessPoolExecutor tidak punya terminate(): shutdown() saja membiarkan tugas yang sedang jalan
+    # selesai. Proses worker dihentikan langsung, lalu pool dibereskan tanpa menunggu tugasnya.
+    processes = list((executor._processes or {}).values())
+    executor.shutdown(wait=False, cancel_futures=True)
+    for proc in processes:
+        if proc.is_alive():
+            proc.terminate()
+    for proc in processes:
+        proc.join(timeout=5)
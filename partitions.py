@@ -0,0 +1,96 @@
+# ╔═══════════════════════════════════════════════════════════════════════════╗
+# ║                                                                           ║
+# ║             CLUSTERING PER WILAYAH (STATE / KOTA) SECARA PARALEL          ║
+# ║                                                                           ║
+# ║  Tiap state atau kota di-cluster sendiri, dengan encoding + scaling       ║
+# ║  sendiri dan K otomatis sendiri (compute_k_metrics + suggest_k), di       ║
+# ║  proses worker terpisah (parallel.process_map):                           ║
+# ║  - partition_clustering(): Semua partisi -> label per baris + ringkasan   ║
+# ║    yang diurutkan menurut kualitas klaster (silhouette)                   ║
+# ║                                                                           ║
+# ║  Hasil tiap partisi disimpan di cache bersama (result_cache.py) dengan    ║
+# ║  kunci isi partisi + opsi: menjalankan ulang dengan kolom partisi lain    ║
+# ║  atau data yang hanya berubah di sebagian state hanya menghitung          ║
+# ║  partisi yang berubah.                                                    ║
+# ║                                                                           ║
+# ╚═══════════════════════════════════════════════════════════════════════════╝
+import time
+
+import numpy as np
+import pandas as pd
+
+import parallel
+import pipeline
+
+PARTITION_COLUMNS = {"state": "State", "city": "Kota"}
+# partisi dengan baris lebih sedikit dari ini dilewati (K otomatis tidak bermakna)
+MIN_PARTITION_ROWS = 100
+SILHOUETTE_SAMPLE_SIZE = 2000
+SUMMARY_COLUMNS = ["rank", "partition", "rows", "k", "k_method", "silhouette", "largest_share", "seconds", "cached"]
+
+
+def _cluster_partition(dfp, features, k_max, random_state):
+    # Dijalankan di proses worker; harus fungsi top-level supaya bisa di-pickle
+    t0 = time.perf_counter()
+    with parallel.single_threaded():
+        X, _ = pipeline.encode_features(dfp, features)
+        if X is None:
+            return None
+        ks, inertias, silhouettes = pipeline.compute_k_metrics(X, k_min=2, k_max=min(k_max, len(X) - 1),
+                                                               random_state=random_state)
+        k, method = pipeline.suggest_k(ks, inertias, silhouettes)
+        labels = pipeline.fit_kmeans(X, k, random_state=random_state)
+        values = pipeline.silhouette_sampled(X, labels, SILHOUETTE_SAMPLE_SIZE, random_state)
+    sil = float(np.nanmean(values)) if not np.all(np.isnan(values)) else None
+    return {"labels": labels, "k": int(k), "k_method": method, "silhouette": sil,
+            "seconds": time.perf_counter() - t0}
+
+
+def partition_clustering(dfp, column, features, k_max=8, min_rows=MIN_PARTITION_ROWS, max_workers=None,
+                         random_state=42, cache=None, progress=None):
+    # dfp: data setelah cleaning; kolom partisi tidak ikut jadi fitur (konstan di dalam partisi)
+    t0 = time.perf_counter()
+    features = [f for f in features if f != column and f in dfp.columns]
+    groups = {str(key): rows for key, rows in dfp.groupby(column, sort=True).indices.items()}
+    skipped = [key for key, rows in groups.items() if len(rows) < max(min_rows, 3)]
+    # partisi terbesar disubmit lebih dulu supaya tidak tertinggal di akhir
+    keys = sorted((key for key in groups if key not in skipped), key=lambda key: -len(groups[key]))
+
+    results, tasks, cache_keys = {}, {}, {}
+    for key in keys:
+        part = dfp.iloc[groups[key]][features]
+        if cache is not None:
+            cache_keys[key] = cache.make_key("partition", part, features, k_max, random_state)
+            hit, value = cache.get(cache_keys[key])
+            if hit:
+                results[key] = {**value, "cached": True}
+                continue
+        tasks[key] = (part, features, k_max, random_state)
+
+    def report(done, total, message):
+        if progress is not None:
+            progress(len(results) + done, len(keys), f"{len(results) + done}/{len(keys)} partisi")
+
+    computed = parallel.process_map(_cluster_partition, tasks, max_workers=max_workers, progress=report,
+                                    label="partisi")
+    for key, value in computed.items():
+        if value is None:
+            skipped.append(key)
+            continue
+        if cache is not None:
+            cache.put(cache_keys[key], value, cost=value["seconds"], label="partition")
+        results[key] = {**value, "cached": False}
+
+    labels = np.full(len(dfp), -1)
+    records = []
+    for key, res in results.items():
+        labels[groups[key]] = res["labels"]
+        sizes = np.bincount(res["labels"])
+        records.append({"partition": key, "rows": len(groups[key]), "k": res["k"], "k_method": res["k_method"],
+                        "silhouette": res["silhouette"], "largest_share": sizes.max() / sizes.sum(),
+                        "seconds": res["seconds"], "cached": res["cached"]})
+    summary = pd.DataFrame(records, columns=SUMMARY_COLUMNS[1:])
+    summary = summary.sort_values("silhouette", ascending=False, na_position="last", ignore_index=True)
+    summary.insert(0, "rank", np.arange(1, len(summary) + 1))
+    return {"column": column, "summary": summary, "labels": labels, "skipped": sorted(skipped),
+            "seconds": time.perf_counter() - t0}
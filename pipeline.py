@@ -0,0 +1,663 @@
+# ╔═══════════════════════════════════════════════════════════════════════════╗
+# ║                                                                           ║
+# ║                  PIPELINE CLUSTERING (TANPA STREAMLIT)                    ║
+# ║                                                                           ║
+# ║  Fungsi inti yang dipakai dashboard dan batch runner:                     ║
+# ║  - robust_read_csv(): Membaca CSV dengan berbagai encoding                ║
+# ║  - read_csv_cached(): CSV lokal lewat cache parquet (kunci: ukuran+mtime) ║
+# ║  - preprocess_with_options(): Preprocessing dengan opsi cleaning          ║
+# ║  - DuplicateFilter: Hapus duplikat lintas chunk CSV via hash baris        ║
+# ║  - fit_cleaning(), apply_cleaning(), encode_features(): Tahap-tahapnya;   ║
+# ║    cleaning disimpan sebagai layer (baris + nilai pengisi), bukan salinan ║
+# ║  - encode_raw(): Numerik + kategorikal lewat encoders.py (one-hot, top-N, ║
+# ║    frekuensi, hashing; guard kardinalitas)                                ║
+# ║  - attach_clusters(): Data cleaning + cluster, _x, _y                     ║
+# ║  - compute_k_metrics(), suggest_k(): Elbow & Silhouette, saran K          ║
+# ║  - reduce_dimensions(): PCA / t-SNE / UMAP ke 2D                          ║
+# ║  - silhouette_samples_blocked(): Silhouette per baris, per blok           ║
+# ║  - silhouette_sampled(): Silhouette pada sampel (fallback murah)          ║
+# ║  - compute_cluster_profile(): Profil semua klaster dalam satu pass        ║
+# ║  - run_pipeline(), save_results(), load_results(): Jalankan & simpan run  ║
+# ║                                                                           ║
+# ╚═══════════════════════════════════════════════════════════════════════════╝
+import io
+import json
+import os
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from sklearn.cluster import KMeans
+from sklearn.preprocessing import StandardScaler
+from sklearn.decomposition import PCA
+from sklearn.metrics import silhouette_score, pairwise_distances
+from sklearn.manifold import TSNE
+
+import encoders
+import kprototypes
+import restarts
+
+# optional UMAP
+try:
+    import umap.umap_ as umap
+    UMAP_AVAILABLE = True
+except Exception:
+    UMAP_AVAILABLE = False
+
+# optional parquet (pyarrow) for fast reload of saved results
+try:
+    import pyarrow  # noqa: F401
+    PARQUET_AVAILABLE = True
+except Exception:
+    PARQUET_AVAILABLE = False
+
+# cache kolumnar untuk CSV lokal besar (contoh dataset): dibaca sekali, sesudahnya parquet
+COLUMNAR_CACHE_DIR = os.environ.get("DASHBOARD_COLUMNAR_CACHE", os.path.join(".cache", "columnar"))
+
+DEFAULT_FEATURES = ["victim_age", "victim_race", "victim_sex", "state", "disposition", "lat", "lon"]
+DR_METHODS = ["PCA", "t-SNE", "UMAP"] if UMAP_AVAILABLE else ["PCA", "t-SNE"]
+# kprototypes: kode kategori + numerik (kprototypes.py) alih-alih KMeans pada kolom one-hot
+CLUSTER_ENGINES = ["kmeans", "kprototypes"]
+
+
+def robust_read_csv(path_or_buffer, try_encodings=None):
+    if try_encodings is None:
+        try_encodings = ["utf-8", "utf-8-sig", "cp1252", "latin-1", "iso-8859-1"]
+    if isinstance(path_or_buffer, (str, Path)):
+        for enc in try_encodings:
+            try:
+                return pd.read_csv(path_or_buffer, encoding=enc)
+            except Exception:
+                pass
+        with open(path_or_buffer, "rb") as fh:
+            text = io.TextIOWrapper(fh, encoding="utf-8", errors="replace")
+            return pd.read_csv(text)
+    else:
+        data = path_or_buffer.read()
+        for enc in try_encodings:
+            try:
+                return pd.read_csv(io.BytesIO(data), encoding=enc)
+            except Exception:
+                pass
+        txt = data.decode("utf-8", errors="replace")
+        return pd.read_csv(io.StringIO(txt))
+
+
+def read_csv_cached(path, cache_dir=None):
+    # Kunci cache = nama + ukuran + mtime: CSV yang diganti otomatis dibaca ulang dan versi lama dihapus
+    path = Path(path)
+    if not PARQUET_AVAILABLE:
+        return robust_read_csv(path)
+    stat = path.stat()
+    cache_dir = Path(cache_dir or COLUMNAR_CACHE_DIR)
+    cached = cache_dir / f"{path.stem}.{stat.st_size}.{stat.st_mtime_ns}.parquet"
+    if cached.exists():
+        return pd.read_parquet(cached)
+    df = robust_read_csv(path)
+    try:
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        for old in cache_dir.glob(f"{path.stem}.*.parquet"):
+            old.unlink()
+        tmp = cached.with_suffix(".tmp")
+        df.to_parquet(tmp, index=False)
+        tmp.replace(cached)
+    except Exception:
+        # kolom object campuran (mis. angka + teks) tidak bisa ditulis ke parquet: pakai CSV saja
+        pass
+    return df
+
+class DuplicateFilter:
+    # Hapus duplikat lintas chunk CSV (data yang tidak muat sekaligus di memori): yang disimpan hanya
+    # hash 128-bit (dua hash_key 64-bit) baris yang sudah terlihat, bukan barisnya, sehingga memori
+    # ~16 byte per baris unik dan tabrakan praktis mustahil. Untuk satu DataFrame di memori
+    # df.duplicated() tetap lebih cepat (faktorisasi per kolom, exact).
+    # Hash tersimpan sebagai beberapa run terurut (hash pertama terurut + hash kedua sejajar); run
+    # digabung selama run sebelumnya kurang dari dua kali ukurannya, jadi ada O(log n) run, tiap chunk
+    # dicari dengan searchsorted (kueri terurut) dan total biaya O(n log n), bukan mengurutkan ulang
+    # semua hash per chunk.
+    HASH_KEYS = ("0123456789123456", "dashboard-dedup!")
+
+    def __init__(self, subset=None):
+        self.subset = list(subset) if subset else None
+        self._runs = []
+        self.rows = 0
+        self.dropped = 0
+        self.seconds = 0.0
+
+    def _contains(self, h1, h2):
+        found = np.zeros(len(h1), dtype=bool)
+        for r1, r2 in self._runs:
+            lo = np.searchsorted(r1, h1, side="left")
+            hi = np.searchsorted(r1, h1, side="right")
+            one = hi - lo == 1
+            found[one] |= r2[lo[one]] == h2[one]
+            # hash pertama sama untuk beberapa baris tersimpan (tabrakan 64-bit): sangat jarang
+            for i in np.flatnonzero(hi - lo > 1):
+                found[i] |= bool((r2[lo[i]:hi[i]] == h2[i]).any())
+        return found
+
+    def _add(self, r1, r2):
+        # r1 sudah terurut
+        while self._runs and len(self._runs[-1][0]) < 2 * len(r1):
+            p1, p2 = self._runs.pop()
+            # timsort pada dua run terurut yang disambung = merge linear
+            m1, m2 = np.concatenate([p1, r1]), np.concatenate([p2, r2])
+            order = np.argsort(m1, kind="stable")
+            r1, r2 = m1[order], m2[order]
+        self._runs.append((r1, r2))
+
+    def keep_mask(self, chunk):
+        t0 = time.perf_counter()
+        cols = chunk if self.subset is None else chunk[self.subset]
+        h1, h2 = (pd.util.hash_pandas_object(cols, index=False, hash_key=k).to_numpy() for k in self.HASH_KEYS)
+        # urut (h1, h2) stabil: duplikat dalam chunk bersebelahan, yang pertama = baris paling awal
+        order = np.lexsort((h2, h1))
+        s1, s2 = h1[order], h2[order]
+        keep_sorted = np.ones(len(order), dtype=bool)
+        keep_sorted[1:] = (s1[1:] != s1[:-1]) | (s2[1:] != s2[:-1])
+        if self._runs:
+            keep_sorted &= ~self._contains(s1, s2)
+        if keep_sorted.any():
+            self._add(s1[keep_sorted], s2[keep_sorted])
+        keep = np.zeros(len(chunk), dtype=bool)
+        keep[order[keep_sorted]] = True
+        self.rows += len(chunk)
+        self.dropped += int(len(chunk) - keep.sum())
+        self.seconds += time.perf_counter() - t0
+        return keep
+
+    def filter(self, chunk):
+        return chunk[self.keep_mask(chunk)]
+
+def fit_cleaning(df_in, features, fill_numeric_method="median", fill_categorical_method="Unknown", remove_duplicates=False, remove_missing=False,
+                 duplicate_subset=None):
+    # Spesifikasi cleaning ("layer"), bukan salinan data:
+    #   rows    posisi baris yang dipakai (None = semua baris)
+    #   fills   nilai pengisi NaN per kolom
+    #   as_str  kolom kategorikal yang di-cast ke str setelah diisi
+    #   duplicates  laporan hapus duplikat (jumlah dibuang, detik, kolom kunci) bila diminta
+    # apply_cleaning(df_in, layer) membangun DataFrame hasil cleaning kapan pun dibutuhkan.
+    rows = None
+    df = df_in
+
+    # remove duplicates (opsional hanya pada kolom kunci, mis. ["uid"])
+    dedup = None
+    if remove_duplicates:
+        t0 = time.perf_counter()
+        rows = np.flatnonzero(~df_in.duplicated(subset=list(duplicate_subset) if duplicate_subset else None).to_numpy())
+        dedup = {"dropped": int(len(df_in) - len(rows)), "seconds": round(time.perf_counter() - t0, 4),
+                 "subset": list(duplicate_subset) if duplicate_subset else None}
+        df = df_in.iloc[rows]
+
+    fills = {}
+    as_str = []
+    for col in df.columns:
+        if df[col].dtype.kind in "biufc":  # numeric columns
+            # Fill missing values based on method
+            if df[col].isna().sum() > 0:
+                if fill_numeric_method == "median":
+                    fills[col] = df[col].median()
+                elif fill_numeric_method == "mean":
+                    fills[col] = df[col].mean()
+                elif fill_numeric_method == "0":
+                    fills[col] = 0
+        elif df[col].dtype == 'object' or df[col].dtype.name == 'category':
+            if df[col].isna().sum() > 0:
+                if fill_categorical_method == "Unknown":
+                    fills[col] = "Unknown"
+                elif fill_categorical_method == "mode":
+                    mode_val = df[col].mode()
+                    fills[col] = mode_val[0] if len(mode_val) > 0 else "Unknown"
+                as_str.append(col)
+    layer = {"rows": rows, "fills": fills, "as_str": as_str, "duplicates": dedup}
+
+    # remove rows with missing in selected features (setelah pengisian, seperti sebelumnya)
+    if remove_missing:
+        keep = apply_cleaning(df_in[features], layer).notna().all(axis=1).to_numpy()
+        if not keep.all():
+            layer["rows"] = (rows if rows is not None else np.arange(len(df_in)))[keep]
+    return layer
+
+def apply_cleaning(df_in, layer):
+    dfp = df_in.iloc[layer["rows"]] if layer["rows"] is not None else df_in
+    overlay = {}
+    for col, value in layer["fills"].items():
+        if col in dfp.columns:
+            overlay[col] = dfp[col].fillna(value)
+    for col in layer["as_str"]:
+        if col in dfp.columns:
+            overlay[col] = overlay.get(col, dfp[col]).astype(str)
+    # tanpa overlay: salinan dangkal (copy-on-write pandas), bukan deep copy seluruh df_raw yang lalu
+    # disimpan clean_view di cache bersama
+    return dfp.assign(**overlay) if overlay else dfp.copy(deep=False)
+
+def encode_raw(dfp, features, specs=None):
+    # Fitur numerik apa adanya + kategorikal terkode, sebelum scaling. specs: hasil encoders.fit_specs
+    # dari data fit (batch append memakai specs yang sama); None = fit dari dfp ini (one-hot + guard)
+    if specs is None:
+        specs = encoders.fit_specs(dfp, features)
+    X_parts = []
+    for f in features:
+        if f not in dfp.columns:
+            continue
+        if dfp[f].dtype.kind in "biufc":
+            X_parts.append(dfp[[f]].astype(float))
+        else:
+            X_parts.append(encoders.encode_column(dfp[f], f, specs.get(f)))
+    
+    if not X_parts:
+        return None
+    return pd.concat(X_parts, axis=1).fillna(0)
+
+def encode_features(dfp, features, encoder_methods=None):
+    # encoder_methods: {fitur: "onehot" | "top_n" | "frequency" | "hashing"} (encoders.py)
+    X = encode_raw(dfp, features, encoders.fit_specs(dfp, features, encoder_methods))
+    if X is None:
+        return None, None
+    cols = list(X.columns)
+    scaler = StandardScaler()
+    X_scaled = scaler.fit_transform(X)
+    return X_scaled, cols
+
+def preprocess_with_options(df_in, features, fill_numeric_method="median", fill_categorical_method="Unknown", remove_duplicates=False, remove_missing=False,
+                            duplicate_subset=None, encoder_methods=None):
+    layer = fit_cleaning(df_in, features, fill_numeric_method, fill_categorical_method, remove_duplicates, remove_missing,
+                         duplicate_subset)
+    dfp = apply_cleaning(df_in, layer)
+    X_scaled, cols = encode_features(dfp, features, encoder_methods)
+    if X_scaled is None:
+        return None, None, None
+    return dfp, X_scaled, cols
+
+def attach_clusters(dfp, labels, coords):
+    # Tampilan hasil clustering: data cleaning + kolom cluster, _x, _y
+    coords = np.asarray(coords)
+    return dfp.assign(cluster=np.asarray(labels), _x=coords[:, 0], _y=coords[:, 1])
+
+def compute_k_metrics(X, k_min=2, k_max=8, random_state=42, progress=None):
+    ks = list(range(k_min, k_max+1))
+    inertias = []
+    silhouettes = []
+    # restart paralel (restarts.py): satu pool proses untuk semua K, bukan start proses per K
+    with restarts.pool() as pool:
+        for i, k in enumerate(ks):
+            message = f"K={k}"
+            if pool is not None:
+                km, info = restarts.fit(X, k, random_state=random_state, pool=pool)
+                labels = km.labels_
+                message += f", {info['abandoned']}/{info['seeds']} seed dihentikan dini"
+            else:
+                km = KMeans(n_clusters=k, random_state=random_state, n_init=10)
+                labels = km.fit_predict(X)
+            inertias.append(km.inertia_)
+            if len(set(labels)) > 1 and X.shape[0] > k:
+                try:
+                    s = silhouette_score(X, labels)
+                except Exception:
+                    s = None
+            else:
+                s = None
+            silhouettes.append(s)
+            # progress() mengembalikan False untuk berhenti lebih awal (mis. batas waktu habis): hasil parsial
+            if progress is not None and progress(i + 1, len(ks), message) is False:
+                break
+    return ks[:len(inertias)], inertias, silhouettes
+
+def suggest_k(ks, inertias, silhouettes):
+    valid_sil = [(k, s) for k, s in zip(ks, silhouettes) if s is not None]
+    if valid_sil:
+        best = max(valid_sil, key=lambda x: x[1])[0]
+        return best, "silhouette"
+    diffs = np.diff(inertias)
+    diffs2 = np.diff(diffs)
+    if len(diffs2) > 0:
+        elbow_idx = np.argmin(diffs2) + 2
+        if 2 <= elbow_idx <= len(ks):
+            return ks[elbow_idx-1], "elbow"
+    return ks[0], "default"
+
+PROFILE_CATEGORICALS = ["victim_race", "victim_sex", "state", "disposition"]
+
+def profile_numeric_features(dfp, feature_cols):
+    # Numeric features for the per-cluster means (heatmap); same rules as the old heatmap code
+    skip = {"cluster", "_x", "_y", "silhouette"}
+    if feature_cols:
+        numeric_feats = [c for c in feature_cols if c in dfp.columns and pd.api.types.is_numeric_dtype(dfp[c])]
+    else:
+        numeric_feats = [c for c in dfp.select_dtypes(include="number").columns if c not in skip]
+    if len(numeric_feats) == 0 and "victim_age" in dfp.columns:
+        numeric_feats = ["victim_age"]
+    return numeric_feats
+
+def _group_sums(values, codes, k):
+    # jumlah & banyaknya nilai non-NaN per klaster (bisa digabung antar batch)
+    values = np.asarray(values, dtype=float)
+    valid = ~np.isnan(values)
+    return (np.bincount(codes[valid], weights=values[valid], minlength=k),
+            np.bincount(codes[valid], minlength=k))
+
+def _count_table(values, codes, k):
+    # (kategori terurut, tabel klaster x kategori) dari satu bincount
+    c = pd.Categorical(values)
+    ncat = len(c.categories)
+    valid = c.codes >= 0
+    table = np.bincount(codes[valid] * ncat + c.codes[valid], minlength=k * ncat).reshape(k, ncat)
+    return np.asarray(c.categories), table
+
+def cluster_profile_state(dfp, labels, numeric_feats=None):
+    # Statistik profil yang bisa dijumlahkan antar batch (incremental.py): jumlah baris,
+    # jumlah & count nilai numerik, dan tabel (klaster x nilai) untuk modus, median umur, closed rate
+    labels = np.asarray(labels)
+    clusters, codes = np.unique(labels, return_inverse=True)
+    codes = codes.ravel()
+    k = len(clusters)
+    state = {"clusters": clusters, "counts": np.bincount(codes, minlength=k), "tables": {}, "sums": {}, "feature_sums": {}}
+    if "victim_age" in dfp.columns:
+        age = pd.to_numeric(dfp["victim_age"], errors="coerce").to_numpy(dtype=float)
+        state["sums"]["age"] = _group_sums(age, codes, k)
+        state["tables"]["age"] = _count_table(age, codes, k)
+    for cat in PROFILE_CATEGORICALS:
+        if cat in dfp.columns:
+            state["tables"][cat] = _count_table(dfp[cat], codes, k)
+    for col, name in (("lat", "mean_lat"), ("latitude", "mean_lat"), ("lon", "mean_lon"), ("longitude", "mean_lon")):
+        if col in dfp.columns and name not in state["sums"]:
+            state["sums"][name] = _group_sums(pd.to_numeric(dfp[col], errors="coerce"), codes, k)
+    for col in numeric_feats or []:
+        if col in dfp.columns and pd.api.types.is_numeric_dtype(dfp[col]):
+            state["feature_sums"][col] = _group_sums(dfp[col], codes, k)
+    return state
+
+def _align(clusters, all_clusters, arr):
+    out = np.zeros((len(all_clusters),) + arr.shape[1:], dtype=arr.dtype)
+    out[np.searchsorted(all_clusters, clusters)] = arr
+    return out
+
+def _merge_table(a, b):
+    cats = np.union1d(a[0], b[0]) if len(a[0]) and len(b[0]) else (a[0] if len(a[0]) else b[0])
+    table = np.zeros((a[1].shape[0], len(cats)), dtype=np.int64)
+    table[:, np.searchsorted(cats, a[0])] += a[1]
+    table[:, np.searchsorted(cats, b[0])] += b[1]
+    return cats, table
+
+def merge_profile_states(a, b):
+    # Gabungan dua state (mis. data fit + batch baru); klaster disatukan berdasarkan label
+    clusters = np.union1d(a["clusters"], b["clusters"])
+    fit = lambda s, arr: _align(s["clusters"], clusters, arr)
+    merged = {"clusters": clusters, "counts": fit(a, a["counts"]) + fit(b, b["counts"]),
+              "tables": {}, "sums": {}, "feature_sums": {}}
+    for key in ("sums", "feature_sums"):
+        for name in a[key].keys() | b[key].keys():
+            pairs = [tuple(fit(s, np.asarray(v)) for v in s[key][name]) for s in (a, b) if name in s[key]]
+            merged[key][name] = (sum(p[0] for p in pairs), sum(p[1] for p in pairs))
+    for name in a["tables"].keys() | b["tables"].keys():
+        parts = [(s["tables"][name][0], fit(s, s["tables"][name][1])) for s in (a, b) if name in s["tables"]]
+        merged["tables"][name] = parts[0] if len(parts) == 1 else _merge_table(*parts)
+    # urutan kolom profil mengikuti data fit
+    for key in ("tables", "sums", "feature_sums"):
+        merged[key] = {name: merged[key][name] for name in list(a[key]) + [n for n in b[key] if n not in a[key]]}
+    return merged
+
+def _table_median(values, table):
+    # median per baris tabel (klaster x nilai terurut), sama dengan Series.median()
+    n = table.sum(axis=1)
+    cum = table.cumsum(axis=1)
+    out = np.full(len(n), np.nan)
+    for i in np.flatnonzero(n):
+        lo = values[np.searchsorted(cum[i], (n[i] - 1) // 2, side="right")]
+        hi = values[np.searchsorted(cum[i], n[i] // 2, side="right")]
+        out[i] = (lo + hi) / 2
+    return out
+
+def profile_from_state(state):
+    clusters, counts = state["clusters"], state["counts"]
+    index = pd.Index(clusters, name="cluster")
+    summary = pd.DataFrame({"count": counts}, index=index)
+    summary["pct"] = 100 * counts / max(counts.sum(), 1)
+    mean = lambda pair: np.where(pair[1] > 0, pair[0] / np.maximum(pair[1], 1), np.nan)
+
+    if "age" in state["sums"]:
+        summary["mean_age"] = mean(state["sums"]["age"])
+        summary["median_age"] = _table_median(*state["tables"]["age"])
+
+    for cat in PROFILE_CATEGORICALS:
+        if cat not in state["tables"]:
+            continue
+        # sorted categories + argmax (first max) gives the same tie-break as Series.mode()
+        categories, table = state["tables"][cat]
+        if len(categories) == 0:
+            summary[f"top_{cat}"] = None
+            continue
+        top = categories[table.argmax(axis=1)]
+        summary[f"top_{cat}"] = np.where(table.max(axis=1) > 0, top, None)
+        if cat == "disposition":
+            is_closed = pd.Index(categories).astype(str).str.contains("Closed", case=False)
+            closed = table[:, np.asarray(is_closed, dtype=bool)].sum(axis=1)
+            summary["closed_rate"] = 100 * closed / np.maximum(counts, 1)
+
+    for name in ("mean_lat", "mean_lon"):
+        if name in state["sums"]:
+            summary[name] = mean(state["sums"][name])
+
+    feature_means = pd.DataFrame({col: mean(pair) for col, pair in state["feature_sums"].items()}, index=index)
+    return {"summary": summary, "feature_means": feature_means}
+
+def compute_cluster_profile(dfp, labels, numeric_feats=None):
+    # One pass over integer cluster codes instead of filtering dfp per cluster.
+    # Categorical columns are turned into codes once; top values and the closed rate
+    # come from a (cluster x category) count table built with a single bincount.
+    return profile_from_state(cluster_profile_state(dfp, labels, numeric_feats))
+
+def reduce_dimensions(X, method="PCA", tsne_perplexity=30, random_state=42, verbose=0):
+    # verbose=2: t-SNE mencetak "[t-SNE] Iteration i" tiap 50 iterasi (dipakai untuk progress di jobs.py)
+    if method == "t-SNE":
+        reducer = TSNE(n_components=2, perplexity=tsne_perplexity, random_state=random_state, init="pca", verbose=verbose)
+    elif method == "UMAP" and UMAP_AVAILABLE:
+        reducer = umap.UMAP(n_components=2, random_state=random_state)
+    else:
+        reducer = PCA(n_components=2, random_state=random_state)
+    return reducer.fit_transform(X)
+
+def fit_kmeans(X, k, random_state=42, verbose=0):
+    # verbose=1: KMeans mencetak tiap iterasi Lloyd (titik cek pembatalan di jobs.py); restart paralel
+    # (env DASHBOARD_KMEANS_WORKERS, restarts.py) bila diaktifkan
+    if restarts.workers():
+        return restarts.fit(X, k, random_state=random_state, max_workers=restarts.workers())[0].labels_
+    kmeans = KMeans(n_clusters=int(k), random_state=random_state, n_init=10, verbose=verbose)
+    return kmeans.fit_predict(X)
+
+def score_clustering(X, labels):
+    try:
+        return silhouette_score(X, labels) if len(set(labels)) > 1 else None
+    except Exception:
+        return None
+
+def silhouette_samples_blocked(X, labels, max_block_bytes=64e6, progress=None):
+    # Sama dengan sklearn silhouette_samples, tetapi jarak dihitung per blok baris
+    # (blok x n) sehingga memori terbatas dan progress bisa dilaporkan per blok
+    X = np.asarray(X, dtype=float)
+    n = X.shape[0]
+    _, codes = np.unique(np.asarray(labels), return_inverse=True)
+    k = codes.max() + 1
+    counts = np.bincount(codes, minlength=k).astype(float)
+    onehot = np.zeros((n, k))
+    onehot[np.arange(n), codes] = 1.0
+    block = max(1, int(max_block_bytes // (8 * n)))
+    n_blocks = -(-n // block)
+    sil = np.zeros(n)
+    for i, start in enumerate(range(0, n, block)):
+        stop = min(n, start + block)
+        rows = np.arange(stop - start)
+        own = codes[start:stop]
+        sums = pairwise_distances(X[start:stop], X) @ onehot
+        a = sums[rows, own] / np.maximum(counts[own] - 1, 1)
+        means = sums / counts
+        means[rows, own] = np.inf
+        b = means.min(axis=1)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            s = (b - a) / np.maximum(a, b)
+        s[counts[own] <= 1] = 0
+        sil[start:stop] = np.nan_to_num(s)
+        if progress is not None:
+            progress(i + 1, n_blocks, f"blok {i + 1}/{n_blocks}")
+    return sil
+
+def silhouette_sampled(X, labels, sample_size=2000, random_state=42, progress=None):
+    # Fallback murah untuk silhouette exact: hanya baris sampel (dibandingkan sesama sampel),
+    # baris lain bernilai NaN. Rata-ratanya (nanmean) mendekati skor global.
+    labels = np.asarray(labels)
+    n = len(labels)
+    values = np.full(n, np.nan)
+    idx = np.sort(np.random.default_rng(random_state).choice(n, size=min(sample_size, n), replace=False))
+    if len(set(labels[idx])) > 1:
+        values[idx] = silhouette_samples_blocked(np.asarray(X)[idx], labels[idx], progress=progress)
+    return values
+
+def run_clustering(X, k, random_state=42):
+    labels = fit_kmeans(X, k, random_state=random_state)
+    return labels, score_clustering(X, labels)
+
+def run_pipeline(df, features=None, fill_numeric_method="median", fill_categorical_method="Unknown",
+                 remove_duplicates=False, remove_missing=False, k="auto", k_max=8,
+                 dr_method="PCA", tsne_perplexity=30, random_state=42, log=print, duplicate_subset=None, engine="kmeans",
+                 encoder_methods=None):
+    # Same steps as the dashboard: Preprocessing -> Analisis (K) -> Visualisasi (KMeans + DR)
+    if features is None:
+        features = [c for c in DEFAULT_FEATURES if c in df.columns]
+    t0 = time.perf_counter()
+    layer = fit_cleaning(df, features, fill_numeric_method, fill_categorical_method, remove_duplicates, remove_missing,
+                         duplicate_subset)
+    if layer["duplicates"]:
+        d = layer["duplicates"]
+        log(f"duplikat: {d['dropped']} baris dibuang ({d['seconds']:.2f}s, kunci: {', '.join(d['subset'] or ['semua kolom'])})")
+    dfp = apply_cleaning(df, layer)
+    specs = encoders.fit_specs(dfp, features, encoder_methods)
+    for f, spec in specs.items():
+        if spec["auto"]:
+            log(f"encoder {f}: {spec['cardinality']} nilai unik > {encoders.CARDINALITY_LIMIT}, memakai top-{encoders.TOP_N} + other")
+    X_scaled, feature_cols = encode_features(dfp, features, encoder_methods)
+    if X_scaled is None:
+        raise ValueError("Tidak ada fitur yang dapat diproses. Periksa pilihan fitur.")
+    log(f"preprocess: {len(dfp)} baris, {len(feature_cols)} fitur terkode ({time.perf_counter() - t0:.1f}s)")
+
+    ks, inertias, silhouettes, k_method = None, None, None, "manual"
+    if str(k) == "auto":
+        t0 = time.perf_counter()
+        ks, inertias, silhouettes = compute_k_metrics(X_scaled, k_min=2, k_max=k_max, random_state=random_state)
+        k, k_method = suggest_k(ks, inertias, silhouettes)
+        log(f"k-sweep 2..{k_max}: K={k} (metode: {k_method}) ({time.perf_counter() - t0:.1f}s)")
+    k = int(k)
+
+    t0 = time.perf_counter()
+    if engine == "kprototypes":
+        labels = kprototypes.fit_predict(dfp, features, k, random_state=random_state)
+        sil = score_clustering(X_scaled, labels)
+    else:
+        labels, sil = run_clustering(X_scaled, k, random_state=random_state)
+    log(f"{engine} K={k}: silhouette={sil if sil is None else round(sil, 3)} ({time.perf_counter() - t0:.1f}s)")
+
+    t0 = time.perf_counter()
+    coords = reduce_dimensions(X_scaled, dr_method, tsne_perplexity, random_state)
+    log(f"{dr_method}: selesai ({time.perf_counter() - t0:.1f}s)")
+
+    dfp = attach_clusters(dfp, labels, coords)
+    profile = compute_cluster_profile(dfp, labels, profile_numeric_features(dfp, feature_cols))
+    params = {
+        "features": list(features),
+        "fill_numeric_method": fill_numeric_method,
+        "fill_categorical_method": fill_categorical_method,
+        "remove_duplicates": bool(remove_duplicates),
+        "duplicate_subset": list(duplicate_subset) if duplicate_subset else None,
+        "remove_missing": bool(remove_missing),
+        "encoders": dict(encoder_methods) if encoder_methods else None,
+        "k": "auto" if k_method != "manual" else k,
+        "k_max": k_max,
+        "engine": engine,
+        "dr_method": dr_method,
+        "tsne_perplexity": tsne_perplexity,
+        "random_state": random_state,
+    }
+    return {
+        "df_proc": dfp,
+        "X_scaled": X_scaled,
+        "feature_cols": feature_cols,
+        "labels": labels,
+        "coords": coords,
+        "final_k": k,
+        "k_method": k_method,
+        "ks": ks,
+        "inertias": inertias,
+        "silhouettes": silhouettes,
+        "silhouette": sil,
+        "profile": profile,
+        "params": params,
+    }
+
+def _to_builtin(v):
+    if isinstance(v, (np.integer,)):
+        return int(v)
+    if isinstance(v, (np.floating,)):
+        return float(v)
+    return v
+
+def save_results(result, out_dir):
+    # Layout of a results folder:
+    #   results.parquet|csv      df_proc with cluster, _x, _y
+    #   labels.npy, embedding.npy, X_scaled.npy
+    #   profile_summary.csv, profile_feature_means.csv
+    #   metrics.json             K, silhouette, k-sweep, params, feature_cols
+    # batch_run.py bisa menambah incremental.json (--append-to) dan temporal_drift.csv (--windows)
+    out = Path(out_dir)
+    out.mkdir(parents=True, exist_ok=True)
+    dfp = result["df_proc"]
+    if PARQUET_AVAILABLE:
+        dfp.to_parquet(out / "results.parquet", index=False)
+    else:
+        dfp.to_csv(out / "results.csv", index=False)
+    np.save(out / "labels.npy", np.asarray(result["labels"]))
+    np.save(out / "embedding.npy", np.asarray(result["coords"]))
+    np.save(out / "X_scaled.npy", np.asarray(result["X_scaled"]))
+    result["profile"]["summary"].to_csv(out / "profile_summary.csv")
+    result["profile"]["feature_means"].to_csv(out / "profile_feature_means.csv")
+    metrics = {
+        "final_k": int(result["final_k"]),
+        "k_method": result["k_method"],
+        "silhouette": _to_builtin(result["silhouette"]),
+        "ks": result["ks"],
+        "inertias": [_to_builtin(v) for v in result["inertias"]] if result["inertias"] is not None else None,
+        "silhouettes": [_to_builtin(v) for v in result["silhouettes"]] if result["silhouettes"] is not None else None,
+        "feature_cols": list(result["feature_cols"]),
+        "n_rows": int(len(dfp)),
+        "params": result["params"],
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+    with open(out / "metrics.json", "w", encoding="utf-8") as fh:
+        json.dump(metrics, fh, indent=2)
+    return out
+
+def load_results(out_dir):
+    out = Path(out_dir)
+    with open(out / "metrics.json", encoding="utf-8") as fh:
+        metrics = json.load(fh)
+    if (out / "results.parquet").exists():
+        dfp = pd.read_parquet(out / "results.parquet")
+    else:
+        dfp = pd.read_csv(out / "results.csv")
+    summary = pd.read_csv(out / "profile_summary.csv", index_col="cluster")
+    feature_means = pd.read_csv(out / "profile_feature_means.csv", index_col="cluster")
+    return {
+        "df_proc": dfp,
+        "X_scaled": np.load(out / "X_scaled.npy"),
+        "feature_cols": metrics["feature_cols"],
+        "labels": np.load(out / "labels.npy"),
+        "coords": np.load(out / "embedding.npy"),
+        "final_k": metrics["final_k"],
+        "k_method": metrics["k_method"],
+        "ks": metrics["ks"],
+        "inertias": metrics["inertias"],
+        "silhouettes": metrics["silhouettes"],
+        "silhouette": metrics["silhouette"],
+        "profile": {"summary": summary, "feature_means": feature_means},
+        "params": metrics["params"],
+    }
@@ -0,0 +1,87 @@
+# ╔═══════════════════════════════════════════════════════════════════════════╗
+# ║                                                                           ║
+# ║         RESTART KMEANS PARALEL (OPSIONAL, UNTUK MESIN MULTI-CORE)         ║
+# ║                                                                           ║
+# ║  Pengganti KMeans(n_init=10) bila env DASHBOARD_KMEANS_WORKERS > 0: tiap  ║
+# ║  seed k-means++ jadi KMeans(n_init=1) di proses worker sendiri            ║
+# ║  (parallel.process_map, BLAS 1 thread per worker):                        ║
+# ║  - Probe: semua seed jalan PROBE_ITER iterasi Lloyd secara paralel        ║
+# ║  - Seed dengan inertia probe > ABANDON_MARGIN di atas probe terbaik       ║
+# ║    dihentikan dini; sisanya dilanjutkan dari centroid probe (lintasan     ║
+# ║    Lloyd sama persis dengan tanpa jeda) sampai konvergen                  ║
+# ║  - fit(): Model terbaik + jumlah seed yang dihentikan dini                ║
+# ║  - workers(): Jumlah proses dari env; 0 = mati                            ║
+# ║  - pool(): Pool proses untuk beberapa fit() sekaligus (semua K)           ║
+# ║                                                                           ║
+# ║  Default mati: di mesin 1 core KMeans(n_init=10) biasa sama cepat atau    ║
+# ║  lebih cepat (start proses + baca X per worker). X ditulis sekali ke      ║
+# ║  file .npy sementara dan dibuka worker dengan mmap, bukan di-pickle per   ║
+# ║  seed. Di dalam proses worker (temporal.py / partitions.py) selalu mati,  ║
+# ║  supaya tidak ada pool bersarang.                                         ║
+# ║                                                                           ║
+# ╚═══════════════════════════════════════════════════════════════════════════╝
+import contextlib
+import multiprocessing
+import os
+import tempfile
+
+import numpy as np
+from sklearn.cluster import KMeans
+
+import parallel
+
+WORKERS_ENV = "DASHBOARD_KMEANS_WORKERS"
+N_INIT = 10
+MAX_ITER = 300
+# Kalibrasi (case data 20k x 146 + blobs 3/5/8 pusat, K 2..8, 3 random_state): probe 5 iterasi dengan
+# margin 0.5% tidak pernah membuang seed terbaik dan menghentikan ~40% seed; probe 2-3 iterasi bisa
+# meleset sampai 1.9% inertia
+PROBE_ITER = 5
+ABANDON_MARGIN = 0.005
+
+
+def workers():
+    if multiprocessing.parent_process() is not None:
+        return 0
+    return max(0, int(os.environ.get(WORKERS_ENV, 0)))
+
+
+def pool():
+    # Satu pool untuk beberapa fit() (mis. semua K di compute_k_metrics); None bila restart paralel mati
+    return parallel.process_pool(workers()) if workers() else contextlib.nullcontext()
+
+
+def _probe(path, k, seed):
+    with parallel.single_threaded():
+        return KMeans(n_clusters=k, n_init=1, max_iter=PROBE_ITER, random_state=seed).fit(np.load(path, mmap_mode="r"))
+
+
+def _resume(path, k, centers):
+    with parallel.single_threaded():
+        return KMeans(n_clusters=k, n_init=1, init=centers, max_iter=MAX_ITER - PROBE_ITER).fit(
+            np.load(path, mmap_mode="r"))
+
+
+def fit(X, k, random_state=42, n_init=N_INIT, max_workers=None, progress=None, pool=None):
+    # progress(done, total, message) per seed selesai; boleh melempar exception untuk membatalkan (jobs.py).
+    # pool: dari pool() / parallel.process_pool(); tanpa pool, satu pool dibuat untuk kedua fase
+    if pool is None:
+        with parallel.process_pool(min(max_workers or parallel.default_workers(), n_init)) as pool:
+            return fit(X, k, random_state, n_init, progress=progress, pool=pool)
+    k = int(k)
+    seeds = np.random.RandomState(random_state).randint(np.iinfo(np.int32).max, size=n_init)
+    with tempfile.TemporaryDirectory(prefix="kmeans-") as tmp:
+        path = os.path.join(tmp, "X.npy")
+        np.save(path, np.asarray(X, dtype=float))
+        probes = parallel.process_map(_probe, {i: (path, k, int(s)) for i, s in enumerate(seeds)},
+                                      progress=progress, label="seed (probe)", pool=pool)
+        best = min(km.inertia_ for km in probes.values())
+        kept = {i: km for i, km in probes.items() if km.inertia_ <= best * (1 + ABANDON_MARGIN)}
+        # seed yang sudah konvergen di dalam probe tidak perlu dilanjutkan
+        resume = {i: (path, k, km.cluster_centers_) for i, km in kept.items() if km.n_iter_ >= PROBE_ITER}
+        kept.update(parallel.process_map(_resume, resume, progress=progress, label="seed (lanjut)", pool=pool))
+    model = min(kept.values(), key=lambda km: km.inertia_)
+    info = {"seeds": n_init, "abandoned": n_init - len(kept)}
+    if progress is not None:
+        progress(n_init, n_init, f"{info['abandoned']}/{n_init} seed dihentikan dini")
+    return model, info
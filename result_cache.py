@@ -0,0 +1,256 @@
+# ╔═══════════════════════════════════════════════════════════════════════════╗
+# ║                                                                           ║
+# ║              CACHE HASIL BERSAMA (LINTAS SESI, DIBATASI BYTE)             ║
+# ║                                                                           ║
+# ║  Pengganti st.cache_data untuk hasil besar (DataFrame + X_scaled,         ║
+# ║  metrik K, label/embedding): satu cache per proses server, dipakai semua  ║
+# ║  sesi, dengan batas total byte dan eviction cost-aware (GreedyDual-Size:  ║
+# ║  item yang murah dihitung ulang per byte dibuang lebih dulu, item yang    ║
+# ║  lama tidak diakses makin mudah dibuang).                                 ║
+# ║                                                                           ║
+# ║  - make_cache(): Cache dengan budget dari env DASHBOARD_CACHE_MB          ║
+# ║  - ResultCache.memoize(): Bungkus fungsi pipeline                         ║
+# ║  - ResultCache.get()/put()/make_key(): Pemakaian manual (jobs.py)         ║
+# ║  - ResultCache.stats(): Entri, byte, hit rate, item terbesar              ║
+# ║                                                                           ║
+# ║  Nilai dari cache dipakai bersama antar sesi: array dibuat read-only,     ║
+# ║  DataFrame/Series dari memoize() dikembalikan sebagai salinan dangkal     ║
+# ║  (copy-on-write), jadi perubahan in-place satu sesi tidak sampai ke sesi  ║
+# ║  lain. Salinan mewarisi digest aslinya: ubah nilai lewat .assign() (objek ║
+# ║  baru), bukan .loc in-place, sebelum dipakai lagi sebagai input memoize.  ║
+# ║                                                                           ║
+# ╚═══════════════════════════════════════════════════════════════════════════╝
+import functools
+import hashlib
+import inspect
+import os
+import sys
+import threading
+import time
+import weakref
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_MAX_MB = 1024
+
+
+def _nbytes(value):
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=True, deep=True).sum())
+    if isinstance(value, pd.Series):
+        return int(value.memory_usage(index=True, deep=True))
+    if isinstance(value, np.ndarray):
+        return int(value.nbytes)
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(_nbytes(v) for v in value)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(_nbytes(v) for v in value.values())
+    if hasattr(value, "nbytes"):
+        # objek lain (mis. geo.GeoIndex) boleh melaporkan ukurannya sendiri
+        return int(value.nbytes)
+    return sys.getsizeof(value)
+
+
+def _shape_sig(value):
+    # pemeriksaan murah untuk digest per id(): kolom ditambah / dibuang in-place -> hash ulang
+    if isinstance(value, pd.DataFrame):
+        return tuple(value.columns), value.shape
+    return getattr(value, "shape", None)
+
+
+def _freeze(value):
+    # array hasil cache dipakai bersama antar sesi: cegah perubahan in-place
+    if isinstance(value, np.ndarray):
+        value.setflags(write=False)
+    elif isinstance(value, (list, tuple)):
+        for v in value:
+            _freeze(v)
+    elif isinstance(value, dict):
+        for v in value.values():
+            _freeze(v)
+    return value
+
+
+class _Entry:
+    __slots__ = ("value", "nbytes", "cost", "label", "priority", "hits", "created", "last_access")
+
+    def __init__(self, value, nbytes, cost, label, priority):
+        self.value = value
+        self.nbytes = nbytes
+        self.cost = cost
+        self.label = label
+        self.priority = priority
+        self.hits = 0
+        self.created = self.last_access = time.time()
+
+
+class ResultCache:
+    def __init__(self, max_bytes):
+        self.max_bytes = int(max_bytes)
+        self._entries = {}
+        self._lock = threading.Lock()
+        self._bytes = 0
+        # "jam" GreedyDual: naik ke prioritas item terakhir yang dibuang (aging untuk item lama)
+        self._clock = 0.0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._rejected = 0
+        # digest per objek (DataFrame/ndarray session) supaya objek yang sama tidak di-hash ulang tiap rerun
+        self._digests = {}
+
+    # ── kunci ────────────────────────────────────────────────────────────────
+    def _digest(self, value):
+        key = id(value)
+        known = self._digests.get(key)
+        if known is not None and known[0]() is value and known[2] == _shape_sig(value):
+            return known[1]
+        h = hashlib.blake2b(digest_size=16)
+        if isinstance(value, pd.DataFrame):
+            h.update(repr((list(value.columns), [str(t) for t in value.dtypes], value.shape)).encode())
+            h.update(pd.util.hash_pandas_object(value, index=True).to_numpy().tobytes())
+        elif isinstance(value, pd.Series):
+            h.update(repr((value.name, str(value.dtype), value.shape)).encode())
+            h.update(pd.util.hash_pandas_object(value, index=True).to_numpy().tobytes())
+        else:
+            arr = np.ascontiguousarray(value)
+            h.update(repr((str(arr.dtype), arr.shape)).encode())
+            h.update(arr.view(np.uint8).reshape(-1) if arr.dtype != object else repr(arr.tolist()).encode())
+        digest = h.hexdigest()
+        try:
+            self._remember(value, digest)
+        except TypeError:
+            pass
+        return digest
+
+    def _remember(self, value, digest):
+        key = id(value)
+        self._digests[key] = (weakref.ref(value, lambda _, k=key: self._digests.pop(k, None)), digest,
+                              _shape_sig(value))
+
+    def _share(self, value):
+        # DataFrame/Series dari cache: tiap pemanggil dapat salinan dangkal (copy-on-write), jadi
+        # assignment kolom / nilai in-place tidak sampai ke entri cache maupun sesi lain. Digest objek asal
+        # dipakai ulang supaya salinan yang jadi input memoize berikutnya tidak di-hash ulang tiap rerun
+        if not isinstance(value, (pd.DataFrame, pd.Series)):
+            return value
+        out = value.copy(deep=False)
+        self._remember(out, self._digest(value))
+        return out
+
+    def _hash_into(self, h, value):
+        if isinstance(value, (pd.DataFrame, pd.Series, np.ndarray)):
+            h.update(type(value).__name__.encode())
+            h.update(self._digest(value).encode())
+        elif isinstance(value, (list, tuple)):
+            h.update(f"{type(value).__name__}[{len(value)}]".encode())
+            for v in value:
+                self._hash_into(h, v)
+        elif isinstance(value, dict):
+            h.update(f"dict[{len(value)}]".encode())
+            for k in sorted(value, key=repr):
+                self._hash_into(h, k)
+                self._hash_into(h, value[k])
+        else:
+            h.update(repr(value).encode())
+
+    def make_key(self, name, *args, **kwargs):
+        h = hashlib.blake2b(digest_size=16)
+        h.update(name.encode())
+        self._hash_into(h, args)
+        self._hash_into(h, sorted(kwargs.items()))
+        return f"{name}:{h.hexdigest()}"
+
+    # ── get / put ────────────────────────────────────────────────────────────
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._misses += 1
+                return False, None
+            self._hits += 1
+            entry.hits += 1
+            entry.last_access = time.time()
+            entry.priority = self._clock + self._value_per_byte(entry.cost, entry.nbytes)
+            return True, entry.value
+
+    @staticmethod
+    def _value_per_byte(cost, nbytes):
+        # detik komputasi yang dihemat per MB yang ditempati
+        return max(cost, 1e-3) / max(nbytes / 1e6, 1e-3)
+
+    def put(self, key, value, cost=0.0, label=None):
+        nbytes = _nbytes(value)
+        _freeze(value)
+        with self._lock:
+            if nbytes > self.max_bytes:
+                # lebih besar dari seluruh budget: tidak disimpan
+                self._rejected += 1
+                return value
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old.nbytes
+            while self._entries and self._bytes + nbytes > self.max_bytes:
+                victim_key = min(self._entries, key=lambda k: self._entries[k].priority)
+                victim = self._entries.pop(victim_key)
+                self._clock = victim.priority
+                self._bytes -= victim.nbytes
+                self._evictions += 1
+            priority = self._clock + self._value_per_byte(cost, nbytes)
+            self._entries[key] = _Entry(value, nbytes, cost, label or key.split(":")[0], priority)
+            self._bytes += nbytes
+        return value
+
+    def memoize(self, fn, name=None, ignore=()):
+        name = name or fn.__name__
+        signature = inspect.signature(fn)
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            params = {k: v for k, v in bound.arguments.items() if k not in ignore}
+            key = self.make_key(name, **params)
+            hit, value = self.get(key)
+            if not hit:
+                t0 = time.perf_counter()
+                value = self.put(key, fn(*args, **kwargs), cost=time.perf_counter() - t0, label=name)
+            return self._share(value)
+
+        return wrapper
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            self._clock = 0.0
+
+    # ── statistik ────────────────────────────────────────────────────────────
+    def stats(self, top=10):
+        with self._lock:
+            entries = list(self._entries.items())
+            lookups = self._hits + self._misses
+            summary = {
+                "entries": len(entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": self._hits / lookups if lookups else None,
+                "evictions": self._evictions,
+                "rejected": self._rejected,
+            }
+        biggest = sorted(entries, key=lambda kv: kv[1].nbytes, reverse=True)[:top]
+        summary["biggest"] = pd.DataFrame(
+            [{"item": e.label, "key": k.split(":")[-1][:8], "mb": round(e.nbytes / 1e6, 2),
+              "cost_s": round(e.cost, 3), "hits": e.hits,
+              "idle_s": round(time.time() - e.last_access, 1)} for k, e in biggest],
+            columns=["item", "key", "mb", "cost_s", "hits", "idle_s"])
+        return summary
+
+
+def make_cache(max_mb=None):
+    if max_mb is None:
+        max_mb = float(os.environ.get("DASHBOARD_CACHE_MB", DEFAULT_MAX_MB))
+    return ResultCache(max_mb * 1e6)
@@ -0,0 +1,221 @@
+# ╔═══════════════════════════════════════════════════════════════════════════╗
+# ║                                                                           ║
+# ║              RIWAYAT RUN CLUSTERING (SQLITE + FILE KOLOMNAR)              ║
+# ║                                                                           ║
+# ║  Hasil run yang selesai disimpan ke disk supaya tidak hilang saat browser ║
+# ║  di-refresh atau server di-deploy ulang:                                  ║
+# ║  - runs.db: Metadata per run (parameter, fingerprint data, K, silhouette, ║
+# ║    ukuran, waktu dibuat / terakhir dipakai)                               ║
+# ║  - <run_id>/: Folder hasil dengan layout pipeline.save_results()          ║
+# ║    (parquet + labels/embedding/X_scaled .npy) + silhouette.npy            ║
+# ║                                                                           ║
+# ║  - make_store(): Store dengan folder dari env DASHBOARD_RUN_STORE dan     ║
+# ║    budget disk dari env DASHBOARD_RUN_STORE_MB                            ║
+# ║  - RunStore.save(): Simpan run (run identik hanya diperbarui waktunya)    ║
+# ║  - RunStore.list_runs() / load() / delete(): Riwayat, muat ulang, hapus   ║
+# ║  - RunStore.prune(): Buang run yang paling lama tidak dipakai sampai      ║
+# ║    total ukuran di bawah budget                                           ║
+# ║                                                                           ║
+# ║  Save ditulis ke .tmp-<pid>-<run_id> lalu di-rename. Store yang sama      ║
+# ║  dibuka beberapa proses (dashboard, batch_run.py, scoring_service.py),    ║
+# ║  jadi folder sementara hanya dibersihkan bila pid-nya sudah mati atau     ║
+# ║  umurnya melewati ORPHAN_TMP_SECONDS.                                     ║
+# ║                                                                           ║
+# ╚═══════════════════════════════════════════════════════════════════════════╝
+import contextlib
+import hashlib
+import json
+import os
+import re
+import shutil
+import sqlite3
+import threading
+import time
+import uuid
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from pipeline import load_results, save_results
+
+DEFAULT_DIR = os.path.join(".cache", "runs")
+DEFAULT_MAX_MB = 2048
+ORPHAN_TMP_SECONDS = 6 * 3600  # save paling lama jauh di bawah ini
+_TMP_NAME = re.compile(r"\.tmp-(\d+)-\d{8}-\d{6}-[0-9a-f]{6}")
+RUN_COLUMNS = ["run_id", "created_at", "last_used", "source", "fingerprint", "n_rows", "final_k", "silhouette",
+               "engine", "dr_method", "bytes"]
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id TEXT PRIMARY KEY,
+    run_key TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    last_used REAL NOT NULL,
+    source TEXT,
+    fingerprint TEXT NOT NULL,
+    n_rows INTEGER NOT NULL,
+    final_k INTEGER,
+    silhouette REAL,
+    engine TEXT,
+    dr_method TEXT,
+    params TEXT NOT NULL,
+    bytes INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS runs_key ON runs (run_key);
+CREATE INDEX IF NOT EXISTS runs_last_used ON runs (last_used);
+"""
+
+
+def fingerprint(df):
+    # Isi data (nilai + nama kolom), bukan objek: upload ulang file yang sama memberi fingerprint sama
+    h = hashlib.blake2b(digest_size=16)
+    h.update(json.dumps([str(c) for c in df.columns]).encode())
+    h.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    return h.hexdigest()
+
+
+def _folder_bytes(path):
+    return sum(f.stat().st_size for f in Path(path).rglob("*") if f.is_file())
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True  # proses ada, milik user lain
+    return True
+
+
+def _orphaned(tmp):
+    # .tmp-<pid>-<run_id>: yatim bila proses pemiliknya sudah mati; nama tanpa pid (format lama) atau pid
+    # yang dipakai ulang proses lain dibersihkan setelah ORPHAN_TMP_SECONDS
+    try:
+        age = time.time() - tmp.stat().st_mtime
+    except FileNotFoundError:
+        return False
+    if age > ORPHAN_TMP_SECONDS:
+        return True
+    match = _TMP_NAME.fullmatch(tmp.name)
+    return match is not None and not _pid_alive(int(match.group(1)))
+
+
+class RunStore:
+    def __init__(self, root=DEFAULT_DIR, max_bytes=DEFAULT_MAX_MB * 1e6):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.db_path = self.root / "runs.db"
+        self._lock = threading.Lock()
+        # folder sementara sisa proses yang mati di tengah save; store yang sama juga dibuka proses lain
+        # (batch_run.py, scoring_service.py), jadi save yang masih berjalan tidak boleh ikut terhapus
+        for tmp in self.root.glob(".tmp-*"):
+            if _orphaned(tmp):
+                shutil.rmtree(tmp, ignore_errors=True)
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+
+    @contextlib.contextmanager
+    def _connect(self):
+        # satu koneksi per pemanggilan: store dipakai dari thread script dan thread job
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def save(self, result, data=None, source="", silhouette_values=None):
+        # data: frame asal untuk fingerprint (default df_proc hasil run)
+        fp = fingerprint(result["df_proc"] if data is None else data)
+        params = json.dumps(result["params"], sort_keys=True, default=str)
+        run_key = hashlib.blake2b(f"{fp}|{params}|{result['final_k']}".encode(), digest_size=16).hexdigest()
+        now = time.time()
+        with self._lock, self._connect() as conn:
+            row = conn.execute("SELECT run_id FROM runs WHERE run_key = ?", (run_key,)).fetchone()
+            if row is not None and (self.root / row[0]).exists():
+                conn.execute("UPDATE runs SET last_used = ? WHERE run_id = ?", (now, row[0]))
+                return row[0]
+
+        run_id = f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:6]}"
+        # ditulis ke folder sementara lalu di-rename: run di index selalu lengkap
+        tmp = self.root / f".tmp-{os.getpid()}-{run_id}"
+        try:
+            save_results(result, tmp)
+            if silhouette_values is not None:
+                np.save(tmp / "silhouette.npy", np.asarray(silhouette_values, dtype=float))
+            size = _folder_bytes(tmp)
+            tmp.rename(self.root / run_id)
+        except BaseException:
+            shutil.rmtree(tmp, ignore_errors=True)
+            raise
+        silhouette = result["silhouette"]
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "INSERT INTO runs VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (run_id, run_key, now, now, source, fp, int(len(result["df_proc"])), int(result["final_k"]),
+                 None if silhouette is None else float(silhouette), result["params"].get("engine"),
+                 result["params"].get("dr_method"), params, size))
+        self.prune(keep=(run_id,))
+        return run_id
+
+    def list_runs(self, fingerprint=None):
+        query = f"SELECT {', '.join(RUN_COLUMNS)}, params FROM runs"
+        args = ()
+        if fingerprint is not None:
+            query += " WHERE fingerprint = ?"
+            args = (fingerprint,)
+        with self._connect() as conn:
+            runs = pd.read_sql_query(query + " ORDER BY created_at DESC", conn, params=args)
+        for col in ("created_at", "last_used"):
+            runs[col] = pd.to_datetime(runs[col], unit="s")
+        runs["params"] = runs["params"].map(json.loads)
+        return runs
+
+    def load(self, run_id):
+        path = self.root / run_id
+        if not (path / "metrics.json").exists():
+            raise KeyError(f"Run tidak ditemukan: {run_id}")
+        result = load_results(path)
+        sil_path = path / "silhouette.npy"
+        result["silhouette_values"] = np.load(sil_path) if sil_path.exists() else None
+        result["run_id"] = run_id
+        with self._lock, self._connect() as conn:
+            conn.execute("UPDATE runs SET last_used = ? WHERE run_id = ?", (time.time(), run_id))
+        return result
+
+    def delete(self, run_id):
+        with self._lock, self._connect() as conn:
+            conn.execute("DELETE FROM runs WHERE run_id = ?", (run_id,))
+        shutil.rmtree(self.root / run_id, ignore_errors=True)
+
+    def total_bytes(self):
+        with self._connect() as conn:
+            return int(conn.execute("SELECT COALESCE(SUM(bytes), 0) FROM runs").fetchone()[0])
+
+    def prune(self, max_bytes=None, keep=()):
+        # LRU: run yang paling lama tidak disimpan / dimuat dibuang lebih dulu; run di keep tidak dibuang
+        max_bytes = self.max_bytes if max_bytes is None else max_bytes
+        with self._connect() as conn:
+            rows = conn.execute("SELECT run_id, bytes FROM runs ORDER BY last_used ASC").fetchall()
+        total = sum(size for _, size in rows)
+        removed = []
+        for run_id, size in rows:
+            if total <= max_bytes:
+                break
+            if run_id in keep:
+                continue
+            self.delete(run_id)
+            total -= size
+            removed.append(run_id)
+        return removed
+
+
+def make_store(root=None, max_mb=None):
+    if root is None:
+        root = os.environ.get("DASHBOARD_RUN_STORE", DEFAULT_DIR)
+    if max_mb is None:
+        max_mb = float(os.environ.get("DASHBOARD_RUN_STORE_MB", DEFAULT_MAX_MB))
+    return RunStore(root, max_mb * 1e6)
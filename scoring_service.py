@@ -0,0 +1,206 @@
+# ╔═══════════════════════════════════════════════════════════════════════════╗
+# ║                                                                           ║
+# ║             LAYANAN HTTP SCORING (KLASTER UNTUK KASUS BARU)               ║
+# ║                                                                           ║
+# ║  Tool lain bisa menanyakan "kasus ini masuk klaster mana?" tanpa membuka  ║
+# ║  Streamlit. State preprocessing + centroid dimuat sekali dari folder      ║
+# ║  hasil batch_run.py atau dari riwayat run (run_store.py), lalu dipakai    ║
+# ║  untuk setiap request (incremental.IncrementalModel, tanpa refit):        ║
+# ║  - GET  /health: Status + jumlah klaster, fitur dan baris fit             ║
+# ║  - POST /score:  Satu record / list record JSON ({"records": [...]}       ║
+# ║    juga boleh) atau body CSV -> cluster, distance, x, y per record        ║
+# ║                                                                           ║
+# ║  Satu batch = satu transform + satu perkalian matriks ke centroid + satu  ║
+# ║  query tetangga terdekat (vektor), bukan loop per record. Hasil JSON,     ║
+# ║  atau CSV dengan ?format=csv / header Accept: text/csv.                   ║
+# ║                                                                           ║
+# ║  Contoh:                                                                  ║
+# ║    python scoring_service.py --results results --port 8765                ║
+# ║    curl -X POST localhost:8765/score -H "Content-Type: text/csv" \        ║
+# ║        --data-binary @kasus_baru.csv                                      ║
+# ║                                                                           ║
+# ╚═══════════════════════════════════════════════════════════════════════════╝
+import argparse
+import io
+import json
+import sys
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+import pandas as pd
+
+import incremental
+import run_store
+from pipeline import load_results, robust_read_csv
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+MAX_BODY_BYTES = 64 * 1024 * 1024
+RESULT_COLUMNS = ["cluster", "distance", "x", "y", "unseen"]
+
+
+class Scorer:
+    def __init__(self, model, source=""):
+        self.model = model
+        self.source = source
+        # fitur numerik tetap satu kolom dengan nama sama di feature_cols (pipeline.encode_raw)
+        self.numeric = [f for f in model.features if f in model.feature_cols]
+
+    def align(self, df):
+        # Record JSON bisa membawa angka sebagai teks atau sebaliknya: samakan dengan dtype data fit
+        fixes = {}
+        for f in self.model.features:
+            if f not in df.columns:
+                continue
+            is_numeric = df[f].dtype.kind in "biufc"
+            if f in self.numeric and not is_numeric:
+                fixes[f] = pd.to_numeric(df[f], errors="coerce")
+            elif f not in self.numeric and is_numeric:
+                # 35.0 (kolom float karena ada null di JSON) harus jadi "35" seperti nilai di CSV fit;
+                # astype(str) mempertahankan NA (StringDtype), diisi nilai pengisi saat cleaning
+                values = df[f]
+                if values.dtype.kind == "f" and (values.dropna() % 1 == 0).all():
+                    values = values.astype("Int64")
+                fixes[f] = values.astype(str)
+        return df.assign(**fixes) if fixes else df
+
+    def score(self, df):
+        if len(df) == 0:
+            return pd.DataFrame({c: [] for c in RESULT_COLUMNS})
+        _, X, unseen, _ = self.model.transform(self.align(df), filter_rows=False)
+        idx, distance = self.model.assign(X)
+        coords = self.model.place(X)
+        return pd.DataFrame({"cluster": self.model.clusters[idx], "distance": distance,
+                             "x": coords[:, 0], "y": coords[:, 1], "unseen": unseen})
+
+    def info(self):
+        return {"status": "ok", "source": self.source, "clusters": self.model.clusters.tolist(),
+                "features": self.model.features, "encoded_columns": len(self.model.feature_cols),
+                "n_fit": self.model.n_fit}
+
+
+def load_scorer(results_dir=None, run_id=None):
+    # results_dir: folder batch_run.py (incremental.json dipakai bila ada); run_id: riwayat run dashboard
+    if run_id is not None:
+        store = run_store.make_store()
+        result = store.load(run_id)
+        state = incremental.load_state(store.root / run_id)
+        source = f"run {run_id}"
+    else:
+        result = load_results(results_dir)
+        state = incremental.load_state(results_dir)
+        source = str(results_dir)
+    return Scorer(incremental.IncrementalModel.from_result(result, state=state), source)
+
+
+def parse_payload(body, content_type):
+    # CSV (text/csv) atau JSON: satu objek, list objek, atau {"records": [...]}
+    if content_type.split(";")[0].strip().lower() in ("text/csv", "application/csv"):
+        return robust_read_csv(io.BytesIO(body))
+    payload = json.loads(body or b"null")
+    if isinstance(payload, dict) and "records" in payload:
+        payload = payload["records"]
+    if isinstance(payload, dict):
+        payload = [payload]
+    if not isinstance(payload, list) or not all(isinstance(r, dict) for r in payload):
+        raise ValueError("Payload JSON harus berupa objek, list objek, atau {\"records\": [...]}")
+    return pd.DataFrame.from_records(payload)
+
+
+class ScoringHandler(BaseHTTPRequestHandler):
+    # HTTP/1.1: koneksi keep-alive dipakai ulang oleh klien (mis. bench/bench_scoring.py)
+    protocol_version = "HTTP/1.1"
+    scorer = None
+    quiet = True
+
+    def log_message(self, format, *args):
+        if not self.quiet:
+            super().log_message(format, *args)
+
+    def _send(self, status, body, content_type="application/json"):
+        if not isinstance(body, bytes):
+            body = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if urlparse(self.path).path != "/health":
+            return self._send(404, {"error": f"Path tidak dikenal: {self.path}"})
+        self._send(200, self.scorer.info())
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        if url.path != "/score":
+            return self._send(404, {"error": f"Path tidak dikenal: {self.path}"})
+        length = int(self.headers.get("Content-Length") or 0)
+        if length > MAX_BODY_BYTES:
+            self.close_connection = True
+            return self._send(413, {"error": f"Payload lebih dari {MAX_BODY_BYTES // (1024 * 1024)} MB"})
+        body = self.rfile.read(length)
+        t0 = time.perf_counter()
+        try:
+            df = parse_payload(body, self.headers.get("Content-Type", "application/json"))
+            scores = self.scorer.score(df)
+        except (ValueError, pd.errors.ParserError) as e:
+            # JSONDecodeError turunan ValueError; kolom fitur hilang juga ValueError (IncrementalModel.transform)
+            return self._send(400, {"error": str(e)})
+        seconds = time.perf_counter() - t0
+        wants_csv = parse_qs(url.query).get("format") == ["csv"] or "text/csv" in self.headers.get("Accept", "")
+        if wants_csv:
+            return self._send(200, scores.to_csv(index=False).encode("utf-8"), "text/csv")
+        results = scores.astype({"cluster": object}).to_dict(orient="records")
+        for r in results:
+            r["cluster"] = r["cluster"].item() if isinstance(r["cluster"], np.generic) else r["cluster"]
+            r["unseen"] = bool(r["unseen"])
+        self._send(200, {"results": results, "n": len(results), "unseen": int(scores["unseen"].sum()),
+                         "seconds": round(seconds, 6)})
+
+
+def make_server(scorer, host=DEFAULT_HOST, port=DEFAULT_PORT, quiet=True):
+    handler = type("BoundScoringHandler", (ScoringHandler,), {"scorer": scorer, "quiet": quiet})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Layanan HTTP lokal untuk menempatkan kasus baru ke klaster yang ada.")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--results", help="Folder hasil batch_run.py (--output)")
+    source.add_argument("--run", help="ID run dari riwayat run dashboard (env DASHBOARD_RUN_STORE)")
+    parser.add_argument("--host", default=DEFAULT_HOST, help="Alamat bind (default: %(default)s, hanya lokal)")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help="Port (default: %(default)s)")
+    parser.add_argument("--verbose", action="store_true", help="Catat setiap request ke stderr")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    t0 = time.perf_counter()
+    try:
+        scorer = load_scorer(results_dir=args.results, run_id=args.run)
+    except ValueError as e:
+        # mis. hasil run DBSCAN (incremental.check_engine)
+        print(f"error: {e}", file=sys.stderr)
+        return 2
+    info = scorer.info()
+    server = make_server(scorer, args.host, args.port, quiet=not args.verbose)
+    print(f"model: {scorer.source}, {len(info['clusters'])} klaster, {info['encoded_columns']} kolom terkode, "
+          f"{info['n_fit']} baris fit ({time.perf_counter() - t0:.1f}s)")
+    print(f"melayani di http://{args.host}:{server.server_address[1]} (POST /score, GET /health)", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,394 @@
+# ╔═══════════════════════════════════════════════════════════════════════════╗
+# ║                                                                           ║
+# ║              MODE OUT-OF-CORE (CSV LEBIH BESAR DARI MEMORI)               ║
+# ║                                                                           ║
+# ║  CSV dibaca per chunk dalam tiga pass; memori puncak dibatasi ukuran      ║
+# ║  chunk + sampel, bukan jumlah baris file:                                 ║
+# ║  - fit_stats(): Pass 1, tipe kolom, nilai pengisi, spesifikasi encoder,   ║
+# ║    mean & skala StandardScaler (dari hitungan nilai + momen numerik) dan  ║
+# ║    sampel acak seragam (reservoir) untuk K otomatis & tampilan dashboard  ║
+# ║  - transform(): Satu chunk -> data cleaning + matriks terskala            ║
+# ║  - fit_minibatch(): Pass 2, MiniBatchKMeans.partial_fit per mini-batch    ║
+# ║  - write_labels(): Pass 3, label per baris ke file (parquet / csv.gz)     ║
+# ║    + profil klaster seluruh data (state profil digabung per chunk)        ║
+# ║  - run_out_of_core(): Ketiga pass + hasil berformat run_pipeline untuk    ║
+# ║    save_results (df_proc, X_scaled, embedding = sampel)                   ║
+# ║                                                                           ║
+# ║  Median pengisi numerik dihitung dari sampel (perkiraan); mean, modus,    ║
+# ║  hitungan kategori dan momen scaler exact. Hapus duplikat memakai         ║
+# ║  pipeline.DuplicateFilter (hash ~16 byte per baris unik) sekali di pass   ║
+# ║  1; keputusannya disimpan sebagai bitmap per baris (1 bit) untuk pass     ║
+# ║  berikutnya. Remove-missing mengikuti fit_cleaning (setelah pengisian):   ║
+# ║  tipe fitur seluruh file dibaca dulu (pass 0, kolom fitur saja), lalu     ║
+# ║  hanya NA pada fitur non-numerik yang membuang baris.                     ║
+# ║                                                                           ║
+# ╚═══════════════════════════════════════════════════════════════════════════╝
+import codecs
+import os
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from sklearn.cluster import MiniBatchKMeans
+
+import encoders
+import export
+import pipeline
+
+CHUNK_ROWS = 100_000
+SAMPLE_ROWS = 20_000
+BATCH_ROWS = 4096
+# fitur yang (sejauh ini) tampak numerik: hitungan nilai disimpan sampai batas ini; bila fitur ternyata
+# kategorikal setelah batas terlewati, kolomnya dibaca ulang khusus untuk hitungan
+COUNT_CAP = 10_000
+TRY_ENCODINGS = ["utf-8", "cp1252", "latin-1"]
+
+
+def detect_encoding(path, try_encodings=None, probe_bytes=1 << 20):
+    # Sama dengan urutan robust_read_csv, tetapi hanya dari awal file
+    with open(path, "rb") as fh:
+        head = fh.read(probe_bytes)
+    if head.startswith(codecs.BOM_UTF8):
+        return "utf-8-sig"
+    for enc in try_encodings or TRY_ENCODINGS:
+        try:
+            codecs.getincrementaldecoder(enc)().decode(head, final=False)
+            return enc
+        except UnicodeDecodeError:
+            continue
+    return "latin-1"
+
+
+def read_chunks(path, encoding, chunksize=CHUNK_ROWS, usecols=None):
+    # Semua kolom dibaca sebagai teks: hash duplikat dan tipe kolom sama di setiap pass dan setiap chunk
+    return pd.read_csv(path, encoding=encoding, chunksize=chunksize, dtype=str, usecols=usecols)
+
+
+def _merge_moments(a, b):
+    # (n, mean, M2) dua kelompok digabung (Chan et al.): stabil walau jumlah baris sangat besar
+    n = a[0] + b[0]
+    if n == 0:
+        return a
+    delta = b[1] - a[1]
+    return n, a[1] + delta * b[0] / n, a[2] + b[2] + delta ** 2 * a[0] * b[0] / n
+
+
+def _moments(values):
+    if len(values) == 0:
+        return 0, 0.0, 0.0
+    mean = float(values.mean())
+    return len(values), mean, float(((values - mean) ** 2).sum())
+
+
+def _fillable_categorical(dtype):
+    # Aturan pipeline.fit_cleaning: hanya kolom object / category yang diisi nilai kategorikal
+    return dtype == "object" or dtype.name == "category"
+
+
+def coerce(chunk, dtypes):
+    fixes = {col: pd.to_numeric(chunk[col], errors="coerce").astype(dtype)
+             for col, dtype in dtypes.items() if dtype != "str" and col in chunk.columns}
+    return chunk.assign(**fixes) if fixes else chunk
+
+
+def numeric_features(path, encoding, features, chunksize=CHUNK_ROWS):
+    # Pass 0 (hanya untuk remove_missing): fitur yang numerik di seluruh file. Dibutuhkan sebelum baris
+    # pertama disaring, karena satu nilai teks di chunk terakhir pun membuat kolom kategorikal
+    numeric = None
+    for chunk in read_chunks(path, encoding, chunksize, usecols=lambda c: c in features):
+        if numeric is None:
+            numeric = set(chunk.columns)
+        for f in list(numeric):
+            raw = chunk[f]
+            if pd.to_numeric(raw, errors="coerce").notna().sum() < raw.notna().sum():
+                numeric.discard(f)
+    return sorted(numeric or [])
+
+
+def _keep_rows(chunk, state):
+    # remove_missing seperti pipeline.fit_cleaning (setelah pengisian): fitur numerik selalu diisi
+    # (median / mean / 0), jadi hanya NA pada fitur lain yang tidak terisi membuang baris
+    if not state["remove_missing"]:
+        return chunk
+    missing = [f for f in state["features"] if f in chunk.columns and f not in state["numeric_features"]
+               and not _fillable_categorical(chunk[f].dtype)]
+    if not missing:
+        return chunk
+    return chunk[chunk[missing].notna().all(axis=1)]
+
+
+def fit_stats(path, features, fill_numeric_method="median", fill_categorical_method="Unknown", remove_duplicates=False,
+              remove_missing=False, duplicate_subset=None, encoder_methods=None, chunksize=CHUNK_ROWS,
+              sample_rows=SAMPLE_ROWS, random_state=42, log=print):
+    t0 = time.perf_counter()
+    encoding = detect_encoding(path)
+    rng = np.random.default_rng(random_state)
+    dedup = pipeline.DuplicateFilter(duplicate_subset) if remove_duplicates else None
+    state = {"path": str(path), "encoding": encoding, "chunksize": int(chunksize), "features": [], "fills": {},
+             "numeric": {}, "remove_missing": bool(remove_missing), "remove_duplicates": bool(remove_duplicates),
+             "duplicate_subset": list(duplicate_subset) if duplicate_subset else None,
+             "numeric_features": numeric_features(path, encoding, features, chunksize) if remove_missing else []}
+    cols = {}
+    sample = None
+    n_read = n_kept = 0
+    keep_bits = [] if dedup is not None else None
+    for chunk in read_chunks(path, encoding, chunksize):
+        n_read += len(chunk)
+        if not cols:
+            state["features"] = [f for f in features if f in chunk.columns]
+            cols = {c: {"numeric": True, "integral": True, "na_any": False, "na": 0, "moments": (0, 0.0, 0.0),
+                        "counts": None, "overflow": False} for c in chunk.columns}
+        kept = chunk
+        if dedup is not None:
+            mask = dedup.keep_mask(chunk)
+            keep_bits.append(np.packbits(mask))
+            kept = chunk[mask]
+        kept = _keep_rows(kept, state)
+        n_kept += len(kept)
+        for col, info in cols.items():
+            # tipe kolom dari semua baris (seperti inferensi read_csv di memori), statistik dari baris terpakai
+            raw = chunk[col]
+            info["na_any"] = info["na_any"] or bool(raw.isna().any())
+            if info["numeric"]:
+                values = pd.to_numeric(raw, errors="coerce")
+                if values.notna().sum() < raw.notna().sum():
+                    # ada teks bukan angka: kolom kategorikal
+                    info["numeric"] = False
+                else:
+                    info["integral"] = info["integral"] and bool((values.dropna() % 1 == 0).all())
+                    used = values.loc[kept.index].dropna().to_numpy(dtype=float)
+                    info["moments"] = _merge_moments(info["moments"], _moments(used))
+            state["numeric"][col] = info["numeric"]
+            info["na"] += int(kept[col].isna().sum())
+            if col in state["features"] and not info["overflow"]:
+                vc = kept[col].value_counts()
+                info["counts"] = vc if info["counts"] is None else info["counts"].add(vc, fill_value=0)
+                if info["numeric"] and len(info["counts"]) > COUNT_CAP:
+                    info["counts"], info["overflow"] = None, True
+        # reservoir dengan kunci acak: simpan sample_rows baris dengan kunci terkecil dari semua chunk
+        keyed = kept.assign(_key=rng.random(len(kept)))
+        if sample is not None and len(sample) >= sample_rows:
+            keyed = keyed[keyed["_key"] < sample["_key"].max()]
+        sample = keyed if sample is None else pd.concat([sample, keyed])
+        sample = sample.nsmallest(sample_rows, "_key")
+
+    if not cols:
+        raise ValueError(f"File kosong: {path}")
+    state["dtypes"] = {c: ("str" if not i["numeric"] else "int64" if i["integral"] and not i["na_any"] else "float64")
+                       for c, i in cols.items()}
+    sample = coerce(sample.drop(columns="_key").sort_index(), state["dtypes"])
+
+    # Nilai pengisi (pipeline.fit_cleaning): numerik median (dari sampel) / mean / 0, kategorikal Unknown / modus
+    fills, as_str = {}, []
+    for col, info in cols.items():
+        if info["na"] == 0:
+            continue
+        if info["numeric"]:
+            if fill_numeric_method == "median":
+                median = sample[col].median()
+                fills[col] = float(median) if pd.notna(median) else info["moments"][1]
+            elif fill_numeric_method == "mean":
+                fills[col] = info["moments"][1]
+            elif fill_numeric_method == "0":
+                fills[col] = 0
+        elif _fillable_categorical(sample[col].dtype):
+            if fill_categorical_method == "mode":
+                counts = info["counts"] if info["counts"] is not None else sample[col].value_counts()
+                fills[col] = counts.sort_index().idxmax() if len(counts) else "Unknown"
+            else:
+                fills[col] = "Unknown"
+            as_str.append(col)
+    state["fills"] = fills
+    state["layer"] = {"rows": None, "fills": fills, "as_str": as_str}
+    # keputusan hapus duplikat per chunk (bitmap): pass berikutnya tidak meng-hash ulang
+    state["keep_bits"] = keep_bits
+
+    overflow = [f for f in state["features"] if cols[f]["overflow"] and not cols[f]["numeric"]]
+    if overflow:
+        log(f"out-of-core: hitungan {', '.join(overflow)} dibaca ulang (fitur campuran angka/teks)")
+        _rescan_counts(state, cols, overflow)
+
+    # Spesifikasi encoder + mean/skala per kolom terkode, tanpa membangun matriks seluruh data:
+    # kolom kategorikal dari hitungan nilai (encode_column pada nilai unik, berbobot hitungan)
+    specs, feature_cols, means, scales = {}, [], [], []
+    for f in state["features"]:
+        info = cols[f]
+        if info["numeric"]:
+            # NaN tersisa jadi 0 di encode_raw (fillna) bila tidak ada nilai pengisi
+            n, mean, m2 = _merge_moments(info["moments"], (info["na"], float(fills.get(f, 0)), 0.0))
+            feature_cols.append(f)
+            means.append(mean)
+            scales.append(np.sqrt(m2 / n) if n else 0.0)
+            continue
+        counts = info["counts"].copy() if info["counts"] is not None else pd.Series(dtype=float)
+        na = info["na"]
+        if f in fills:
+            counts[fills[f]] = counts.get(fills[f], 0) + na
+            na = 0
+        counts = counts.sort_values(ascending=False, kind="stable")
+        specs[f] = encoders.spec_from_counts(counts, n_kept, (encoder_methods or {}).get(f, "onehot"))
+        values = pd.Series(list(counts.index) + [None], dtype=sample[f].dtype)
+        weights = np.append(counts.to_numpy(dtype=float), na)
+        encoded = encoders.encode_column(values, f, specs[f]).astype(float).fillna(0)
+        mean = weights @ encoded.to_numpy() / max(n_kept, 1)
+        var = np.maximum(weights @ encoded.to_numpy() ** 2 / max(n_kept, 1) - mean ** 2, 0)
+        feature_cols.extend(encoded.columns)
+        means.extend(mean)
+        scales.extend(np.sqrt(var))
+    if not feature_cols:
+        raise ValueError("Tidak ada fitur yang dapat diproses. Periksa pilihan fitur.")
+    scale = np.asarray(scales, dtype=float)
+    scale[scale == 0] = 1.0
+    state.update(specs=specs, feature_cols=feature_cols, mean=np.asarray(means, dtype=float), scale=scale,
+                 rows_read=n_read, rows_kept=n_kept, duplicates=dedup.dropped if dedup is not None else 0,
+                 seconds=time.perf_counter() - t0)
+    state["sample"], state["X_sample"] = transform(sample, state)
+    return state
+
+
+def _dedup_rows(chunk, state, index):
+    # Baris chunk ke-index yang lolos hapus duplikat di pass 1 (chunk dibaca dengan chunksize yang sama)
+    if state["keep_bits"] is None:
+        return chunk
+    return chunk[np.unpackbits(state["keep_bits"][index], count=len(chunk)).astype(bool)]
+
+
+def _rescan_counts(state, cols, overflow):
+    # Hitungan fitur yang baru ketahuan kategorikal setelah COUNT_CAP: baca ulang kolom itu saja
+    # (plus fitur untuk remove_missing)
+    usecols = list(dict.fromkeys(overflow + state["features"]))
+    for f in overflow:
+        cols[f]["counts"] = None
+    for i, chunk in enumerate(read_chunks(state["path"], state["encoding"], state["chunksize"], usecols=usecols)):
+        chunk = _keep_rows(_dedup_rows(chunk, state, i), state)
+        for f in overflow:
+            vc = chunk[f].value_counts()
+            cols[f]["counts"] = vc if cols[f]["counts"] is None else cols[f]["counts"].add(vc, fill_value=0)
+
+
+def transform(chunk, state):
+    # chunk mentah (teks) atau sudah di-coerce -> (data cleaning, matriks terskala dengan kolom feature_cols)
+    dfp = pipeline.apply_cleaning(coerce(chunk, state["dtypes"]), state["layer"])
+    if state["remove_missing"]:
+        dfp = dfp[dfp[state["features"]].notna().all(axis=1)]
+    raw = pipeline.encode_raw(dfp, state["features"], state["specs"]).reindex(columns=state["feature_cols"], fill_value=0)
+    return dfp, (raw.to_numpy(dtype=float) - state["mean"]) / state["scale"]
+
+
+def _stream(state):
+    for i, chunk in enumerate(read_chunks(state["path"], state["encoding"], state["chunksize"])):
+        yield transform(_dedup_rows(chunk, state, i), state)
+
+
+def fit_minibatch(state, k, random_state=42, batch_rows=BATCH_ROWS, epochs=1, log=print):
+    t0 = time.perf_counter()
+    model = MiniBatchKMeans(n_clusters=int(k), batch_size=batch_rows, random_state=random_state, n_init=3)
+    # inisialisasi k-means++ pada sampel seragam: file besar sering terurut per kota / tanggal
+    model.partial_fit(state["X_sample"])
+    for epoch in range(epochs):
+        for _, X in _stream(state):
+            for start in range(0, len(X), batch_rows):
+                model.partial_fit(X[start:start + batch_rows])
+    log(f"out-of-core: MiniBatchKMeans K={k}, {epochs} epoch ({time.perf_counter() - t0:.1f}s)")
+    return model
+
+
+def write_labels(state, model, path, numeric_feats=None):
+    # Pass 3: data cleaning + cluster per chunk ke file; profil & inertia dijumlahkan sambil jalan
+    summary = {"profile_state": None, "inertia": 0.0, "rows": 0}
+
+    def chunks():
+        for dfp, X in _stream(state):
+            if len(dfp) == 0:
+                continue
+            distances = model.transform(X)
+            labels = distances.argmin(axis=1)
+            summary["inertia"] += float((distances.min(axis=1) ** 2).sum())
+            summary["rows"] += len(dfp)
+            part = pipeline.cluster_profile_state(dfp, labels, numeric_feats)
+            summary["profile_state"] = part if summary["profile_state"] is None else \
+                pipeline.merge_profile_states(summary["profile_state"], part)
+            yield dfp.assign(cluster=labels)
+
+    with open(path, "wb") as fh:
+        if str(path).endswith(".parquet"):
+            export.write_parquet(chunks(), fh)
+        else:
+            export.write_csv_gz(chunks(), fh)
+    return summary
+
+
+def run_out_of_core(path, out_dir, features=None, fill_numeric_method="median", fill_categorical_method="Unknown",
+                    remove_duplicates=False, remove_missing=False, duplicate_subset=None, encoder_methods=None,
+                    k="auto", k_max=8, dr_method="PCA", tsne_perplexity=30, random_state=42, chunksize=CHUNK_ROWS,
+                    sample_rows=SAMPLE_ROWS, epochs=1, log=print):
+    # Hasil berformat run_pipeline: df_proc / X_scaled / labels / embedding untuk sampel (tampilan dashboard),
+    # profil klaster dari seluruh data, label seluruh baris di out_dir/labels_full.*
+    if features is None:
+        features = pipeline.DEFAULT_FEATURES
+    state = fit_stats(path, features, fill_numeric_method, fill_categorical_method, remove_duplicates, remove_missing,
+                      duplicate_subset, encoder_methods, chunksize, sample_rows, random_state, log)
+    log(f"out-of-core pass 1: {state['rows_read']} baris dibaca, {state['rows_kept']} dipakai "
+        f"({state['duplicates']} duplikat), {len(state['feature_cols'])} kolom terkode, "
+        f"sampel {len(state['sample'])} baris ({state['seconds']:.1f}s)")
+    X_sample = state["X_sample"]
+
+    ks = inertias = silhouettes = None
+    k_method = "manual"
+    if k == "auto":
+        t0 = time.perf_counter()
+        ks, inertias, silhouettes = pipeline.compute_k_metrics(X_sample, k_min=2, k_max=k_max, random_state=random_state)
+        k, k_method = pipeline.suggest_k(ks, inertias, silhouettes)
+        log(f"K saran ({k_method}, sampel): {k} ({time.perf_counter() - t0:.1f}s)")
+    k = int(k)
+
+    model = fit_minibatch(state, k, random_state=random_state, epochs=epochs, log=log)
+
+    t0 = time.perf_counter()
+    out = Path(out_dir)
+    out.mkdir(parents=True, exist_ok=True)
+    labels_file = out / ("labels_full.parquet" if pipeline.PARQUET_AVAILABLE else "labels_full.csv.gz")
+    numeric_feats = pipeline.profile_numeric_features(state["sample"], state["feature_cols"])
+    summary = write_labels(state, model, labels_file, numeric_feats)
+    if summary["rows"] != state["rows_kept"]:
+        # pass 1 (statistik) dan pass 3 (label) harus memakai baris yang sama
+        raise RuntimeError(f"Pass 3 melabeli {summary['rows']} baris, pass 1 memakai {state['rows_kept']}")
+    log(f"out-of-core pass 3: label {summary['rows']} baris -> {labels_file} ({time.perf_counter() - t0:.1f}s)")
+
+    labels = model.predict(X_sample)
+    coords = pipeline.reduce_dimensions(X_sample, dr_method, tsne_perplexity, random_state)
+    sample = state["sample"].reset_index(drop=True)
+    params = {
+        "features": state["features"],
+        "fill_numeric_method": fill_numeric_method,
+        "fill_categorical_method": fill_categorical_method,
+        "remove_duplicates": bool(remove_duplicates),
+        "duplicate_subset": state["duplicate_subset"],
+        "remove_missing": bool(remove_missing),
+        "encoders": dict(encoder_methods) if encoder_methods else None,
+        "k": "auto" if k_method != "manual" else k,
+        "k_max": k_max,
+        "engine": "minibatch_kmeans",
+        "dr_method": dr_method,
+        "tsne_perplexity": tsne_perplexity,
+        "random_state": random_state,
+        "out_of_core": {"input": os.path.basename(str(path)), "rows": summary["rows"], "rows_read": state["rows_read"],
+                        "sample_rows": len(sample), "chunksize": state["chunksize"], "epochs": epochs,
+                        "inertia": summary["inertia"], "labels_file": labels_file.name},
+    }
+    return {
+        "df_proc": pipeline.attach_clusters(sample, labels, coords),
+        "X_scaled": X_sample,
+        "feature_cols": state["feature_cols"],
+        "labels": labels,
+        "coords": coords,
+        "final_k": k,
+        "k_method": k_method,
+        "ks": ks,
+        "inertias": inertias,
+        "silhouettes": silhouettes,
+        "silhouette": pipeline.score_clustering(X_sample, labels),
+        "profile": pipeline.profile_from_state(summary["profile_state"]),
+        "params": params,
+    }
@@ -0,0 +1,137 @@
+# ╔═══════════════════════════════════════════════════════════════════════════╗
+# ║                                                                           ║
+# ║            CLUSTERING PER JENDELA WAKTU (PARALEL) + DRIFT KLASTER         ║
+# ║                                                                           ║
+# ║  Data dibagi per tahun / kuartal dari report_date, tiap jendela           ║
+# ║  di-cluster (KMeans) di proses worker terpisah, lalu klaster antar        ║
+# ║  jendela dipasangkan berdasarkan kemiripan centroid (Hungarian):          ║
+# ║  - window_labels(): Label jendela per baris ("2010", "2010Q1")            ║
+# ║  - cluster_centroids(): Centroid per label (acuan jendela pertama)        ║
+# ║  - match_clusters(): Pasangan klaster dua jendela, jarak centroid         ║
+# ║  - temporal_clustering(): Semua jendela sekaligus -> track + tabel drift  ║
+# ║                                                                           ║
+# ║  Semua jendela memakai X_scaled yang sama (satu scaler untuk seluruh      ║
+# ║  data) sehingga centroid antar jendela bisa dibandingkan. "Track" =       ║
+# ║  klaster yang sama dari jendela ke jendela; bila acuan diberikan (centroid║
+# ║  clustering penuh) nomor track = nomor klaster clustering penuh.          ║
+# ║                                                                           ║
+# ║  Proses worker lewat parallel.process_map() (spawn, 1 thread per worker). ║
+# ║                                                                           ║
+# ╚═══════════════════════════════════════════════════════════════════════════╝
+import time
+
+import numpy as np
+import pandas as pd
+from scipy.optimize import linear_sum_assignment
+from sklearn.cluster import KMeans
+from sklearn.metrics import pairwise_distances
+
+import parallel
+import pipeline
+
+FREQS = {"year": "Tahun", "quarter": "Kuartal"}
+# jendela dengan baris lebih sedikit dari ini (atau dari K) dilewati
+MIN_WINDOW_ROWS = 50
+SILHOUETTE_SAMPLE_SIZE = 2000
+# centroid_shift: jarak ke centroid track yang sama di jendela sebelumnya (jendela pertama: ke acuan)
+DRIFT_COLUMNS = ["window", "track", "cluster", "size", "share", "centroid_shift", "silhouette"]
+
+
+def parse_report_date(values):
+    # report_date di homicide-data.csv berupa angka YYYYMMDD; kolom datetime dipakai apa adanya
+    values = pd.Series(values)
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return values
+    text = values.astype("string").str.replace(r"\.0$", "", regex=True)
+    dates = pd.to_datetime(text, format="%Y%m%d", errors="coerce")
+    if dates.isna().all():
+        dates = pd.to_datetime(text, errors="coerce")
+    return dates
+
+
+def window_labels(values, freq="year"):
+    dates = parse_report_date(values)
+    if freq == "quarter":
+        labels = dates.dt.year.astype("Int64").astype("string") + "Q" + dates.dt.quarter.astype("Int64").astype("string")
+    else:
+        labels = dates.dt.year.astype("Int64").astype("string")
+    return labels.to_numpy(dtype=object, na_value=None)
+
+
+def cluster_centroids(X, labels):
+    clusters, codes = np.unique(np.asarray(labels), return_inverse=True)
+    codes = codes.ravel()
+    centroids = np.zeros((len(clusters), X.shape[1]))
+    np.add.at(centroids, codes, X)
+    return clusters, centroids / np.bincount(codes, minlength=len(clusters))[:, None]
+
+
+def match_clusters(ref_centroids, centroids):
+    # Hungarian pada jarak Euclidean centroid: pairs[i] = indeks acuan untuk klaster i (-1 bila tidak
+    # kebagian pasangan, mis. jumlah klaster berbeda)
+    dist = pairwise_distances(centroids, ref_centroids)
+    rows, cols = linear_sum_assignment(dist)
+    pairs = np.full(len(centroids), -1)
+    pairs[rows] = cols
+    match = np.full(len(centroids), np.nan)
+    match[rows] = dist[rows, cols]
+    return pairs, match
+
+
+def _cluster_window(X, k, random_state):
+    # Dijalankan di proses worker; harus fungsi top-level supaya bisa di-pickle
+    with parallel.single_threaded():
+        km = KMeans(n_clusters=int(k), random_state=random_state, n_init=10).fit(X)
+        values = pipeline.silhouette_sampled(X, km.labels_, SILHOUETTE_SAMPLE_SIZE, random_state)
+    sil = float(np.nanmean(values)) if not np.all(np.isnan(values)) else None
+    return {"labels": km.labels_, "centroids": km.cluster_centers_, "silhouette": sil}
+
+
+def temporal_clustering(X, windows, k, reference=None, max_workers=None, random_state=42, progress=None):
+    # X: X_scaled seluruh data; windows: label jendela per baris (None = tanpa tanggal, dilewati);
+    # reference: centroid clustering penuh (opsional) untuk menomori track di jendela pertama
+    t0 = time.perf_counter()
+    X = np.asarray(X, dtype=float)
+    windows = np.asarray(windows, dtype=object)
+    valid = pd.notna(windows)
+    keys = sorted(set(windows[valid]))
+    rows = {key: np.flatnonzero(windows == key) for key in keys}
+    skipped = [key for key in keys if len(rows[key]) < max(MIN_WINDOW_ROWS, int(k))]
+    keys = [key for key in keys if key not in skipped]
+
+    # jendela terbesar disubmit lebih dulu supaya tidak tertinggal di akhir
+    order = sorted(keys, key=lambda key: -len(rows[key]))
+    results = parallel.process_map(_cluster_window, {key: (X[rows[key]], k, random_state) for key in order},
+                                   max_workers=max_workers, progress=progress, label="jendela")
+
+    # pasangkan klaster jendela demi jendela (urut waktu); jendela pertama ke acuan bila ada
+    track_labels = np.full(len(X), -1)
+    records = []
+    prev_tracks, prev_centroids = None, None
+    if reference is not None:
+        prev_tracks, prev_centroids = np.arange(len(reference)), np.asarray(reference, dtype=float)
+    next_track = len(reference) if reference is not None else 0
+    for key in keys:
+        res = results[key]
+        centroids = res["centroids"]
+        if prev_centroids is None:
+            tracks = np.arange(len(centroids))
+            match = np.full(len(centroids), np.nan)
+            next_track = len(centroids)
+        else:
+            pairs, match = match_clusters(prev_centroids, centroids)
+            tracks = np.where(pairs >= 0, prev_tracks[np.maximum(pairs, 0)], -1)
+            for i in np.flatnonzero(tracks < 0):
+                tracks[i] = next_track
+                next_track += 1
+        sizes = np.bincount(res["labels"], minlength=len(centroids))
+        track_labels[rows[key]] = tracks[res["labels"]]
+        for i in range(len(centroids)):
+            records.append({"window": key, "track": int(tracks[i]), "cluster": i, "size": int(sizes[i]),
+                            "share": sizes[i] / max(sizes.sum(), 1), "centroid_shift": match[i],
+                            "silhouette": res["silhouette"]})
+        prev_tracks, prev_centroids = tracks, centroids
+
+    drift = pd.DataFrame(records, columns=DRIFT_COLUMNS).sort_values(["window", "track"], ignore_index=True)
+    return {"windows": keys, "skipped": skipped, "track_labels": track_labels, "drift": drift,
+            "seconds": time.perf_counter() - t0}